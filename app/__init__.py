@@ -1,7 +1,23 @@
 from flask import Flask
 
-# __name__ is the package name - 'app', for locating templates and static files
-app = Flask(__name__)
+from app import config, serialization
 
-from app import career_hub # needs to match script to enable database and service, bridge between db and web service, eg. career-hub
 
+def create_app():
+    global app
+    # __name__ is the package name - 'app', for locating templates and static files
+    app = Flask(__name__)
+
+    # Responses are encoded with orjson unless CAREERHUB_JSON_BACKEND=json
+    serialization.init_app(app, config.JSON_BACKEND)
+
+    from app import career_hub # needs to match script to enable database and service, bridge between db and web service, eg. career-hub
+    return app
+
+
+def __getattr__(name):
+    # The Flask app and its routes are only set up when app.app is first used, so the
+    # shared modules (config, utils, constants, ...) can be imported on their own, eg. by async_app
+    if name == 'app':
+        return create_app()
+    raise AttributeError(f"module 'app' has no attribute '{name}'")
@@ -0,0 +1,248 @@
+'''Module for the batch job mutation endpoint (/jobPosts/batch)
+
+A batch is a list of operations, each {"filter": {...}, "update": {...}} or
+{"filter": {...}, "delete": true}. Filters are MongoDB query documents on the jobs
+collection (Extended JSON such as {"$date": ...} is accepted), and updates are $set on
+the same fields /update_by_job_title allows. Every operation is validated first, then
+the valid ones are sent as one unordered bulk write, which keeps going past a failed
+operation.
+
+On MongoDB 8.0+ the write is a client-level bulkWrite with verbose results, which
+reports the matched, modified and deleted counts of every operation. Older servers run
+a collection bulk_write instead, which only reports the totals of the batch: there each
+applied operation has "counts": null in place of its own counts.
+
+The ids and industries of the jobs the batch can write are read before it runs, so the
+caches and derived data can be refreshed after it. Up to MAX_AFFECTED_JOBS are read,
+a larger batch rebuilds everything derived from the jobs instead.
+'''
+
+import json
+
+from bson import json_util
+from pymongo import DeleteMany, UpdateMany
+from pymongo.errors import BulkWriteError, ClientBulkWriteException, InvalidOperation
+
+from app import utils
+
+
+# Operations accepted per request
+MAX_BATCH_OPERATIONS = 1000
+
+# Query operators that run JavaScript on the server are not accepted in filters
+FORBIDDEN_OPERATORS = {"$where", "$function", "$accumulator"}
+
+# Job fields read before the write, so caches and derived data can be refreshed after it
+AFFECTED_PROJECTION = {"_id": 0, "job_id": 1, "industry_name": 1}
+
+# Jobs read before the write at most, past which they are not refreshed one by one
+MAX_AFFECTED_JOBS = 10000
+
+
+def _forbidden_operator(value):
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if key in FORBIDDEN_OPERATORS:
+                return key
+            found = _forbidden_operator(item)
+            if found:
+                return found
+    elif isinstance(value, list):
+        for item in value:
+            found = _forbidden_operator(item)
+            if found:
+                return found
+    return None
+
+
+def parse_operation(operation):
+    """
+    Validate one batch operation.
+
+    Returns:
+    tuple: (filter, fields to $set or None for a delete)
+
+    Raises:
+    ValueError: If the operation is invalid
+    """
+    if not isinstance(operation, dict):
+        raise ValueError("Operation must be a JSON object")
+    if not isinstance(operation.get('filter'), dict) or not operation['filter']:
+        raise ValueError("filter must be a non-empty object, use eg. {\"job_id\": {\"$gte\": 0}} to select every job")
+    if ('update' in operation) == bool(operation.get('delete')):
+        raise ValueError("Operation must have either update or \"delete\": true")
+
+    query = json_util.loads(json.dumps(operation['filter']))
+    forbidden = _forbidden_operator(query)
+    if forbidden:
+        raise ValueError(f"{forbidden} is not allowed in filters")
+
+    if operation.get('delete'):
+        return query, None
+    update_data, error = utils.validate_job_update(operation['update'])
+    if error:
+        raise ValueError(error)
+    return query, update_data
+
+
+def affected_query(operations):
+    """
+    Returns:
+    dict: The query matching every job the operations can write
+    """
+    return {"$or": [query for query, _ in operations]}
+
+
+def affected_jobs(db, operations):
+    """
+    Read the jobs the operations can write, before deleted ones are gone. The cursor is
+    read up to MAX_AFFECTED_JOBS jobs.
+
+    Returns:
+    tuple: (list of job ids, set of industry names), (None, None) when more jobs match
+    """
+    job_ids, industries = [], set()
+    for job in db.jobs.find(affected_query(operations), AFFECTED_PROJECTION).limit(MAX_AFFECTED_JOBS + 1):
+        if len(job_ids) == MAX_AFFECTED_JOBS:
+            return None, None
+        job_ids.append(job.get("job_id"))
+        industries.add(job.get("industry_name"))
+    return job_ids, industries
+
+
+async def affected_jobs_async(db, operations):
+    """
+    affected_jobs() through the async client.
+    """
+    job_ids, industries = [], set()
+    async for job in db.jobs.find(affected_query(operations), AFFECTED_PROJECTION).limit(MAX_AFFECTED_JOBS + 1):
+        if len(job_ids) == MAX_AFFECTED_JOBS:
+            return None, None
+        job_ids.append(job.get("job_id"))
+        industries.add(job.get("industry_name"))
+    return job_ids, industries
+
+
+def written_fields(operations):
+    """
+    Returns:
+    set: The job fields the operations set, None when one of them deletes jobs
+    """
+    if any(update_data is None for _, update_data in operations):
+        return None
+    return {field for _, update_data in operations for field in update_data}
+
+
+def write_models(operations, namespace=None):
+    """
+    Returns:
+    list: The UpdateMany / DeleteMany models of the operations (namespaced for a client bulk write)
+    """
+    options = {"namespace": namespace} if namespace else {}
+    return [
+        DeleteMany(query, **options) if update_data is None else UpdateMany(query, {"$set": update_data}, **options)
+        for query, update_data in operations
+    ]
+
+
+def verbose_results(operations, result, write_errors):
+    """
+    Per-operation outcomes of a client bulk write with verbose results.
+
+    Returns:
+    tuple: (list of outcomes in operation order, totals)
+    """
+    update_results = result.update_results if result else {}
+    delete_results = result.delete_results if result else {}
+    outcomes = []
+    for position, (_, update_data) in enumerate(operations):
+        if position in write_errors:
+            outcomes.append({"status": "failed", "error": write_errors[position]})
+        elif update_data is None:
+            deleted = delete_results.get(position)
+            outcomes.append({"status": "applied", **({"deleted_count": deleted.deleted_count} if deleted else {"counts": None})})
+        else:
+            updated = update_results.get(position)
+            outcomes.append({"status": "applied", **({"matched_count": updated.matched_count,
+                                                      "modified_count": updated.modified_count} if updated else {"counts": None})})
+    totals = {
+        "matched_count": result.matched_count if result else 0,
+        "modified_count": result.modified_count if result else 0,
+        "deleted_count": result.deleted_count if result else 0
+    }
+    return outcomes, totals
+
+
+def collection_results(operations, result_document, write_errors):
+    """
+    Per-operation outcomes of a collection bulk write, which only has totals: each
+    applied operation is reported with "counts": None.
+
+    Returns:
+    tuple: (list of outcomes in operation order, totals)
+    """
+    outcomes = [
+        {"status": "failed", "error": write_errors[position]} if position in write_errors else {"status": "applied", "counts": None}
+        for position in range(len(operations))
+    ]
+    totals = {
+        "matched_count": result_document.get("nMatched", 0),
+        "modified_count": result_document.get("nModified", 0),
+        "deleted_count": result_document.get("nRemoved", 0)
+    }
+    return outcomes, totals
+
+
+def _client_write_errors(error):
+    if error.error:
+        # Not a per-operation failure, eg. the connection was lost
+        raise error
+    return {write_error["idx"]: write_error.get("errmsg") for write_error in error.write_errors}
+
+
+def execute(db, operations):
+    """
+    Apply validated operations to the jobs collection as one unordered bulk write.
+
+    Returns:
+    tuple: (list of outcomes in operation order, totals)
+    """
+    try:
+        try:
+            result = db.client.bulk_write(write_models(operations, f"{db.name}.jobs"), ordered=False, verbose_results=True)
+            return verbose_results(operations, result, {})
+        except ClientBulkWriteException as e:
+            return verbose_results(operations, e.partial_result, _client_write_errors(e))
+    except InvalidOperation:
+        # MongoDB before 8.0 has no client-level bulkWrite
+        pass
+
+    try:
+        result_document = db.jobs.bulk_write(write_models(operations), ordered=False).bulk_api_result
+        write_errors = {}
+    except BulkWriteError as e:
+        result_document = e.details
+        write_errors = {write_error["index"]: write_error.get("errmsg") for write_error in e.details.get("writeErrors", [])}
+    return collection_results(operations, result_document, write_errors)
+
+
+async def execute_async(db, operations):
+    """
+    execute() through the async client.
+    """
+    try:
+        try:
+            result = await db.client.bulk_write(write_models(operations, f"{db.name}.jobs"), ordered=False, verbose_results=True)
+            return verbose_results(operations, result, {})
+        except ClientBulkWriteException as e:
+            return verbose_results(operations, e.partial_result, _client_write_errors(e))
+    except InvalidOperation:
+        pass
+
+    try:
+        result_document = (await db.jobs.bulk_write(write_models(operations), ordered=False)).bulk_api_result
+        write_errors = {}
+    except BulkWriteError as e:
+        result_document = e.details
+        write_errors = {write_error["index"]: write_error.get("errmsg") for write_error in e.details.get("writeErrors", [])}
+    return collection_results(operations, result_document, write_errors)
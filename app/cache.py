@@ -0,0 +1,271 @@
+'''Module for caching query results and invalidating them when the data changes'''
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from app import utils
+
+
+def make_key(route, body):
+    """
+    Build the cache key for a request from its route and normalized JSON body.
+    The 'fields' projection is sorted so the same fields in any order share an entry.
+
+    Returns:
+    str: The cache key
+    """
+    body = dict(body) if isinstance(body, dict) else {}
+    if isinstance(body.get('fields'), list):
+        body['fields'] = sorted({str(field) for field in body['fields']})
+    normalized = json.dumps(body, sort_keys=True, separators=(',', ':'), default=utils.json_default)
+    return f"{route}:{hashlib.sha1(normalized.encode('utf-8')).hexdigest()}"
+
+
+class MemoryBackend:
+    """
+    Bounded in-process backend: least recently used entries are evicted once
+    max_entries is reached, and every entry expires after ttl seconds.
+
+    Invalidations are numbered, and the number of the last invalidation of each tag is
+    kept for the max_tags most recently invalidated tags. A load records the number
+    before it runs, and its result is not stored if one of its tags was invalidated
+    since. Once a tag's record is dropped, any load that started before it is refused.
+    """
+
+    def __init__(self, max_entries=1024, ttl=300, max_tags=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_tags = max_tags or max_entries * 4
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (expires_at, value, tags)
+        self._tag_keys = defaultdict(set)
+        self._sequence = 0
+        self._tag_invalidated = OrderedDict()  # tag -> number of its last invalidation
+        self._forgotten = 0  # highest number dropped from _tag_invalidated
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                self._remove(key)
+                self.evictions += 1
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def tag_versions(self, tags):
+        with self._lock:
+            return {tag: self._sequence for tag in tags}
+
+    def set(self, key, value, tags, versions):
+        with self._lock:
+            # The data was invalidated while it was being loaded, so it may already be stale
+            if any(self._tag_invalidated.get(tag, self._forgotten) > started for tag, started in versions.items()):
+                return False
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, value, tags)
+            for tag in tags:
+                self._tag_keys[tag].add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+            return True
+
+    def invalidate(self, tags):
+        with self._lock:
+            removed = 0
+            self._sequence += 1
+            for tag in tags:
+                self._tag_invalidated[tag] = self._sequence
+                self._tag_invalidated.move_to_end(tag)
+                for key in self._tag_keys.pop(tag, set()):
+                    if key in self._entries:
+                        self._remove(key)
+                        removed += 1
+            while len(self._tag_invalidated) > self.max_tags:
+                _, sequence = self._tag_invalidated.popitem(last=False)
+                self._forgotten = max(self._forgotten, sequence)
+            return removed
+
+    def size(self):
+        return len(self._entries)
+
+    def _remove(self, key):
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tag_keys.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tag_keys[tag]
+
+
+class RedisBackend:
+    """
+    Backend shared by every API process through Redis, so an invalidation in one
+    worker is seen by all of them. Requires the optional 'redis' package.
+    """
+
+    prefix = 'careerhub:cache:'
+
+    def __init__(self, url, ttl=300):
+        try:
+            import redis
+        except ImportError:
+            raise ImportError("The redis cache backend requires the 'redis' package (pip install redis)")
+        self.ttl = ttl
+        self._redis = redis.Redis.from_url(url)
+
+    @property
+    def evictions(self):
+        # Entries are evicted by Redis itself (TTL expiry or maxmemory)
+        return int(self._redis.info('stats').get('evicted_keys', 0))
+
+    def get(self, key):
+        value = self._redis.get(self.prefix + 'entry:' + key)
+        return json.loads(value) if value is not None else None
+
+    def tag_versions(self, tags):
+        if not tags:
+            return {}
+        versions = self._redis.mget([self.prefix + 'version:' + tag for tag in tags])
+        return {tag: int(version or 0) for tag, version in zip(tags, versions)}
+
+    def set(self, key, value, tags, versions):
+        import redis
+
+        version_keys = [self.prefix + 'version:' + tag for tag in tags]
+        with self._redis.pipeline() as pipe:
+            try:
+                # WATCH aborts the write if any tag is invalidated before EXEC
+                if version_keys:
+                    pipe.watch(*version_keys)
+                current = pipe.mget(version_keys) if version_keys else []
+                if any(int(version or 0) != versions[tag] for tag, version in zip(tags, current)):
+                    return False
+                pipe.multi()
+                pipe.setex(self.prefix + 'entry:' + key, self.ttl, json.dumps(value, default=utils.json_default))
+                for tag in tags:
+                    pipe.sadd(self.prefix + 'tag:' + tag, key)
+                    pipe.expire(self.prefix + 'tag:' + tag, self.ttl)
+                pipe.execute()
+                return True
+            except redis.WatchError:
+                return False
+
+    def invalidate(self, tags):
+        removed = 0
+        for tag in tags:
+            tag_key = self.prefix + 'tag:' + tag
+            with self._redis.pipeline() as pipe:
+                pipe.incr(self.prefix + 'version:' + tag)
+                # A version only has to outlive the loads running when it changed
+                pipe.expire(self.prefix + 'version:' + tag, self.ttl)
+                pipe.smembers(tag_key)
+                pipe.delete(tag_key)
+                _, _, keys, _ = pipe.execute()
+            if keys:
+                removed += self._redis.delete(*[self.prefix + 'entry:' + key.decode('utf-8') for key in keys])
+        return removed
+
+    def size(self):
+        return sum(1 for _ in self._redis.scan_iter(match=self.prefix + 'entry:*', count=1000))
+
+
+class ResultCache:
+    """
+    Read-through cache for route results. Entries are tagged with the data they were
+    built from (eg. 'industry:Finance', 'company:TechCorp') and the write
+    routes invalidate those tags, so a cached result is never served after its data changed.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+
+    def get_or_load(self, key, tags, loader):
+        """
+        Return the cached result for key, or call loader() and cache what it returns.
+        A loader result of None (eg. nothing found) is returned but not cached.
+        """
+        if self.backend is None:
+            return loader()
+
+        value = self._lookup(key)
+        if value is not None:
+            return value
+
+        # Remember the tag versions before loading, so a write that lands while the
+        # query runs stops this (possibly stale) result from being stored
+        versions = self.backend.tag_versions(tags)
+        value = loader()
+        if value is not None:
+            self.backend.set(key, value, tags, versions)
+        return value
+
+    def _lookup(self, key):
+        value = self.backend.get(key)
+        with self._lock:
+            if value is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return value
+
+    def invalidate(self, tags):
+        """
+        Drop every cached result built from any of the given tags.
+
+        Returns:
+        int: The number of entries removed
+        """
+        tags = sorted({tag for tag in tags if tag})
+        if self.backend is None or not tags:
+            return 0
+        with self._lock:
+            self.invalidations += len(tags)
+        return self.backend.invalidate(tags)
+
+    def stats(self):
+        """
+        Returns:
+        dict: Hit, miss, eviction and invalidation counters
+        """
+        if self.backend is None:
+            return {'backend': 'none'}
+        with self._lock:
+            hits, misses, invalidations = self.hits, self.misses, self.invalidations
+        lookups = hits + misses
+        return {
+            'backend': type(self.backend).__name__,
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / lookups, 4) if lookups else 0.0,
+            'evictions': self.backend.evictions,
+            'invalidations': invalidations,
+            'size': self.backend.size()
+        }
+
+
+def create_cache(config):
+    """
+    Build the result cache selected by the configuration module.
+
+    Returns:
+    ResultCache: The configured cache
+    """
+    if config.CACHE_BACKEND == 'none':
+        return ResultCache()
+    if config.CACHE_BACKEND == 'redis':
+        return ResultCache(RedisBackend(config.CACHE_REDIS_URL, ttl=config.CACHE_TTL_SECONDS))
+    return ResultCache(MemoryBackend(max_entries=config.CACHE_MAX_ENTRIES, ttl=config.CACHE_TTL_SECONDS))
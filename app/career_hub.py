@@ -2,29 +2,183 @@
 
 # Import libraries 
 from app import app 
-from bson.json_util import dumps, loads
-from bson import ObjectId
-from flask import request, jsonify
-import json
-import ast 
-from importlib.machinery import SourceFileLoader
-from pymongo import MongoClient
-from bson.objectid import ObjectId
-from bson.errors import InvalidId
-from datetime import datetime
+from flask import Response, request, jsonify
+from pymongo.errors import BulkWriteError
 
 
 
-# 1. Connect to the client 
-client = MongoClient("mongodb://mongodb:27017/") 
+from app import utils 
+from app import batch, cache, companies, config, confirmations, handlers, industry_stats, lifecycle, metrics, salary_columns, search, skill_index
+from app.constants import (
+    JOB_ID_BLOCK_SIZE, SALARY_SORT, EXPERIENCE_SORT, INDUSTRY_SORT, TOP_COMPANIES_SORT_KEYS,
+    MAX_BULK_JOB_POSTS, UPDATE_INSTRUCTIONS, DELETE_INSTRUCTIONS
+)
+from app.db import get_db, pool_metrics
 
-# Import the utils module
-utils = SourceFileLoader('*', './app/utils.py').load_module() # load in functions in utils.py
+# Cache for industry, company and top-companies results, invalidated by the write routes
+result_cache = cache.create_cache(config)
 
-# 2. Select the database
-db = client.careerhub 
+job_id_allocator = utils.JobIdAllocator(get_db, block_size=JOB_ID_BLOCK_SIZE)
 
-from app import utils 
+# Company fields of jobs in the normalized schema are looked up here
+company_table = companies.CompanyTable(get_db, ttl=config.COMPANY_TABLE_TTL_SECONDS)
+
+# Skill token -> job ids, answers /match without scanning the jobs collection
+job_skill_index = skill_index.SkillIndex(get_db, ttl=config.SKILL_INDEX_TTL_SECONDS)
+
+# Salary and category columns of every job, answers /salary_stats without querying MongoDB
+salary_column_store = salary_columns.SalaryColumns(get_db, ttl=config.SALARY_COLUMNS_TTL_SECONDS)
+
+
+def industry_stats_refreshed(industries):
+    # Drop the cached results built from the statistics the refresher just rewrote
+    result_cache.invalidate(industry_stats.cache_tags(industries))
+
+
+# Rewrites the industry_stats documents of the industries whose jobs changed
+stats_refresher = industry_stats.IndustryStatsRefresher(
+    get_db,
+    interval=config.INDUSTRY_STATS_REFRESH_SECONDS,
+    full_interval=config.INDUSTRY_STATS_FULL_REFRESH_SECONDS,
+    on_refresh=industry_stats_refreshed
+)
+
+# Moves postings past closing_date + grace days to jobs_archive (with CAREERHUB_JOB_EXPIRY_POLICY=archive)
+expiry_sweeper = lifecycle.JobExpirySweeper(
+    get_db,
+    interval=config.JOB_EXPIRY_SWEEP_SECONDS,
+    grace_days=config.JOB_EXPIRY_GRACE_DAYS,
+    batch_size=config.JOB_EXPIRY_BATCH_SIZE,
+    on_sweep=lambda result: jobs_changed(result["job_ids"], result["industries"])
+)
+
+
+def start_services():
+    """
+    Build the skill index (behind /match) and salary columns (behind /salary_stats)
+    before requests are served, and start the industry statistics refresher so the
+    scheduled full refreshes run, and the expiry sweeper when expired jobs are archived.
+    Called once in each serving process (gunicorn's post_worker_init, run-app_docker.py).
+
+    Returns:
+    list: (name, error) of the stores that could not be built
+    """
+    errors = []
+    for name, store in (("skill index", job_skill_index), ("salary columns", salary_column_store)):
+        try:
+            store.load()
+        except Exception as e:
+            errors.append((name, e))
+    stats_refresher.start()
+    if config.JOB_EXPIRY_POLICY == 'archive':
+        expiry_sweeper.start()
+    return errors
+
+
+def start_request_metrics():
+    metrics.start_request()
+
+
+def record_request_metrics(response):
+    """
+    Record the request in the /metrics histograms once its response has been sent. A
+    streamed response is counted as it is sent, so its time and size cover the whole stream.
+    """
+    stats = metrics.current_request()
+    if stats is None:
+        return response
+    labels = (metrics.route_label(request.url_rule), request.method, response.status_code)
+    if response.is_streamed:
+        sent = [0]
+        response.response = metrics.counted_body(response.response, sent)
+        response.call_on_close(lambda: metrics.request_metrics.record(stats, *labels, sent[0]))
+    else:
+        size = response.content_length
+        response.call_on_close(lambda: metrics.request_metrics.record(stats, *labels, size))
+    return response
+
+
+# Per-route latency, payload size, JSON encoding and MongoDB time, served on /metrics
+if config.METRICS_ENABLED:
+    metrics.time_serialization(app.json)
+    app.before_request(start_request_metrics)
+    app.after_request(record_request_metrics)
+
+def jobs_changed(job_ids=(), industries=(), fields=None):
+    """
+    Called by every route that writes to the jobs or industries collections so anything
+    derived from those documents is refreshed: the affected cached results are dropped,
+    the changed jobs are re-read into the skill index and queued for the salary columns,
+    and the industry statistics of the changed industries are queued for a refresh.
+    fields are the job fields an update set (None when jobs were created or deleted),
+    the skill index is only refreshed when they include a skill field. job_ids and
+    industries are None when too many jobs changed to list them: then every cached
+    industry result is dropped, and the skill index, salary columns and statistics of
+    every industry are rebuilt.
+    """
+    if job_ids is None:
+        result_cache.invalidate(industry_stats.cache_tags(None))
+        if skill_index.skills_changed(fields):
+            job_skill_index.expire()
+        salary_column_store.expire()
+        stats_refresher.mark(None)
+        return
+    result_cache.invalidate([f"industry:{industry}" for industry in industries if industry])
+    if skill_index.skills_changed(fields):
+        job_skill_index.refresh_jobs(job_ids)
+    salary_column_store.refresh_jobs(job_ids)
+    stats_refresher.mark(industries)
+
+
+def plan_company_fields(projection):
+    """
+    With the normalized job schema, the company fields are not stored on jobs. Plan the
+    jobs query so the requested company fields can be filled in from the company table.
+
+    Returns:
+    tuple: (projection for the jobs query, function that completes a list of jobs)
+    """
+    if config.JOB_SCHEMA != 'normalized':
+        return projection, None
+    projection, fields, drop = companies.plan_projection(projection)
+    if not fields:
+        return projection, None
+    return projection, lambda jobs: companies.complete_jobs(jobs, company_table.companies(), fields, drop)
+
+
+def list_jobs(body, query, projection, sort_keys, not_found, count_total=False):
+    """
+    Answer a job listing route: stream every matching job as NDJSON if the client asked
+    for it, or else return one page of jobs ordered by sort_keys (seeking past the previous
+    page), with the total number of matching jobs when count_total is set.
+    """
+    db = get_db()
+
+    # Company fields are looked up separately in the normalized schema
+    projection, complete_jobs = plan_company_fields(projection)
+
+    # Archived postings are only read when asked for
+    archived = lifecycle.include_expired(body)
+
+    # Stream the matching jobs one batch at a time if the client asked for NDJSON
+    if utils.wants_stream(request):
+        cursor = lifecycle.find_jobs(db, query, projection, archived).batch_size(utils.STREAM_BATCH_SIZE)
+        return Response(utils.ndjson_lines(cursor, complete_jobs), mimetype=utils.NDJSON_MIMETYPE), 200
+
+    # Read the page size and continuation token, and fetch the page
+    limit, after = handlers.page_params(body, request.args, len(sort_keys))
+    jobs, next_cursor = lifecycle.find_page(db, query, projection, sort_keys, limit, after, archived)
+    if complete_jobs:
+        jobs = complete_jobs(jobs)
+
+    total_jobs = None
+    if count_total and (jobs or after):
+        total_jobs = db.jobs.count_documents(query)
+        if archived:
+            total_jobs += db[lifecycle.ARCHIVE_COLLECTION].count_documents(query)
+
+    payload, status = handlers.jobs_page(jobs, next_cursor, limit, after, not_found, total_jobs)
+    return jsonify(payload), status
 
 
 @app.route("/")
@@ -48,6 +202,16 @@ def get_initial_response():
                 'method': 'POST',
                 'description': 'Create a new job posting'
             },
+            {
+                'path': '/create/jobPosts/bulk',
+                'method': 'POST',
+                'description': 'Create many job postings from a JSON array or NDJSON'
+            },
+            {
+                'path': '/jobPosts/batch',
+                'method': 'POST',
+                'description': 'Update or delete the jobs matching a list of filters in one bulk write'
+            },
             {
                 'path': 'search_by_job_id /<job_id>',
                 'method': 'GET',
@@ -78,6 +242,26 @@ def get_initial_response():
                 'path': '/top_companies_by_industry',
                 'method': 'GET',
                 'description': 'Fetch top companies in a given industry'
+            },
+            {
+                'path': '/search',
+                'method': 'GET',
+                'description': 'Full-text job search with filters and facet counts'
+            },
+            {
+                'path': '/industry_stats',
+                'method': 'GET',
+                'description': 'Fetch the precomputed job, salary and company statistics of an industry'
+            },
+            {
+                'path': '/salary_stats',
+                'method': 'GET',
+                'description': 'Salary histogram, percentiles and mean by industry, experience level, employment type or remote'
+            },
+            {
+                'path': '/match',
+                'method': 'GET',
+                'description': 'Find the jobs that best match a list of skills'
             }
         ],
         'note': 'All POST endpoints provide detailed instructions when accessed with a GET request'
@@ -118,47 +302,164 @@ def create_job_post():
 
     try:
         # Select the collections
-        jobs_collection = db.jobs
-        industries_collection = db.industries
-        
-        # Get the data from the request
-        data = request.json
-        
-        # Validate that required fields are present 
-        if not data.get('title') or not data.get('industry') or not data.get('company_name'):
-            return jsonify({'error': 'Title, industry, and company name are required fields'}), 400
-        
-        # Prepare the job post with all provided fields
-        job_post = {key: value for key, value in data.items()}
-        job_post['created_at'] = datetime.utcnow()
-
-        # Generate a unique job_id
-        job_post['job_id'] = utils.generate_unique_job_id(jobs_collection)
-
-        # Check if the industry exists in the industries collection
-        industry = industries_collection.find_one({"industry_name": data['industry'].capitalize()})
-        
-        new_industry_added = False
-        if not industry:
-            # Add the new industry to the industries collection
-            industries_collection.insert_one({"industry_name": data['industry'].capitalize()})
-            new_industry_added = True
+        jobs_collection = get_db().jobs
+        industries_collection = get_db().industries
+
+        # Validate the job post and generate a unique job_id
+        job_post = handlers.new_job_post(request.json)
+        job_post['job_id'] = job_id_allocator.next_id()
+
+        # Check if the industry exists in the industries collection, and add it if not
+        industry_name = handlers.industry_name(job_post)
+        new_industry_added = not industries_collection.find_one({"industry_name": industry_name})
+        if new_industry_added:
+            industries_collection.insert_one({"industry_name": industry_name})
 
         # Insert the job post into the database
         result = jobs_collection.insert_one(job_post)
 
-        if result.inserted_id:
-            response = {
-                'message': 'Job post created successfully', 
-                'job_id': job_post['job_id']
-            }
-            # Provide additional information if a new industry was added so user knows they can add more information about the industry if they want 
-            if new_industry_added:
-                response['additional_info'] = f"A new industry '{data['industry']}' was added to the database. You can use the add_industry_info function to provide more details about it if you want."
-            return jsonify(response), 201
-        else:
-            return jsonify({'error': 'Failed to create job post'}), 500 # Internal server error
+        # The new job can change the industry info and top companies of its industry
+        jobs_changed([job_post['job_id']], handlers.job_industries([job_post]))
+
+        payload, status = handlers.job_post_created(result, job_post, new_industry_added)
+        return jsonify(payload), status
+
+    except handlers.ErrorResponse as e:
+        return jsonify(e.payload), e.status
+    except Exception as e:
+        return jsonify({'error': 'An unexpected error occurred', 'details': str(e)}), 500 # Internal server error
+
+
+
+@app.route("/create/jobPosts/bulk", methods=['POST', 'GET'])
+def create_job_posts_bulk():
+    """
+    User can create many job postings in one request, eg. when onboarding a partner feed.
+    Each record is validated with the same rules as /create/jobPost.
+
+    Endpoint: http://localhost:5001/create/jobPosts/bulk
+
+    Example body (a JSON array, or NDJSON with Content-Type: application/x-ndjson):
+        [
+            {"title": "Data Engineer", "industry": "Finance", "company_name": "DataPulse Systems"},
+            {"title": "Data Analyst", "company_name": "NexaCore Tech"}
+        ]
+
+    Example response:
+        {
+        "message": "Created 1 of 2 job posts",
+        "created_count": 1,
+        "failed_count": 1,
+        "results": [
+            {"index": 0, "status": "created", "job_id": 102},
+            {"index": 1, "status": "invalid", "error": "Title, industry, and company name are required fields"}
+        ]
+        }
+    """
+    if request.method == 'GET':
+        return jsonify({
+            "message": f"This endpoint creates many job postings at once. Send a POST request with a JSON array of job posts, or NDJSON (one job post per line) with Content-Type 'application/x-ndjson'. Each job post follows the same rules as /create/jobPost. Up to {MAX_BULK_JOB_POSTS} job posts are accepted per request and the response reports the result of every record."
+        }), 200
 
+    try:
+        # Select the collections
+        jobs_collection = get_db().jobs
+        industries_collection = get_db().industries
+
+        # Validate every record, keeping the position of the valid ones
+        results, job_posts = handlers.bulk_job_posts(request.get_data(), request.content_type)
+
+        # Allocate all job_ids in one block
+        for job_post, job_id in zip(job_posts.values(), job_id_allocator.allocate(len(job_posts))):
+            job_post['job_id'] = job_id
+
+        # Add every new industry with a single bulk upsert
+        new_industries = []
+        industry_names, upserts = handlers.industry_upserts(job_posts.values())
+        if upserts:
+            result = industries_collection.bulk_write(upserts, ordered=False)
+            new_industries = [industry_names[position] for position in result.upserted_ids]
+
+        # Insert the job posts in chunks, an unordered insert keeps going past a failed document
+        for chunk in handlers.insert_chunks(job_posts):
+            try:
+                jobs_collection.insert_many([job_post for _, job_post in chunk], ordered=False)
+                handlers.record_inserts(results, chunk)
+            except BulkWriteError as e:
+                handlers.record_inserts(results, chunk, e)
+
+        jobs_changed([job_post['job_id'] for job_post in job_posts.values()], handlers.job_industries(job_posts.values()))
+
+        payload, status = handlers.bulk_created(results, new_industries)
+        return jsonify(payload), status
+
+    except handlers.ErrorResponse as e:
+        return jsonify(e.payload), e.status
+    except Exception as e:
+        return jsonify({'error': 'An unexpected error occurred', 'details': str(e)}), 500 # Internal server error
+
+
+
+@app.route("/jobPosts/batch", methods=['POST', 'GET'])
+def batch_update_jobs():
+    """
+    User can update or delete the jobs matching any number of filters in one request, eg.
+    re-pricing every job at a company or removing postings past their closing date. The
+    operations are applied as one unordered bulk write.
+
+    Endpoint: http://localhost:5001/jobPosts/batch
+
+    Example body (a JSON array, or NDJSON with Content-Type: application/x-ndjson):
+        [
+            {"filter": {"company_name": "DataDive Analytics"}, "update": {"average_salary": 90000}},
+            {"filter": {"closing_date": {"$lt": {"$date": "2024-01-01T00:00:00Z"}}}, "delete": true}
+        ]
+
+    Each filter is a MongoDB query on the jobs collection, in Extended JSON so dates can
+    be compared with {"$date": ...}, and each update sets fields from the same whitelist
+    as /update_by_job_title (description, average_salary, location).
+
+    Example response (matched/modified/deleted counts per operation need MongoDB 8.0+,
+    older servers only report the totals and give each applied operation "counts": null):
+        {
+        "message": "Applied 2 of 2 operations",
+        "applied_count": 2,
+        "failed_count": 0,
+        "matched_count": 12,
+        "modified_count": 12,
+        "deleted_count": 40,
+        "results": [
+            {"index": 0, "status": "applied", "matched_count": 12, "modified_count": 12},
+            {"index": 1, "status": "applied", "deleted_count": 40}
+        ]
+        }
+    """
+    if request.method == 'GET':
+        return jsonify({
+            "message": f"This endpoint updates or deletes the jobs matching many filters at once. Send a POST request with a JSON array (or NDJSON) of operations, each {{\"filter\": {{...}}, \"update\": {{...}}}} or {{\"filter\": {{...}}, \"delete\": true}}. Updates can set {', '.join(utils.UPDATABLE_FIELDS)}. Up to {batch.MAX_BATCH_OPERATIONS} operations are accepted per request and the response reports the result of every operation."
+        }), 200
+
+    try:
+        db = get_db()
+
+        # Validate every operation, keeping the position of the valid ones
+        results, operations = handlers.batch_operations(request.get_data(), request.content_type)
+
+        outcomes, totals = [], None
+        if operations:
+            parsed = [operation for _, operation in operations]
+
+            # Read which jobs the batch touches before deleted ones are gone
+            job_ids, industries = batch.affected_jobs(db, parsed)
+
+            outcomes, totals = batch.execute(db, parsed)
+            jobs_changed(job_ids, industries, batch.written_fields(parsed))
+
+        payload, status = handlers.batch_applied(results, operations, outcomes, totals)
+        return jsonify(payload), status
+
+    except handlers.ErrorResponse as e:
+        return jsonify(e.payload), e.status
     except Exception as e:
         return jsonify({'error': 'An unexpected error occurred', 'details': str(e)}), 500 # Internal server error
 
@@ -193,35 +494,22 @@ def add_industry_info():
         }), 200
 
     try:
-        # Select the industries collection
-        industries_collection = db.industries
-        
-        # Get the data from the request
-        data = request.json
-        
-        # Validate that industry_name is present
-        if not data.get('industry_name'):
-            return jsonify({'error': 'industry_name is a required field'}), 400 # Bad request
-        
-        # Prepare the industry document
-        industry_doc = {key: value for key, value in data.items() if key != 'industry_name'}
-        
-        # Update the industry information 
-        result = industries_collection.update_one(
-            {"industry_name": data['industry_name']},
+        # Validate that industry_name is present and prepare the industry document
+        industry_name, industry_doc = handlers.industry_info_update(request.json)
+
+        # Update the industry information
+        result = get_db().industries.update_one(
+            {"industry_name": industry_name},
             {"$set": industry_doc},
             upsert=True
         )
+        jobs_changed(industries=[industry_name])
 
-        if result.modified_count > 0 or result.upserted_id:
-            action = "updated" if result.modified_count > 0 else "added"
-            return jsonify({
-                'message': f'Industry information {action} successfully',
-                'industry_name': data['industry_name']
-            }), 200
-        else:
-            return jsonify({'error': 'Failed to add/update industry information'}), 500 # Internal server error
+        payload, status = handlers.industry_info_saved(result, industry_name)
+        return jsonify(payload), status
 
+    except handlers.ErrorResponse as e:
+        return jsonify(e.payload), e.status
     except Exception as e:
         return jsonify({'error': 'An unexpected error occurred', 'details': str(e)}), 500 # Internal server error
 
@@ -251,31 +539,30 @@ def view_job_details(job_id):
     """
     try:
         # Select the jobs collection
-        jobs_collection = db.jobs
+        jobs_collection = get_db().jobs
 
         # Convert job_id to integer
         job_id = int(job_id)
 
-        projection = {'_id': 0}
-        
         # Check if the request has a body and if it's JSON
+        body = None
         if request.content_length:
-            if request.is_json:
-                print("inside second if")
-                body = request.json
-                if body and 'fields' in body:
-                    for field in body['fields']:
-                        projection[field] = 1
-            else:
+            if not request.is_json:
                 return jsonify({"error": "Invalid JSON in request body"}), 400
+            body = request.json
+        projection, archived = handlers.job_details_projection(body)
+
+        # Company fields are looked up separately in the normalized schema
+        query_projection, complete_jobs = plan_company_fields(projection)
 
-        # Find the job by job_id
-        job = jobs_collection.find({"job_id": job_id}, projection)
+        # Find the job by job_id; archived postings are only looked up when asked for
+        job = list(jobs_collection.find({"job_id": job_id}, query_projection))
+        if not job and archived:
+            job = list(jobs_collection.database[lifecycle.ARCHIVE_COLLECTION].find({"job_id": job_id}, lifecycle.archive_projection(query_projection)))
+        if complete_jobs:
+            job = complete_jobs(job)
 
-        if job:
-            return jsonify(list(job)), 200 
-        else:
-            return jsonify({"error": "Job not found"}), 404 # Not found
+        return jsonify(job), 200
 
     except ValueError:
         return jsonify({"error": "Invalid job_id format"}), 400 # Bad request
@@ -287,127 +574,38 @@ def view_job_details(job_id):
 @app.route("/update_by_job_title", methods=['GET', 'POST'])
 def update_job_details():
     try:
-        # Select the jobs collection
-        jobs_collection = db.jobs
-
         # If it's a GET request, provide instructions
         if request.method == 'GET':
-            return jsonify({
-                "message": "To update a job, follow these steps:",
-                "instructions": {
-                    "1": "Send a POST request to this endpoint with the job title, at least one other field, and update data",
-                    "2": "If job(s) are found, you'll receive a confirmation request",
-                    "3": "Send another POST request with 'confirm_update' to finalize the update"
-                },
-                "example": {
-                    "first_request": {
-                       "title": "<job title>",
-                       "job_id": "<job_id>", 
-                       "company_name": "<company name>",  
-                       "employment_type": "<employment type>",  
-                       "update": {
-                           "description": "New description",
-                           "average_salary": 75000,
-                           "location": "New location"
-                       }
-                    },
-                    "confirmation_request": {
-                        "title": "<job title>",
-                        "job_id": "<job_id>",  
-                        "company_name": "<company name>", 
-                        "employment_type": "<employment type>", 
-                        "update": {
-                            "description": "New description",
-                            "average_salary": 75000,
-                            "location": "New location"
-                        },
-                        "confirm_update": "true"
-                    }
-                }
-            }), 200
-        
-        elif request.method == 'POST':
-            job_title = request.json.get('title')
-            job_id = request.json.get('job_id')
-            company_name = request.json.get('company_name')
-            employment_type = request.json.get('employment_type')
-            
-            # Validate input 
-            if not job_title:
-                return jsonify({"error": "Job title is required"}), 400
-
-            # Check if at least one additional field is provided
-            additional_fields = [job_id, company_name, employment_type]
-            if not any(additional_fields):
-                return jsonify({"error": "At least one additional field (job_id, company_name, or employment_type) is required"}), 400
-
-            # Build the query
-            query = {"title": job_title}
-            if job_id:
-                query["job_id"] = int(job_id)
-            if company_name:
-                query["company_name"] = company_name
-            if employment_type:
-                query["employment_type"] = employment_type
-            
-            # Find all jobs matching the query
-            jobs = list(jobs_collection.find(query))
-
-            if not jobs:
-                return jsonify({"error": "No jobs found matching the criteria"}), 404
-            
-            # If it's the first POST request, ask for confirmation
-            if 'confirm_update' not in request.json:
-                return jsonify({
-                    "message": f"Found {len(jobs)} job(s) matching the criteria. Are you sure you want to update these job(s)?",
-                    "job_count": len(jobs),
-                    "matching_job(s)": [
-                        {
-                            "title": job.get('title', 'N/A'),
-                            "company_name": job.get('company_name', 'N/A'),
-                            "employment_type": job.get('employment_type', 'N/A'),
-                            "description": job.get('description', 'N/A')
-                        } for job in jobs
-                    ],
-                    "instructions": "To confirm update, send another POST request with 'confirm_update:true' and the same search criteria"
-                }), 200
-
-            elif request.json.get('confirm_update') == 'true':
-                update_data = request.json.get('update', {})
-                
-                # Check if job_id is in the update data
-                if 'job_id' in update_data:
-                    return jsonify({
-                        "error": "The job_id field cannot be manually updated by users as it should remain unique.",
-                        "message": "Please remove job_id from your update request and try again."
-                    }), 400
-                
-                # Validate update data
-                updatable_fields = ['description', 'average_salary', 'location']
-                for field in update_data:
-                    if field not in updatable_fields:
-                        return jsonify({"error": f"Invalid update field: {field}"}), 400
-                
-                # Validate salary if provided
-                if 'average_salary' in update_data:
-                    try:
-                        update_data['average_salary'] = float(update_data['average_salary'])
-                    except ValueError:
-                        return jsonify({"error": "Invalid salary format"}), 400
-                
-                # Update all jobs matching the query in the database
-                result = jobs_collection.update_many(query, {"$set": update_data})
-                
-                if result.modified_count:
-                    return jsonify({"message": f"Successfully updated {result.modified_count} job(s) matching the criteria", "updated_fields": list(update_data.keys())}), 200
-                else:
-                    return jsonify({"message": "No changes were made"}), 200
-            else:
-                return jsonify({"error": "Invalid confirmation value"}), 400
-        
-        # If the method is neither GET nor POST
-        return jsonify({"error": "Invalid request method"}), 405
-    
+            return jsonify(UPDATE_INSTRUCTIONS), 200
+
+        # Validate input and build the query
+        body = request.json
+        query = handlers.update_criteria(body)
+
+        # If it's the first POST request, ask for confirmation
+        if 'confirm_update' not in body:
+            # Read the matching jobs once and bind a confirmation token to them
+            payload, status = handlers.update_preview(*confirmations.preview(get_db(), 'update', query, config.CONFIRM_MAX_JOBS, config.CONFIRM_TOKEN_TTL_SECONDS))
+            return jsonify(payload), status
+
+        handlers.check_confirmation(body, 'confirm_update')
+        update_data = handlers.job_update(body)
+
+        # The jobs shown by the preview, selected by _id
+        target, job_ids, industries = confirmations.confirm_target(get_db(), body.get('confirmation_token'), 'update', query)
+
+        # Update the confirmed jobs in the database
+        result = get_db().jobs.update_many(target, {"$set": update_data})
+        jobs_changed(job_ids, industries, update_data)
+
+        payload, status = handlers.jobs_updated(result, update_data)
+        return jsonify(payload), status
+
+    except handlers.ErrorResponse as e:
+        return jsonify(e.payload), e.status
+    except ValueError as e:
+        # The confirmation token is invalid, expired, used or was issued for other criteria
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": "An unexpected error occurred", "details": str(e)}), 500
 
@@ -441,92 +639,37 @@ def delete_by_job_title():
     
     """
     try:
-
         # If it's a GET request, provide instructions
         if request.method == 'GET':
-            return jsonify({
-                "message": "To delete a job, follow these steps:",
-                "instructions": {
-                    "1": "Send a POST request to this endpoint with the job title and optional parameters",
-                    "2": "If job(s) are found, you'll receive a confirmation request",
-                    "3": "Send another POST request with 'confirm_delete' to finalize deletion"
-                },
-                "example": {
-                    "first_request": {
-                       "job_title": "<job title>",
-                       "job_id": "<job_id>",  
-                       "company": "<company name>",  
-                       "employment_type": "<employment type>"  
-                    },
-                    "confirmation_request": {
-                        "job_title": "<job title>",
-                        "job_id": "<job_id>",  # Include if used in first request
-                        "company": "<company name>",  # Include if used in first request
-                        "employment_type": "<employment type>",  # Include if used in first request
-                        "confirm_delete": "true"
-                    }
-                }
-            }), 200
-
-
-        elif request.method == 'POST':
-            job_title = request.json.get('title')
-            job_id = request.json.get('job_id')
-            company = request.json.get('company')
-            employment_type = request.json.get('employment_type')
-            job_posting_url = request.json.get("job_posting_url")
-            
-            # Validate input needs to include one of the following: job_title, job_id, company_name, or employment_type
-            if not job_title or not any([job_id, company, employment_type]):
-                return jsonify({"error": "Job title and at least one additional field is required"}), 400
-
-            # Select the jobs collection
-            jobs_collection = db.jobs
-            
-            # Build the query
-            query = {"title": job_title}
-            if job_id:
-                query["job_id"] = int(job_id)
-            if company:
-                query["company_name"] = company
-            if employment_type:
-                query["employment_type"] = employment_type
-            if job_posting_url:
-                query["job_posting_url"] = job_posting_url
-            
-            # Find all jobs matching the query
-            jobs = list(jobs_collection.find(query))
-
-            if not jobs:
-                return jsonify({"error": "No jobs found matching the criteria"}), 404
-            
-            # If it's the first POST request, ask for confirmation
-            if 'confirm_delete' not in request.json:
-                return jsonify({
-                    "message": f"Found {len(jobs)} job(s) matching the criteria. Are you sure you want to delete these job(s)?",
-                    "job_count": len(jobs),
-                    "sample_job": {
-                        "title": jobs[0].get('title', 'N/A'),
-                        "job_id": jobs[0].get('job_id', 'N/A'),
-                        "company": jobs[0].get('company_name', 'N/A'),
-                        "employment_type": jobs[0].get('employment_type', 'N/A'),
-                        "description": jobs[0].get('description', 'N/A')
-                    },
-                    "instructions": "To confirm deletion, send another POST request with 'confirm_delete:true' and the same search criteria"
-                }), 200
-            
-            # If it's the POST to confirm deletion
-            elif request.json.get('confirm_delete') == 'true':
-                # Delete all jobs matching the query from the database
-                result = jobs_collection.delete_many(query)
-                
-                if result.deleted_count:
-                    return jsonify({"message": f"Successfully deleted {result.deleted_count} job(s) matching the criteria"}), 200
-                else:
-                    return jsonify({"error": "Failed to delete jobs"}), 500
-            else:
-                return jsonify({"error": "Invalid confirmation value"}), 400
-        
+            return jsonify(DELETE_INSTRUCTIONS), 200
+
+        # Validate input needs to include the title and one of job_id, company or employment_type
+        body = request.json
+        query = handlers.delete_criteria(body)
+
+        # If it's the first POST request, ask for confirmation
+        if 'confirm_delete' not in body:
+            # Read the matching jobs once and bind a confirmation token to them
+            payload, status = handlers.delete_preview(*confirmations.preview(get_db(), 'delete', query, config.CONFIRM_MAX_JOBS, config.CONFIRM_TOKEN_TTL_SECONDS))
+            return jsonify(payload), status
+
+        handlers.check_confirmation(body, 'confirm_delete')
+
+        # The jobs shown by the preview, selected by _id
+        target, job_ids, industries = confirmations.confirm_target(get_db(), body.get('confirmation_token'), 'delete', query)
+
+        # Delete the confirmed jobs from the database
+        result = get_db().jobs.delete_many(target)
+        jobs_changed(job_ids, industries)
+
+        payload, status = handlers.jobs_deleted(result)
+        return jsonify(payload), status
+
+    except handlers.ErrorResponse as e:
+        return jsonify(e.payload), e.status
+    except ValueError as e:
+        # The confirmation token is invalid, expired, used or was issued for other criteria
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": "An unexpected error occurred", "details": str(e)}), 500
 
@@ -538,6 +681,12 @@ def get_jobs_by_salary():
 
     Endpoint: http://localhost:5001/jobs_by_salary
 
+    Results are paginated: send "limit" (default 100, at most 1000) and the "cursor" returned
+    as next_cursor by the previous page to fetch the next one. next_cursor is null on the last page.
+
+    Large result sets can be streamed as NDJSON (one job per line) by sending
+    'Accept: application/x-ndjson' or "stream": true in the body.
+
     Required body:
     { 
         "min_salary": 85247,
@@ -558,47 +707,19 @@ def get_jobs_by_salary():
                 "company_name": "Nimbus Tech",
                 "title": "Machine Learning Engineer"
             }
-        ]
+        ],
+        "next_cursor": null,
+        "page_size": 100
     }
 
     """
     try:
-        min_salary = float(request.json.get('min_salary'))
-        max_salary = float(request.json.get('max_salary'))
-        fields = request.json.get('fields')
-
-        # Validate salary min and max fields 
-        if min_salary is None or max_salary is None:
-            return jsonify({"error": "Both min_salary and max_salary must be provided"}), 400
-
-        # Validate that min_salary is not greater than max_salary
-        if min_salary > max_salary:
-            return jsonify({"error": "min_salary cannot be greater than max_salary"}), 400
-
-        # Select the jobs collection
-        jobs_collection = db.jobs
-
-        # Query jobs within the salary range
-        query = {
-            "$and": [
-                {"average_salary": {"$gte": min_salary}},
-                {"average_salary": {"$lte": max_salary}}
-            ]
-        }
-
-        # Set up projection based on user-specified fields
-        projection = {"_id": 0}
-        if fields:
-            for field in fields:
-                projection[field] = 1
-        
-        jobs = list(jobs_collection.find(query, projection))
-
-        if jobs:
-            return jsonify({"jobs": jobs}), 200
-        else:
-            return jsonify({"message": "No jobs found in the specified salary range"}), 404
+        body = request.json
+        query, projection, not_found = handlers.salary_range(body)
+        return list_jobs(body, query, projection, SALARY_SORT, not_found)
 
+    except handlers.ErrorResponse as e:
+        return jsonify(e.payload), e.status
     except Exception as e:
         return jsonify({"error": "An unexpected error occurred", "details": str(e)}), 500
 
@@ -610,6 +731,12 @@ def get_jobs_by_experience():
 
     Endpoint: http://localhost:5001/jobs_by_experience
 
+    Results are paginated: send "limit" (default 100, at most 1000) and the "cursor" returned
+    as next_cursor by the previous page to fetch the next one. next_cursor is null on the last page.
+
+    Large result sets can be streamed as NDJSON (one job per line) by sending
+    'Accept: application/x-ndjson' or "stream": true in the body.
+
     Required body:
     {
         "experience_level": "Senior Level"
@@ -640,58 +767,13 @@ def get_jobs_by_experience():
         ...
     }
     """
-
     try:
-        experience_level_input = request.json.get('experience_level')
-        fields = request.json.get('fields')
-
-        if not experience_level_input:
-            return jsonify({"error": "experience_level parameter must be provided"}), 400
-        
-        # Set up projection based on user-specified fields
-        projection = {"_id": 0}
-
-        # Handle both single string and list inputs
-        if isinstance(experience_level_input, str):
-            experience_levels = [experience_level_input]
-        
-        elif isinstance(experience_level_input, list):
-            experience_levels = experience_level_input
-            projection["experience_level"] = 1
-
-        else:
-            return jsonify({"error": "experience_level must be a string or a list of strings"}), 400
-
-        levels = []
-        for level in experience_levels:
-            level = level.lower()
-            if "entry" in level:
-                levels.append("Entry Level")
-            elif "mid" in level:
-                levels.append("Mid Level")
-            elif "senior" in level:
-                levels.append("Senior Level")
-            else:
-                return jsonify({"message": f"{level} is not a valid experience level in the career hub. Valid options include Entry Level, Mid Level, and Senior Level"}), 404
-
-        # Select the jobs collection
-        jobs_collection = db.jobs
-
-        # Query jobs with the specified experience level(s)
-        query = {"experience_level": {"$in": levels}}
-        
-        # Set up projection based on user-specified fields
-        if fields:
-            for field in fields:
-                projection[field] = 1
-        
-        jobs = list(jobs_collection.find(query, projection))
-
-        if jobs:
-            return jsonify({"jobs": jobs}), 200
-        else:
-            return jsonify({"message": f"No jobs found for experience level(s): {', '.join(levels)}"}), 404
+        body = request.json
+        query, projection, not_found = handlers.experience_levels(body)
+        return list_jobs(body, query, projection, EXPERIENCE_SORT, not_found)
 
+    except handlers.ErrorResponse as e:
+        return jsonify(e.payload), e.status
     except Exception as e:
         return jsonify({"error": "An unexpected error occurred", "details": str(e)}), 500
 
@@ -704,6 +786,9 @@ def get_top_companies_by_industry():
 
     Endpoint: http://localhost:5001/top_companies_by_industry
 
+    Results are paginated: send "limit" (default 100, at most 1000) and the "cursor" returned
+    as next_cursor by the previous page to fetch the next one. next_cursor is null on the last page.
+
     Required body:
     {
         "industry_name": "Finance"
@@ -726,40 +811,40 @@ def get_top_companies_by_industry():
                 "company_name": "EagleEye Data",
                 "job_count": 1
             }
-        ]
+        ],
+        "next_cursor": "WzEsIkVhZ2xlRXllIERhdGEiXQ",
+        "page_size": 100
     }
     """
     try:
-        industry = request.json.get('industry_name')
-
-        if not industry:
-            return jsonify({"error": "industry parameter must be provided"}), 400
-
-        # Select the jobs collection
-        jobs_collection = db.jobs
-
-        # Aggregate pipeline to get top companies
-        pipeline = [
-            {"$match": {"industry_name": industry}},
-            {"$group": {
-                "_id": "$company_name",
-                "job_count": {"$sum": 1}
-            }},
-            {"$sort": {"job_count": -1}},
-            {"$project": {
-                "_id": 0,
-                "company_name": "$_id",
-                "job_count": 1
-            }}
-        ]
-
-        top_companies = list(jobs_collection.aggregate(pipeline))
+        body = request.json
+        industry = handlers.required(body, 'industry_name', "industry parameter must be provided")
+
+        # Read the page size and continuation token
+        limit, after = handlers.page_params(body, request.args, TOP_COMPANIES_SORT_KEYS)
+
+        def load_top_companies():
+            # One page of top companies (one extra to know if there is a next page) from the
+            # industry's statistics document, or aggregated from the jobs when the industry
+            # has no statistics yet or the page is past the companies stored there
+            stats = get_db()[industry_stats.STATS_COLLECTION].find_one({"_id": industry}, {"top_companies": 1, "company_count": 1})
+            page = industry_stats.top_companies_page(stats, after, limit + 1) if stats else None
+            if page is None:
+                page = list(get_db().jobs.aggregate(utils.top_companies_pipeline(industry, after=after, limit=limit + 1)))
+            return page
+
+        # Keyed on the resolved page, since limit and cursor may also come from the query string
+        top_companies = result_cache.get_or_load(
+            cache.make_key('top_companies_by_industry', {'industry_name': industry, 'limit': limit, 'after': after}),
+            [f"industry:{industry}", "industry_stats"],
+            load_top_companies
+        )
 
-        if top_companies:
-            return jsonify({"top_companies": top_companies}), 200
-        else:
-            return jsonify({"message": f"No companies found for industry: {industry}"}), 404
+        payload, status = handlers.top_companies_page(top_companies, limit, after, industry)
+        return jsonify(payload), status
 
+    except handlers.ErrorResponse as e:
+        return jsonify(e.payload), e.status
     except Exception as e:
         return jsonify({"error": "An unexpected error occurred", "details": str(e)}), 500
 
@@ -805,29 +890,20 @@ def get_industry_info():
     }
     """
     try:
-        industry_name = request.json.get('industry_name')
-        fields = request.json.get('fields')
-
-        if not industry_name:
-            return jsonify({"error": "industry_name parameter must be provided"}), 400
-
-        # Select the industries collection
-        industries_collection = db.industries
+        industry_name, projection = handlers.industry_info_request(request.json)
 
-        # Set up projection based on user-specified fields
-        projection = {"_id": 0, "industry_name": 1, "top_companies": 1, "trends": 1}
-        if fields:
-            for field in fields:
-                projection[field] = 1
-
-        # Query the industry
-        industry = industries_collection.find_one({"industry_name": industry_name}, projection)
+        # Query the industry, or serve it from the result cache
+        industry = result_cache.get_or_load(
+            cache.make_key('industry_info', {'industry_name': industry_name, 'projection': projection}),
+            [f"industry:{industry_name}"],
+            lambda: get_db().industries.find_one({"industry_name": industry_name}, projection)
+        )
 
-        if industry:
-            return jsonify({"industry_info": industry}), 200
-        else:
-            return jsonify({"message": f"No information found for industry: {industry_name}"}), 404
+        payload, status = handlers.industry_info_response(industry, industry_name)
+        return jsonify(payload), status
 
+    except handlers.ErrorResponse as e:
+        return jsonify(e.payload), e.status
     except Exception as e:
         return jsonify({"error": "An unexpected error occurred", "details": str(e)}), 500
 
@@ -862,29 +938,20 @@ def get_company_info():
     }
     """
     try:
-        company_name = request.json.get('company_name')
-        fields = request.json.get('fields')
+        company_name, projection = handlers.company_info_request(request.json)
 
-        if not company_name:
-            return jsonify({"error": "company_name parameter must be provided"}), 400
-
-        # Select the companies collection
-        companies_collection = db.companies
-
-        # Set up projection based on user-specified fields
-        projection = {"_id": 0, "name": 1, "industry_name": 1}
-        if fields:
-            for field in fields:
-                projection[field] = 1
-
-        # Query the company
-        company = companies_collection.find_one({"name": company_name}, projection)
+        # Query the company, or serve it from the result cache
+        company = result_cache.get_or_load(
+            cache.make_key('company_info', {'company_name': company_name, 'projection': projection}),
+            [f"company:{company_name}"],
+            lambda: get_db().companies.find_one({"name": company_name}, projection)
+        )
 
-        if company:
-            return jsonify({"company_info": company}), 200
-        else:
-            return jsonify({"message": f"No information found for company: {company_name}"}), 404
+        payload, status = handlers.company_info_response(company, company_name)
+        return jsonify(payload), status
 
+    except handlers.ErrorResponse as e:
+        return jsonify(e.payload), e.status
     except Exception as e:
         return jsonify({"error": "An unexpected error occurred", "details": str(e)}), 500
 
@@ -898,6 +965,12 @@ def search_jobs_by_industry():
 
     Endpoint: http://localhost:5001/search_by_industry/
 
+    Results are paginated: send "limit" (default 100, at most 1000) and the "cursor" returned
+    as next_cursor by the previous page to fetch the next one. next_cursor is null on the last page.
+
+    Large result sets can be streamed as NDJSON (one job per line) by sending
+    'Accept: application/x-ndjson' or "stream": true in the body.
+
     Required body:
     {
         "industry_name": "Finance"
@@ -922,41 +995,318 @@ def search_jobs_by_industry():
                 "average_salary": 90000
             }
         ],
-        "total_jobs": 2
+        "total_jobs": 2,
+        "next_cursor": null,
+        "page_size": 100
     }
     """
     try:
-        # Select the jobs collection
-        jobs_collection = db.jobs
-
-        # Get the industry name from the request body
-        industry_name = request.json.get('industry_name')
-
-        # Validate that industry_name is provided
-        if not industry_name:
-            return jsonify({"error": "industry_name parameter must be provided in the request body"}), 400
-
-        projection = {'_id': 0}
-        
-        # Check if the request has fields specified in the body
-        if 'fields' in request.json:
-            for field in request.json['fields']:
-                projection[field] = 1
-        else:
-            # Default fields if none specified
-            projection = {'_id': 0, 'title': 1, 'company_name': 1, 'average_salary': 1}
-
-        # Find jobs by industry name
-        jobs = list(jobs_collection.find({"industry_name": industry_name}, projection))
-
-        if jobs:
-            return jsonify({
-                "jobs": jobs,
-                "total_jobs": len(jobs)
-            }), 200
-        else:
-            return jsonify({"error": f"No jobs found in the {industry_name} industry"}), 404
+        body = request.json
+        query, projection, not_found = handlers.industry_jobs(body)
+        return list_jobs(body, query, projection, INDUSTRY_SORT, not_found, count_total=True)
+
+    except handlers.ErrorResponse as e:
+        return jsonify(e.payload), e.status
+    except Exception as e:
+        return jsonify({"error": "An unexpected error occurred", "details": str(e)}), 500
+
+
+
+@app.route("/search", methods=['GET'])
+def search_jobs():
+    """
+    Full-text search over the title, description, detailed_description, requirements and
+    preferred_skills of every job, ranked by relevance (matches in the title weigh most).
+    The response also holds the facet counts of all matching jobs, computed in the same
+    aggregation, so a client can show and refine the result set without further queries.
+
+    Endpoint: http://localhost:5001/search
+
+    Results are paginated: send "limit" (default 100, at most 1000) and the "cursor" returned
+    as next_cursor by the previous page to fetch the next one. next_cursor is null on the last page.
+
+    Required body:
+    {
+        "q": "machine learning python"
+    }
+
+    Optional body: filters (experience_level, employment_type and industry_name take a string or a list)
+    and the fields to return
+    {
+        "min_salary": 90000,
+        "max_salary": 150000,
+        "experience_level": ["Mid Level", "Senior Level"],
+        "employment_type": "Full-time",
+        "industry_name": "Tech",
+        "remote": true,
+        "fields": ["title", "company_name", "average_salary"]
+    }
+
+    Example response:
+    {
+        "jobs": [
+            {
+                "title": "Machine Learning Engineer",
+                "company_name": "Nimbus Tech",
+                "average_salary": 128000,
+                "score": 3.1
+            },
+            ...
+        ],
+        "total_jobs": 214,
+        "facets": {
+            "industry_name": [{"value": "Tech", "count": 214}],
+            "experience_level": [{"value": "Senior Level", "count": 120}, {"value": "Mid Level", "count": 94}],
+            "employment_type": [{"value": "Full-time", "count": 214}],
+            "remote": [{"value": true, "count": 214}],
+            "average_salary": [{"min": 75000, "max": 100000, "count": 40}, {"min": 100000, "max": 125000, "count": 121}, ...]
+        },
+        "next_cursor": "WzMuMSwxMDJd",
+        "page_size": 100
+    }
+    """
+    try:
+        body = request.json
+
+        # Build the text match and filters from the body
+        query, projection, limit, after = handlers.search_request(body, request.args)
+
+        # Company fields are looked up separately in the normalized schema
+        projection, complete_jobs = plan_company_fields(projection)
+
+        # One aggregation returns the page of jobs and the facet counts
+        pipeline, added_fields = search.search_pipeline(query, projection, limit, after)
+        result = next(get_db().jobs.aggregate(pipeline), {})
+
+        payload, status = handlers.search_results(result, added_fields, complete_jobs, limit, after, body)
+        return jsonify(payload), status
+
+    except handlers.ErrorResponse as e:
+        return jsonify(e.payload), e.status
+    except Exception as e:
+        return jsonify({"error": "An unexpected error occurred", "details": str(e)}), 500
+
+
+
+@app.route("/match", methods=['GET'])
+def match_jobs_by_skills():
+    """
+    Find the jobs whose preferred skills, requirements and responsibilities best match a
+    candidate's skills. Jobs are scored from the in-process skill index: by Jaccard
+    similarity of the skill sets (default), or with "metric": "overlap" by the share of
+    the submitted skills each job asks for.
+
+    Endpoint: http://localhost:5001/match
+
+    Required body:
+    {
+        "skills": ["Python", "SQL", "Machine Learning"]
+    }
+
+    Optional body:
+    {
+        "limit": 10,
+        "metric": "overlap",
+        "min_overlap": 2,
+        "fields": ["title", "company_name"]
+    }
+
+    Example response:
+    {
+        "matches": [
+            {
+                "job_id": 17,
+                "score": 0.4286,
+                "matched_skills": ["machine learning", "python", "sql"],
+                "job": {"title": "Machine Learning Engineer", "company_name": "Nimbus Tech"}
+            },
+            ...
+        ]
+    }
+    """
+    try:
+        body = request.json
+
+        # Validate the skills and options, and score the jobs from the skill index
+        matches = job_skill_index.match(*handlers.match_request(body))
+
+        # Fetch the matched jobs in one query
+        query, projection = handlers.matched_jobs_query(matches, body)
+        projection, complete_jobs = plan_company_fields(projection)
+        jobs = list(get_db().jobs.find(query, projection))
+        if complete_jobs:
+            jobs = complete_jobs(jobs)
+
+        payload, status = handlers.match_response(matches, jobs)
+        return jsonify(payload), status
 
+    except handlers.ErrorResponse as e:
+        return jsonify(e.payload), e.status
     except Exception as e:
         return jsonify({"error": "An unexpected error occurred", "details": str(e)}), 500
 
+
+
+@app.route("/industry_stats", methods=['GET'])
+def get_industry_stats():
+    """
+    Fetch the precomputed analytics of an industry: job count, salary mean and percentiles,
+    experience level distribution, share of remote jobs, its top companies and the mean
+    of its growth rates. The statistics are refreshed in the background a few seconds
+    after the industry's jobs change.
+
+    Endpoint: http://localhost:5001/industry_stats
+
+    Required body:
+    {
+        "industry_name": "Finance"
+    }
+
+    Example response:
+    {
+        "industry_stats": {
+            "industry_name": "Finance",
+            "job_count": 16,
+            "average_salary": 101234.5,
+            "salary_percentiles": {"p10": 72000, "p25": 85000, "p50": 99000, "p75": 118000, "p90": 131000},
+            "experience_levels": {"Entry Level": 4, "Mid Level": 7, "Senior Level": 5},
+            "remote_share": 0.4375,
+            "company_count": 9,
+            "top_companies": [{"company_name": "NexaCore Tech", "job_count": 4}, ...],
+            "mean_growth_rate": 0.054
+        }
+    }
+    """
+    try:
+        industry_name = handlers.required(request.json, 'industry_name')
+
+        # Read the statistics document, or serve it from the result cache
+        stats = result_cache.get_or_load(
+            cache.make_key('industry_stats', {'industry_name': industry_name}),
+            [f"industry:{industry_name}", "industry_stats"],
+            lambda: get_db()[industry_stats.STATS_COLLECTION].find_one({"_id": industry_name}, handlers.INDUSTRY_STATS_PROJECTION)
+        )
+
+        payload, status = handlers.industry_stats_response(stats, industry_name)
+        return jsonify(payload), status
+
+    except handlers.ErrorResponse as e:
+        return jsonify(e.payload), e.status
+    except Exception as e:
+        return jsonify({"error": "An unexpected error occurred", "details": str(e)}), 500
+
+
+
+@app.route("/salary_stats", methods=['GET'])
+def get_salary_stats():
+    """
+    Salary distribution of the jobs matching the optional filters: count, mean, min, max,
+    percentiles and a histogram, overall and optionally for each value of one field.
+    Answered from this process's in-memory salary columns, without querying MongoDB.
+
+    Endpoint: http://localhost:5001/salary_stats
+
+    Optional body: filters (industry_name, experience_level and employment_type take a
+    string or a list), the percentiles, the histogram bins (a count, default 20, or a list
+    of bin edges) and a field to group by (industry_name, experience_level, employment_type or remote)
+    {
+        "industry_name": "Finance",
+        "remote": true,
+        "percentiles": [25, 50, 75],
+        "bins": [0, 50000, 100000, 150000, 200000],
+        "group_by": "experience_level"
+    }
+
+    Example response:
+    {
+        "count": 120,
+        "mean": 101234.5,
+        "min": 45000.0,
+        "max": 189000.0,
+        "percentiles": {"p25": 82000.0, "p50": 99000.0, "p75": 118000.0},
+        "histogram": {"bin_edges": [0, 50000, 100000, 150000, 200000], "counts": [3, 58, 51, 8]},
+        "groups": [
+            {"value": "Mid Level", "count": 52, "mean": 98000.2, ...},
+            ...
+        ],
+        "snapshot_age_seconds": 12.4
+    }
+    """
+    try:
+        body = request.get_json(silent=True) or {}
+
+        # Read the filters and options, and answer from the salary columns
+        return jsonify(salary_column_store.stats(*handlers.salary_stats_request(body))), 200
+
+    except handlers.ErrorResponse as e:
+        return jsonify(e.payload), e.status
+    except Exception as e:
+        return jsonify({"error": "An unexpected error occurred", "details": str(e)}), 500
+
+
+
+@app.route("/cache_stats", methods=['GET'])
+def get_cache_stats():
+    """
+    Report the result cache counters.
+
+    Endpoint: http://localhost:5001/cache_stats
+
+    Example response:
+    {
+        "backend": "MemoryBackend",
+        "hits": 120,
+        "misses": 14,
+        "hit_ratio": 0.8955,
+        "evictions": 0,
+        "invalidations": 3,
+        "size": 14
+    }
+    """
+    return jsonify(result_cache.stats()), 200
+
+
+
+@app.route("/pool_stats", methods=['GET'])
+def get_pool_stats():
+    """
+    Report the MongoDB connection pool counters of this process, including how long
+    requests waited to check out a connection.
+
+    Endpoint: http://localhost:5001/pool_stats
+
+    Example response:
+    {
+        "checkouts": 5210,
+        "checkout_failures": 0,
+        "wait_ms_mean": 0.041,
+        "wait_ms_max": 12.7,
+        "wait_ms_total": 213.6,
+        "wait_ms_buckets": {"1": 5190, "5": 12, "10": 6, "25": 2, ..., "+Inf": 0},
+        "connections_open": 8,
+        "pool_clears": 0,
+        "max_pool_size": 100,
+        "min_pool_size": 0
+    }
+    """
+    return jsonify(pool_metrics.snapshot()), 200
+
+
+@app.route("/metrics", methods=['GET'])
+def get_metrics():
+    """
+    Report the request, MongoDB command and connection pool metrics of this process in
+    the Prometheus text format.
+
+    Endpoint: http://localhost:5001/metrics
+
+    Example response:
+    # TYPE careerhub_http_requests_total counter
+    careerhub_http_requests_total{route="/jobs_by_salary",method="GET",status="200"} 1520
+    # TYPE careerhub_http_request_duration_seconds histogram
+    careerhub_http_request_duration_seconds_bucket{route="/jobs_by_salary",method="GET",le="0.01"} 1311
+    ...
+    careerhub_http_request_db_round_trips_sum{route="/jobs_by_salary",method="GET"} 1520
+    careerhub_mongodb_command_duration_seconds_count{command="find"} 1974
+    """
+    return Response(metrics.render(pool_metrics.snapshot()), mimetype=metrics.PROMETHEUS_MIMETYPE), 200
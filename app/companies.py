@@ -0,0 +1,135 @@
+'''Module for resolving the company fields of jobs stored in the normalized schema
+
+With CAREERHUB_JOB_SCHEMA=normalized, job documents keep company_id, company_name and
+industry_name (the fields the routes filter and group on) but not the descriptive
+company fields, which live only in the companies collection. Those fields are filled in
+from an in-process copy of the companies collection, and only when the caller asks for
+them, so updating a company never means rewriting its jobs.
+'''
+
+import asyncio
+import threading
+import time
+
+
+# Job field -> companies collection field, for the fields only the normalized schema leaves out of jobs
+COMPANY_JOB_FIELDS = {
+    "company_size": "size",
+    "company_type": "type",
+    "company_location": "location",
+    "company_website": "website",
+    "company_description": "description",
+    "company_hr_contact": "hr_contact"
+}
+
+COMPANY_PROJECTION = {"_id": 0, "company_id": 1, **{field: 1 for field in COMPANY_JOB_FIELDS.values()}}
+
+
+def plan_projection(projection):
+    """
+    Work out which company fields a jobs query has to resolve.
+
+    A projection with no included fields returns whole documents, so every company
+    field is resolved. Requested company fields are removed from the query projection,
+    and company_id is added when the caller did not ask for it.
+
+    Returns:
+    tuple: (projection for the jobs query, company fields to resolve, fields to drop afterwards)
+    """
+    included = [field for field, value in projection.items() if value and field != "_id"]
+    if not included:
+        return projection, list(COMPANY_JOB_FIELDS), []
+
+    wanted = [field for field in included if field in COMPANY_JOB_FIELDS]
+    if not wanted:
+        return projection, [], []
+
+    query_projection = {field: value for field, value in projection.items() if field not in COMPANY_JOB_FIELDS}
+    added = []
+    if "company_id" not in query_projection:
+        query_projection["company_id"] = 1
+        added.append("company_id")
+    return query_projection, wanted, added
+
+
+class CompanyTable:
+    """
+    In-process copy of the companies collection keyed by company_id, reloaded when it
+    is older than ttl seconds (or after invalidate()).
+    """
+
+    def __init__(self, get_db, ttl=300):
+        self.get_db = get_db
+        self.ttl = ttl
+        self._companies = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def _stale(self, companies):
+        return companies is None or time.monotonic() - self._loaded_at > self.ttl
+
+    def _store(self, companies):
+        self._companies = {company.get("company_id"): company for company in companies}
+        self._loaded_at = time.monotonic()
+        return self._companies
+
+    def companies(self):
+        """
+        Returns:
+        dict: company_id -> company document (COMPANY_PROJECTION fields)
+        """
+        companies = self._companies
+        if self._stale(companies):
+            with self._lock:
+                companies = self._companies
+                if self._stale(companies):
+                    companies = self._store(self.get_db().companies.find({}, COMPANY_PROJECTION))
+        return companies
+
+    def invalidate(self):
+        self._companies = None
+
+
+class AsyncCompanyTable(CompanyTable):
+    """
+    CompanyTable for the asyncio API (async_app), loaded through the async client.
+    """
+
+    def __init__(self, get_db, ttl=300):
+        super().__init__(get_db, ttl)
+        self._async_lock = None
+
+    async def companies(self):
+        companies = self._companies
+        if not self._stale(companies):
+            return companies
+        # Created on first use so it belongs to the running event loop
+        if self._async_lock is None:
+            self._async_lock = asyncio.Lock()
+        if self._async_lock.locked() and companies is not None:
+            # Another request is reloading the table, the current one is served meanwhile
+            return companies
+        async with self._async_lock:
+            companies = self._companies
+            if self._stale(companies):
+                cursor = self.get_db().companies.find({}, COMPANY_PROJECTION)
+                companies = self._store(await cursor.to_list(None))
+        return companies
+
+
+def complete_jobs(jobs, companies, fields, drop=()):
+    """
+    Fill in the requested company fields of each job from a CompanyTable's companies
+    (None when the company is unknown) and remove the fields that were only fetched
+    for the lookup.
+
+    Returns:
+    list: The same jobs
+    """
+    for job in jobs:
+        company = companies.get(job.get("company_id")) or {}
+        for field in fields:
+            job[field] = company.get(COMPANY_JOB_FIELDS[field])
+        for field in drop:
+            job.pop(field, None)
+    return jobs
@@ -0,0 +1,68 @@
+'''Module for reading the API configuration from environment variables'''
+
+import os
+
+
+def env_int(name, default):
+    """
+    Read an integer setting from the environment.
+
+    Returns:
+    int: The setting, or default if it is not set
+    """
+    value = os.environ.get(name)
+    return int(value) if value not in (None, '') else default
+
+
+# MongoDB connection and pool settings
+MONGO_URI = os.environ.get('CAREERHUB_MONGO_URI', 'mongodb://mongodb:27017/')
+MONGO_DB = os.environ.get('CAREERHUB_MONGO_DB', 'careerhub')
+MONGO_MAX_POOL_SIZE = env_int('CAREERHUB_MONGO_MAX_POOL_SIZE', 100)
+MONGO_MIN_POOL_SIZE = env_int('CAREERHUB_MONGO_MIN_POOL_SIZE', 0)
+# How long a request waits for a free pooled connection before failing (0 waits as long as the server selection timeout)
+MONGO_WAIT_QUEUE_TIMEOUT_MS = env_int('CAREERHUB_MONGO_WAIT_QUEUE_TIMEOUT_MS', 0)
+# Wire compression, eg. 'zstd,snappy' (needs the zstandard / python-snappy packages)
+MONGO_COMPRESSORS = os.environ.get('CAREERHUB_MONGO_COMPRESSORS', '')
+# primary, primaryPreferred, secondary, secondaryPreferred or nearest
+MONGO_READ_PREFERENCE = os.environ.get('CAREERHUB_MONGO_READ_PREFERENCE', 'primary')
+
+# Job document layout: 'denormalized' (company fields copied into every job) or 'normalized'
+# (jobs keep company_id, and company fields are looked up in the companies collection when asked for)
+JOB_SCHEMA = os.environ.get('CAREERHUB_JOB_SCHEMA', 'denormalized')
+# How long the in-process copy of the companies collection is used before it is reloaded
+COMPANY_TABLE_TTL_SECONDS = env_int('CAREERHUB_COMPANY_TABLE_TTL_SECONDS', 300)
+
+# How long each process's skill index (behind /match) is used before it is rebuilt from the jobs collection
+SKILL_INDEX_TTL_SECONDS = env_int('CAREERHUB_SKILL_INDEX_TTL_SECONDS', 300)
+
+# How long each process's salary column snapshot (behind /salary_stats) is used before it is reloaded
+SALARY_COLUMNS_TTL_SECONDS = env_int('CAREERHUB_SALARY_COLUMNS_TTL_SECONDS', 300)
+
+# How long the confirmation token returned by the update and delete previews stays valid,
+# and the most jobs one token can be bound to (no token is issued for larger matches)
+CONFIRM_TOKEN_TTL_SECONDS = env_int('CAREERHUB_CONFIRM_TOKEN_TTL_SECONDS', 300)
+CONFIRM_MAX_JOBS = env_int('CAREERHUB_CONFIRM_MAX_JOBS', 1000)
+
+# Postings past their closing_date: 'keep' leaves them in jobs, 'archive' moves them to jobs_archive
+# once closing_date is more than the grace period in the past (checked every sweep interval)
+JOB_EXPIRY_POLICY = os.environ.get('CAREERHUB_JOB_EXPIRY_POLICY', 'keep')
+JOB_EXPIRY_GRACE_DAYS = env_int('CAREERHUB_JOB_EXPIRY_GRACE_DAYS', 30)
+JOB_EXPIRY_SWEEP_SECONDS = env_int('CAREERHUB_JOB_EXPIRY_SWEEP_SECONDS', 3600)
+JOB_EXPIRY_BATCH_SIZE = env_int('CAREERHUB_JOB_EXPIRY_BATCH_SIZE', 1000)
+
+# How often the industries whose jobs changed are refreshed in the industry_stats collection,
+# and how often every industry is (0 leaves full refreshes to python -m app.industry_stats)
+INDUSTRY_STATS_REFRESH_SECONDS = env_int('CAREERHUB_INDUSTRY_STATS_REFRESH_SECONDS', 5)
+INDUSTRY_STATS_FULL_REFRESH_SECONDS = env_int('CAREERHUB_INDUSTRY_STATS_FULL_REFRESH_SECONDS', 3600)
+
+# Per-route and per-command metrics on /metrics (0 turns the recording off)
+METRICS_ENABLED = env_int('CAREERHUB_METRICS', 1)
+
+# JSON encoder of the responses: 'orjson' (needs the orjson package) or 'json' (Flask's default)
+JSON_BACKEND = os.environ.get('CAREERHUB_JSON_BACKEND', 'orjson')
+
+# Query result cache: 'memory' (per process), 'redis' (shared between processes) or 'none'
+CACHE_BACKEND = os.environ.get('CAREERHUB_CACHE_BACKEND', 'memory')
+CACHE_MAX_ENTRIES = env_int('CAREERHUB_CACHE_MAX_ENTRIES', 1024)
+CACHE_TTL_SECONDS = env_int('CAREERHUB_CACHE_TTL_SECONDS', 300)
+CACHE_REDIS_URL = os.environ.get('CAREERHUB_CACHE_REDIS_URL', 'redis://redis:6379/0')
@@ -0,0 +1,139 @@
+'''Module for the confirmation tokens of the two-step update and delete routes
+
+The preview request of /update_by_job_title and /delete_by_job_title reads the matching
+jobs once, with a projected cursor limited to max_jobs, and stores their _ids in a
+pending_writes document. That document's id is returned as the confirmation token. The
+confirm request then writes exactly those jobs by _id in one indexed operation, instead
+of running the unindexed criteria again, so it applies to the jobs that were shown even
+if other jobs have started matching since. Tokens are single use and expire after ttl
+seconds. A TTL index on expires_at removes the tokens that are never confirmed. A confirm
+request without a token is refused, so a write always applies to the jobs that were shown:
+no token is issued when more than max_jobs match, and those criteria have to be narrowed
+(or the jobs changed through /jobPosts/batch).
+'''
+
+import secrets
+from datetime import datetime, timedelta
+
+
+PENDING_COLLECTION = "pending_writes"
+
+# Job fields read by the preview: the _id the token is bound to, what jobs_changed needs,
+# and what the preview response shows
+PREVIEW_PROJECTION = {
+    "_id": 1, "job_id": 1, "industry_name": 1,
+    "title": 1, "company_name": 1, "employment_type": 1, "description": 1
+}
+
+
+def token_document(action, query, jobs, ttl):
+    """
+    Build the pending_writes document for a preview: the action and criteria it was
+    issued for and the _ids, job_ids and industries of the matched jobs.
+
+    Returns:
+    dict: The document, its _id is the token
+    """
+    return {
+        "_id": secrets.token_urlsafe(16),
+        "action": action,
+        "query": query,
+        "ids": [job["_id"] for job in jobs],
+        "job_ids": [job.get("job_id") for job in jobs],
+        "industries": sorted({job.get("industry_name") for job in jobs if job.get("industry_name")}),
+        "expires_at": datetime.utcnow() + timedelta(seconds=ttl)
+    }
+
+
+def confirmation_fields(token, confirm_field, action, max_jobs, ttl):
+    """
+    The confirmation part of an update or delete preview: the token to send back, or
+    when more than max_jobs matched to bind a token, how to select fewer jobs.
+
+    Returns:
+    dict: 'instructions', plus 'confirmation_token' and 'expires_in_seconds' when a token was issued
+    """
+    if token is None:
+        return {
+            "instructions": f"More than {max_jobs} jobs match, so only the first {max_jobs} are shown and no confirmation token was issued. "
+                            f"Narrow the search criteria to at most {max_jobs} jobs to get one, or apply the {action} with /jobPosts/batch"
+        }
+    return {
+        "confirmation_token": token,
+        "expires_in_seconds": ttl,
+        "instructions": f"To confirm {action}, send another POST request with '{confirm_field}:true', the same search criteria and this confirmation_token"
+    }
+
+
+def _redeem_filter(token, action):
+    return {"_id": token, "action": action, "expires_at": {"$gt": datetime.utcnow()}}
+
+
+def _require(token):
+    if token is None:
+        raise ValueError("A confirmation_token is required. Send the request again without a confirmation to get one")
+
+
+def _check(pending, query):
+    if pending is None:
+        raise ValueError("The confirmation token is invalid, expired or already used. Send the request again without a confirmation to get a new one")
+    if pending["query"] != query:
+        raise ValueError("The confirmation token was issued for different search criteria")
+    return {"_id": {"$in": pending["ids"]}}, pending["job_ids"], pending["industries"]
+
+
+def preview(db, action, query, max_jobs, ttl):
+    """
+    Read the jobs matching the query (at most max_jobs, projected to PREVIEW_PROJECTION)
+    and issue a confirmation token bound to them. Only when more than max_jobs match are
+    they counted with count_documents, and no token is issued.
+
+    Returns:
+    tuple: (matched jobs, total count, token or None)
+    """
+    jobs = list(db.jobs.find(query, PREVIEW_PROJECTION).limit(max_jobs + 1))
+    if len(jobs) > max_jobs:
+        return jobs[:max_jobs], db.jobs.count_documents(query), None
+    if not jobs:
+        return jobs, 0, None
+    pending = token_document(action, query, jobs, ttl)
+    db[PENDING_COLLECTION].insert_one(pending)
+    return jobs, len(jobs), pending["_id"]
+
+
+def confirm_target(db, token, action, query):
+    """
+    The jobs a confirm request writes: the ones its token is bound to (using up the token).
+
+    Returns:
+    tuple: (filter selecting the jobs by _id, job_ids, industries)
+
+    Raises:
+    ValueError: If the token is missing, unknown, expired, already used or issued for other criteria
+    """
+    _require(token)
+    pending = db[PENDING_COLLECTION].find_one_and_delete(_redeem_filter(token, action)) if isinstance(token, str) else None
+    return _check(pending, query)
+
+
+async def preview_async(db, action, query, max_jobs, ttl):
+    """
+    preview() through the async client.
+    """
+    jobs = await db.jobs.find(query, PREVIEW_PROJECTION).limit(max_jobs + 1).to_list(None)
+    if len(jobs) > max_jobs:
+        return jobs[:max_jobs], await db.jobs.count_documents(query), None
+    if not jobs:
+        return jobs, 0, None
+    pending = token_document(action, query, jobs, ttl)
+    await db[PENDING_COLLECTION].insert_one(pending)
+    return jobs, len(jobs), pending["_id"]
+
+
+async def confirm_target_async(db, token, action, query):
+    """
+    confirm_target() through the async client.
+    """
+    _require(token)
+    pending = await db[PENDING_COLLECTION].find_one_and_delete(_redeem_filter(token, action)) if isinstance(token, str) else None
+    return _check(pending, query)
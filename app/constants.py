@@ -0,0 +1,86 @@
+'''Module for the constants shared by the sync (app/career_hub.py) and asyncio (async_app) APIs
+
+Kept apart from the route modules so the asyncio API can use them without importing
+the Flask app.
+'''
+
+
+# job_ids come from an atomic counter; each process reserves them in blocks of this size
+JOB_ID_BLOCK_SIZE = 50
+
+# Sort order of each paginated listing, every one ends in job_id so the order is total
+SALARY_SORT = [("average_salary", 1), ("job_id", 1)]
+EXPERIENCE_SORT = [("experience_level", 1), ("job_id", 1)]
+INDUSTRY_SORT = [("job_id", 1)]
+TOP_COMPANIES_SORT_KEYS = 2
+INDUSTRY_STATS_COMPANIES = 10
+
+# Matches returned by /match when the client does not send a limit, and the most allowed
+DEFAULT_MATCH_LIMIT = 10
+MAX_MATCH_LIMIT = 100
+MATCH_FIELDS = ["title", "company_name", "industry_name", "average_salary", "experience_level"]
+
+# Bulk job creation limits: records accepted per request and jobs per insert_many call
+MAX_BULK_JOB_POSTS = 10000
+BULK_INSERT_CHUNK_SIZE = 1000
+
+# Instructions returned by GET on the update and delete routes
+UPDATE_INSTRUCTIONS = {
+    "message": "To update a job, follow these steps:",
+    "instructions": {
+        "1": "Send a POST request to this endpoint with the job title, at least one other field, and update data",
+        "2": "If job(s) are found, you'll receive a confirmation request with a confirmation_token",
+        "3": "Send another POST request with 'confirm_update', the same search criteria and the confirmation_token to finalize the update of exactly the job(s) shown"
+    },
+    "example": {
+        "first_request": {
+           "title": "<job title>",
+           "job_id": "<job_id>", 
+           "company_name": "<company name>",  
+           "employment_type": "<employment type>",  
+           "update": {
+               "description": "New description",
+               "average_salary": 75000,
+               "location": "New location"
+           }
+        },
+        "confirmation_request": {
+            "title": "<job title>",
+            "job_id": "<job_id>",  
+            "company_name": "<company name>", 
+            "employment_type": "<employment type>", 
+            "update": {
+                "description": "New description",
+                "average_salary": 75000,
+                "location": "New location"
+            },
+            "confirm_update": "true",
+            "confirmation_token": "<confirmation_token>"
+        }
+    }
+}
+
+DELETE_INSTRUCTIONS = {
+    "message": "To delete a job, follow these steps:",
+    "instructions": {
+        "1": "Send a POST request to this endpoint with the job title and optional parameters",
+        "2": "If job(s) are found, you'll receive a confirmation request with a confirmation_token",
+        "3": "Send another POST request with 'confirm_delete', the same search criteria and the confirmation_token to finalize deletion of exactly the job(s) shown"
+    },
+    "example": {
+        "first_request": {
+           "job_title": "<job title>",
+           "job_id": "<job_id>",  
+           "company": "<company name>",  
+           "employment_type": "<employment type>"  
+        },
+        "confirmation_request": {
+            "job_title": "<job title>",
+            "job_id": "<job_id>",  # Include if used in first request
+            "company": "<company name>",  # Include if used in first request
+            "employment_type": "<employment type>",  # Include if used in first request
+            "confirm_delete": "true",
+            "confirmation_token": "<confirmation_token>"
+        }
+    }
+}
@@ -0,0 +1,189 @@
+'''Module for creating the MongoDB client lazily and measuring its connection pool'''
+
+import os
+import threading
+import time
+
+from pymongo import MongoClient, monitoring
+
+from app import config
+from app.metrics import command_metrics
+
+
+# Upper bounds (milliseconds) of the pool checkout wait time histogram
+WAIT_TIME_BUCKETS_MS = [1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000]
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """
+    Connection pool listener that records how long requests wait to check out a
+    connection, and how many connections are open. Wait times growing under load
+    mean maxPoolSize is too small for the number of worker threads.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.checkout_failures = 0
+            self.wait_ms_total = 0.0
+            self.wait_ms_max = 0.0
+            self.wait_buckets = [0] * (len(WAIT_TIME_BUCKETS_MS) + 1)
+            self.connections_open = 0
+            self.pool_clears = 0
+
+    def _wait_ms(self, event):
+        # pymongo >= 4.7 reports the wait itself, older versions are timed from the start event
+        duration = getattr(event, 'duration', None)
+        if duration is not None:
+            return duration * 1000
+        started = getattr(self._local, 'started', None)
+        return (time.perf_counter() - started) * 1000 if started is not None else 0.0
+
+    def _record_wait(self, wait_ms):
+        self.wait_ms_total += wait_ms
+        self.wait_ms_max = max(self.wait_ms_max, wait_ms)
+        bucket = next((position for position, bound in enumerate(WAIT_TIME_BUCKETS_MS) if wait_ms <= bound), len(WAIT_TIME_BUCKETS_MS))
+        self.wait_buckets[bucket] += 1
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        wait_ms = self._wait_ms(event)
+        with self._lock:
+            self.checkouts += 1
+            self._record_wait(wait_ms)
+
+    def connection_check_out_failed(self, event):
+        wait_ms = self._wait_ms(event)
+        with self._lock:
+            self.checkout_failures += 1
+            self._record_wait(wait_ms)
+
+    def connection_created(self, event):
+        with self._lock:
+            self.connections_open += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.connections_open -= 1
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pool_clears += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_checked_in(self, event):
+        pass
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def snapshot(self):
+        """
+        Returns:
+        dict: The pool counters and checkout wait time distribution
+        """
+        with self._lock:
+            attempts = self.checkouts + self.checkout_failures
+            bounds = [str(bound) for bound in WAIT_TIME_BUCKETS_MS] + ['+Inf']
+            return {
+                'checkouts': self.checkouts,
+                'checkout_failures': self.checkout_failures,
+                'wait_ms_mean': round(self.wait_ms_total / attempts, 3) if attempts else 0.0,
+                'wait_ms_max': round(self.wait_ms_max, 3),
+                'wait_ms_total': round(self.wait_ms_total, 3),
+                'wait_ms_buckets': dict(zip(bounds, self.wait_buckets)),
+                'connections_open': self.connections_open,
+                'pool_clears': self.pool_clears,
+                'max_pool_size': config.MONGO_MAX_POOL_SIZE,
+                'min_pool_size': config.MONGO_MIN_POOL_SIZE
+            }
+
+
+pool_metrics = PoolMetrics()
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+def client_options():
+    """
+    Build the MongoClient keyword arguments from the configuration module.
+
+    Returns:
+    dict: The client options
+    """
+    options = {
+        'maxPoolSize': config.MONGO_MAX_POOL_SIZE,
+        'minPoolSize': config.MONGO_MIN_POOL_SIZE,
+        'readPreference': config.MONGO_READ_PREFERENCE,
+        'event_listeners': [pool_metrics, command_metrics] if config.METRICS_ENABLED else [pool_metrics],
+        'appname': 'careerhub'
+    }
+    if config.MONGO_WAIT_QUEUE_TIMEOUT_MS:
+        options['waitQueueTimeoutMS'] = config.MONGO_WAIT_QUEUE_TIMEOUT_MS
+    if config.MONGO_COMPRESSORS:
+        options['compressors'] = config.MONGO_COMPRESSORS
+    return options
+
+
+def get_client():
+    """
+    Return the MongoDB client for this process, creating it on first use.
+
+    The client is created lazily, so importing the app (eg. in tooling) opens no
+    connections, and it is re-created in a forked child (eg. a gunicorn worker), since
+    a MongoClient must never be shared across a fork.
+
+    Returns:
+    MongoClient: The client
+    """
+    global _client, _client_pid
+    pid = os.getpid()
+    if _client is None or _client_pid != pid:
+        with _client_lock:
+            if _client is None or _client_pid != pid:
+                if _client_pid != pid:
+                    # The parent's pool is unusable here, the counters start again too
+                    pool_metrics.reset()
+                    command_metrics.reset()
+                _client = MongoClient(config.MONGO_URI, **client_options())
+                _client_pid = pid
+    return _client
+
+
+def get_db():
+    """
+    Return the careerhub database on this process's client.
+
+    Returns:
+    Database: The database
+    """
+    return get_client()[config.MONGO_DB]
+
+
+def close_client():
+    """
+    Close the client of this process, eg. when a worker shuts down.
+    """
+    global _client, _client_pid
+    with _client_lock:
+        if _client is not None and _client_pid == os.getpid():
+            _client.close()
+        _client = None
+        _client_pid = None
@@ -0,0 +1,643 @@
+'''Module for the request handling shared by the sync and asyncio APIs
+
+app/career_hub.py (Flask) and async_app/career_hub.py (Quart) serve the same routes.
+Everything a route does besides talking to MongoDB lives here: reading and validating
+the request body into the queries to run, and building the JSON response from their
+results. The routes only run the queries in between (blocking or awaited), so both
+servers answer a request the same way.
+
+Functions that build a response return (payload, status code). A request that has to
+be answered with an error raises ErrorResponse, which the routes return as is.
+'''
+
+from datetime import datetime
+
+from pymongo import UpdateOne
+
+from app import batch, config, confirmations, lifecycle, salary_columns, search, utils
+from app.constants import DEFAULT_MATCH_LIMIT, MAX_MATCH_LIMIT, MATCH_FIELDS, MAX_BULK_JOB_POSTS, BULK_INSERT_CHUNK_SIZE, INDUSTRY_STATS_COMPANIES
+
+
+class ErrorResponse(Exception):
+    """
+    Raised to answer a request with an error: the JSON payload and status code of the response.
+    """
+
+    def __init__(self, payload, status=400):
+        super().__init__(payload.get("error") or payload.get("message"))
+        self.payload = payload
+        self.status = status
+
+
+def page_params(body, args, key_count):
+    """
+    utils.page_params, rejecting an invalid limit or cursor.
+
+    Returns:
+    tuple: (page size, decoded cursor values or None)
+    """
+    try:
+        return utils.page_params(body, args, key_count)
+    except ValueError as e:
+        raise ErrorResponse({"error": str(e)})
+
+
+def add_fields(projection, fields):
+    # Include the fields the client asked for in the projection
+    for field in fields or []:
+        projection[field] = 1
+    return projection
+
+
+# Job listings (/jobs_by_salary, /jobs_by_experience, /search_by_industry/)
+
+def salary_range(body):
+    """
+    Returns:
+    tuple: (jobs query, projection, response payload when no job matches)
+    """
+    try:
+        min_salary = float(body.get('min_salary'))
+        max_salary = float(body.get('max_salary'))
+    except (TypeError, ValueError):
+        raise ErrorResponse({"error": "Both min_salary and max_salary must be provided"})
+
+    # Validate that min_salary is not greater than max_salary
+    if min_salary > max_salary:
+        raise ErrorResponse({"error": "min_salary cannot be greater than max_salary"})
+
+    query = {
+        "$and": [
+            {"average_salary": {"$gte": min_salary}},
+            {"average_salary": {"$lte": max_salary}}
+        ]
+    }
+    return query, add_fields({"_id": 0}, body.get('fields')), {"message": "No jobs found in the specified salary range"}
+
+
+def experience_levels(body):
+    """
+    Returns:
+    tuple: (jobs query, projection, response payload when no job matches)
+    """
+    experience_level_input = body.get('experience_level')
+    if not experience_level_input:
+        raise ErrorResponse({"error": "experience_level parameter must be provided"})
+
+    # Handle both single string and list inputs, a list also returns each job's level
+    projection = {"_id": 0}
+    if isinstance(experience_level_input, str):
+        experience_levels = [experience_level_input]
+    elif isinstance(experience_level_input, list):
+        experience_levels = experience_level_input
+        projection["experience_level"] = 1
+    else:
+        raise ErrorResponse({"error": "experience_level must be a string or a list of strings"})
+
+    levels, invalid_level = utils.normalize_experience_levels(experience_levels)
+    if invalid_level:
+        raise ErrorResponse({"message": f"{invalid_level} is not a valid experience level in the career hub. Valid options include Entry Level, Mid Level, and Senior Level"}, 404)
+
+    query = {"experience_level": {"$in": levels}}
+    return query, add_fields(projection, body.get('fields')), {"message": f"No jobs found for experience level(s): {', '.join(levels)}"}
+
+
+def industry_jobs(body):
+    """
+    Returns:
+    tuple: (jobs query, projection, response payload when no job matches)
+    """
+    industry_name = body.get('industry_name')
+    if not industry_name:
+        raise ErrorResponse({"error": "industry_name parameter must be provided in the request body"})
+
+    # Default fields if none specified
+    if 'fields' in body:
+        projection = add_fields({'_id': 0}, body['fields'])
+    else:
+        projection = {'_id': 0, 'title': 1, 'company_name': 1, 'average_salary': 1}
+    return {"industry_name": industry_name}, projection, {"error": f"No jobs found in the {industry_name} industry"}
+
+
+def jobs_page(jobs, next_cursor, limit, after, not_found, total_jobs=None):
+    """
+    Returns:
+    tuple: (response payload, status code) of one page of a job listing
+    """
+    if not jobs and not after:
+        return not_found, 404
+    payload = {"jobs": jobs}
+    if total_jobs is not None:
+        payload["total_jobs"] = total_jobs
+    payload.update({"next_cursor": next_cursor, "page_size": limit})
+    return payload, 200
+
+
+def job_details_projection(body):
+    """
+    Returns:
+    tuple: (projection of /search_by_job_id, whether archived postings are looked up too)
+    """
+    if not body:
+        return {'_id': 0}, False
+    return add_fields({'_id': 0}, body.get('fields')), lifecycle.include_expired(body)
+
+
+# Industry and company lookups
+
+# Fields of the industry_stats documents returned by /industry_stats
+INDUSTRY_STATS_PROJECTION = {"jobs_refresh_id": 0, "info_refresh_id": 0, "top_companies": {"$slice": INDUSTRY_STATS_COMPANIES}}
+
+
+def required(body, field, error=None):
+    """
+    Returns:
+    The value of a field the request body must have
+    """
+    value = body.get(field)
+    if not value:
+        raise ErrorResponse({"error": error or f"{field} parameter must be provided"})
+    return value
+
+
+def top_companies_page(top_companies, limit, after, industry):
+    """
+    Returns:
+    tuple: (response payload, status code) of a page of top companies, read with one
+    extra company to know if there is a next page
+    """
+    next_cursor = None
+    if len(top_companies) > limit:
+        top_companies = top_companies[:limit]
+        next_cursor = utils.encode_cursor([top_companies[-1]['job_count'], top_companies[-1]['company_name']])
+
+    if top_companies or after:
+        return {"top_companies": top_companies, "next_cursor": next_cursor, "page_size": limit}, 200
+    return {"message": f"No companies found for industry: {industry}"}, 404
+
+
+def industry_stats_response(stats, industry_name):
+    """
+    Returns:
+    tuple: (response payload, status code) of an industry_stats document
+    """
+    if not stats:
+        return {"message": f"No statistics found for industry: {industry_name}"}, 404
+    # Copied, the document may be shared through the result cache
+    stats = dict(stats)
+    stats["industry_name"] = stats.pop("_id")
+    return {"industry_stats": stats}, 200
+
+
+def industry_info_request(body):
+    """
+    Returns:
+    tuple: (industry name, projection) of an /industry_info request
+    """
+    industry_name = required(body, 'industry_name')
+    return industry_name, add_fields({"_id": 0, "industry_name": 1, "top_companies": 1, "trends": 1}, body.get('fields'))
+
+
+def industry_info_response(industry, industry_name):
+    if industry:
+        return {"industry_info": industry}, 200
+    return {"message": f"No information found for industry: {industry_name}"}, 404
+
+
+def company_info_request(body):
+    """
+    Returns:
+    tuple: (company name, projection) of a /company_info request
+    """
+    company_name = required(body, 'company_name')
+    return company_name, add_fields({"_id": 0, "name": 1, "industry_name": 1}, body.get('fields'))
+
+
+def company_info_response(company, company_name):
+    if company:
+        return {"company_info": company}, 200
+    return {"message": f"No information found for company: {company_name}"}, 404
+
+
+def industry_info_update(data):
+    """
+    Returns:
+    tuple: (industry name, the fields to $set on its industries document)
+    """
+    if not isinstance(data, dict) or not data.get('industry_name'):
+        raise ErrorResponse({'error': 'industry_name is a required field'})
+    return data['industry_name'], {key: value for key, value in data.items() if key != 'industry_name'}
+
+
+def industry_info_saved(result, industry_name):
+    """
+    Returns:
+    tuple: (response payload, status code) of the industries upsert
+    """
+    if result.modified_count > 0 or result.upserted_id:
+        action = "updated" if result.modified_count > 0 else "added"
+        return {'message': f'Industry information {action} successfully', 'industry_name': industry_name}, 200
+    return {'error': 'Failed to add/update industry information'}, 500
+
+
+# Search and match
+
+def search_request(body, args):
+    """
+    Returns:
+    tuple: (text match and filters, projection, page size, decoded cursor or None) of a /search request
+    """
+    try:
+        query = search.search_query(body)
+    except ValueError as e:
+        raise ErrorResponse({"error": str(e)})
+    limit, after = page_params(body, args, len(search.SEARCH_SORT))
+    return query, search.search_projection(body.get('fields')), limit, after
+
+
+def search_results(result, added_fields, complete_jobs, limit, after, body):
+    """
+    Returns:
+    tuple: (response payload, status code) of a page of /search results and the facets
+    """
+    jobs, next_cursor = utils.finish_page(result.get("jobs", []), search.SEARCH_SORT, limit, added_fields)
+    if complete_jobs:
+        jobs = complete_jobs(jobs)
+
+    if not jobs and not after:
+        return {"message": f"No jobs found matching: {body['q']}"}, 404
+    return {
+        "jobs": jobs,
+        "total_jobs": search.search_total(result),
+        "facets": search.search_facets(result),
+        "next_cursor": next_cursor,
+        "page_size": limit
+    }, 200
+
+
+def match_request(body):
+    """
+    Returns:
+    tuple: (skills, number of matches, metric, min_overlap) of a /match request
+    """
+    skills = body.get('skills')
+    metric = body.get('metric', 'jaccard')
+
+    if not isinstance(skills, list) or not skills or not all(isinstance(skill, str) for skill in skills):
+        raise ErrorResponse({"error": "skills must be a non-empty list of strings"})
+    if metric not in ('jaccard', 'overlap'):
+        raise ErrorResponse({"error": "metric must be 'jaccard' or 'overlap'"})
+    try:
+        limit = int(body.get('limit', DEFAULT_MATCH_LIMIT))
+        min_overlap = int(body.get('min_overlap', 1))
+    except (TypeError, ValueError):
+        raise ErrorResponse({"error": "limit and min_overlap must be integers"})
+    if limit < 1 or min_overlap < 1:
+        raise ErrorResponse({"error": "limit and min_overlap must be at least 1"})
+    return skills, min(limit, MAX_MATCH_LIMIT), metric, min_overlap
+
+
+def matched_jobs_query(matches, body):
+    """
+    Returns:
+    tuple: (query, projection) reading the matched jobs in one round trip
+    """
+    if not matches:
+        raise ErrorResponse({"message": "No jobs match the given skills"}, 404)
+    projection = add_fields({"_id": 0, "job_id": 1}, body.get('fields') or MATCH_FIELDS)
+    return {"job_id": {"$in": [job_id for job_id, _, _ in matches]}}, projection
+
+
+def match_response(matches, jobs):
+    """
+    Returns:
+    tuple: (response payload, status code) of the matches, in score order
+    """
+    jobs_by_id = {job.get("job_id"): job for job in jobs}
+    return {
+        "matches": [
+            {"job_id": job_id, "score": score, "matched_skills": matched, "job": jobs_by_id[job_id]}
+            for job_id, score, matched in matches if job_id in jobs_by_id
+        ]
+    }, 200
+
+
+def salary_stats_request(body):
+    """
+    Returns:
+    tuple: (filters, percentiles, bins, group_by) of a /salary_stats request
+    """
+    try:
+        return salary_columns.parse_request(body)
+    except ValueError as e:
+        raise ErrorResponse({"error": str(e)})
+
+
+# Job creation (/create/jobPost, /create/jobPosts/bulk)
+
+def industry_name(job_post):
+    # Industries are stored capitalized
+    return job_post['industry'].capitalize()
+
+
+def job_industries(job_posts):
+    """
+    Returns:
+    set: Every industry name the job posts can be found under, for jobs_changed
+    """
+    return {name for job_post in job_posts for name in (job_post['industry'], industry_name(job_post), job_post.get('industry_name'))}
+
+
+def new_job_post(data, created_at=None):
+    """
+    Validate the body of a new job posting.
+
+    Returns:
+    dict: The job post to insert, without its job_id
+    """
+    error = utils.validate_job_post(data)
+    if error:
+        raise ErrorResponse({'error': error})
+    job_post = {key: value for key, value in data.items()}
+    job_post['created_at'] = created_at or datetime.utcnow()
+    return job_post
+
+
+def job_post_created(result, job_post, new_industry):
+    """
+    Returns:
+    tuple: (response payload, status code) of a job post insert
+    """
+    if not result.inserted_id:
+        return {'error': 'Failed to create job post'}, 500
+    response = {
+        'message': 'Job post created successfully',
+        'job_id': job_post['job_id']
+    }
+    # Let the user know they can add more information about a new industry
+    if new_industry:
+        response['additional_info'] = f"A new industry '{job_post['industry']}' was added to the database. You can use the add_industry_info function to provide more details about it if you want."
+    return response, 201
+
+
+def bulk_records(data, content_type, noun, verb, max_records):
+    """
+    Parse the JSON array or NDJSON body of a bulk route.
+
+    Returns:
+    list: The records, at least one and at most max_records
+    """
+    try:
+        records = utils.parse_json_records(data, content_type)
+    except ValueError as e:
+        raise ErrorResponse({'error': 'Body must be a JSON array or NDJSON', 'details': str(e)})
+    if not records:
+        raise ErrorResponse({'error': f'At least one {noun} is required'})
+    if len(records) > max_records:
+        raise ErrorResponse({'error': f'At most {max_records} {noun}s can be {verb} per request'}, 413) # Payload too large
+    return records
+
+
+def bulk_job_posts(data, content_type):
+    """
+    Parse and validate the records of /create/jobPosts/bulk.
+
+    Returns:
+    tuple: (results list with the invalid records filled in, {position: job post} of the valid ones)
+    """
+    records = bulk_records(data, content_type, 'job post', 'created', MAX_BULK_JOB_POSTS)
+    results = [None] * len(records)
+    job_posts = {}
+    created_at = datetime.utcnow()
+    for index, record in enumerate(records):
+        try:
+            job_posts[index] = new_job_post(record, created_at)
+        except ErrorResponse as e:
+            results[index] = {'index': index, 'status': 'invalid', 'error': e.payload['error']}
+    return results, job_posts
+
+
+def industry_upserts(job_posts):
+    """
+    Returns:
+    tuple: (sorted industry names of the job posts, the upserts adding the new ones)
+    """
+    names = sorted({industry_name(job_post) for job_post in job_posts})
+    return names, [UpdateOne({"industry_name": name}, {"$setOnInsert": {"industry_name": name}}, upsert=True) for name in names]
+
+
+def insert_chunks(job_posts):
+    """
+    Yield the (position, job post) pairs in chunks of BULK_INSERT_CHUNK_SIZE.
+    """
+    job_posts = list(job_posts.items())
+    for start in range(0, len(job_posts), BULK_INSERT_CHUNK_SIZE):
+        yield job_posts[start:start + BULK_INSERT_CHUNK_SIZE]
+
+
+def record_inserts(results, chunk, error=None):
+    """
+    Fill in the results of a chunk inserted with an unordered insert_many, from its BulkWriteError if any.
+    """
+    write_errors = {write_error['index']: write_error['errmsg'] for write_error in error.details.get('writeErrors', [])} if error else {}
+    for position, (index, job_post) in enumerate(chunk):
+        if position in write_errors:
+            results[index] = {'index': index, 'status': 'failed', 'error': write_errors[position]}
+        else:
+            results[index] = {'index': index, 'status': 'created', 'job_id': job_post['job_id']}
+
+
+def multi_status(response, done, total, success_status):
+    # Multi-status when only some records went through
+    if done == total:
+        return response, success_status
+    return response, 207 if done else 400
+
+
+def bulk_created(results, new_industries):
+    """
+    Returns:
+    tuple: (response payload, status code) of /create/jobPosts/bulk
+    """
+    created_count = sum(1 for result in results if result['status'] == 'created')
+    response = {
+        'message': f'Created {created_count} of {len(results)} job posts',
+        'created_count': created_count,
+        'failed_count': len(results) - created_count,
+        'results': results
+    }
+    if new_industries:
+        response['additional_info'] = f"New industries were added to the database: {', '.join(new_industries)}. You can use the add_industry_info function to provide more details about them if you want."
+    return multi_status(response, created_count, len(results), 201)
+
+
+# Batch writes (/jobPosts/batch)
+
+def batch_operations(data, content_type):
+    """
+    Parse and validate the operations of /jobPosts/batch.
+
+    Returns:
+    tuple: (results list with the invalid operations filled in, [(position, parsed operation)] of the valid ones)
+    """
+    records = bulk_records(data, content_type, 'operation', 'applied', batch.MAX_BATCH_OPERATIONS)
+    results = [None] * len(records)
+    operations = []
+    for index, operation in enumerate(records):
+        try:
+            operations.append((index, batch.parse_operation(operation)))
+        except ValueError as e:
+            results[index] = {'index': index, 'status': 'invalid', 'error': str(e)}
+    return results, operations
+
+
+def batch_applied(results, operations, outcomes=(), totals=None):
+    """
+    Returns:
+    tuple: (response payload, status code) of /jobPosts/batch
+    """
+    for (index, _), outcome in zip(operations, outcomes):
+        results[index] = {'index': index, **outcome}
+
+    applied_count = sum(1 for result in results if result['status'] == 'applied')
+    response = {
+        'message': f'Applied {applied_count} of {len(results)} operations',
+        'applied_count': applied_count,
+        'failed_count': len(results) - applied_count,
+        **(totals or {'matched_count': 0, 'modified_count': 0, 'deleted_count': 0}),
+        'results': results
+    }
+    return multi_status(response, applied_count, len(results), 200)
+
+
+# Two-step updates and deletes (/update_by_job_title, /delete_by_job_title)
+
+def job_criteria(body, company_key, additional_fields):
+    """
+    Build the title + job_id/company/employment_type query of the update and delete routes.
+
+    Returns:
+    dict: The query
+    """
+    query = {"title": body.get('title')}
+    if body.get('job_id'):
+        try:
+            query["job_id"] = int(body['job_id'])
+        except (TypeError, ValueError):
+            raise ErrorResponse({"error": "Invalid job_id format"})
+    if body.get(company_key):
+        query["company_name"] = body[company_key]
+    if body.get('employment_type'):
+        query["employment_type"] = body['employment_type']
+    for field in additional_fields:
+        if body.get(field):
+            query[field] = body[field]
+    return query
+
+
+def update_criteria(body):
+    """
+    Returns:
+    dict: The query of an /update_by_job_title request
+    """
+    if not body.get('title'):
+        raise ErrorResponse({"error": "Job title is required"})
+    # Check if at least one additional field is provided
+    if not any([body.get('job_id'), body.get('company_name'), body.get('employment_type')]):
+        raise ErrorResponse({"error": "At least one additional field (job_id, company_name, or employment_type) is required"})
+    return job_criteria(body, 'company_name', ())
+
+
+def delete_criteria(body):
+    """
+    Returns:
+    dict: The query of a /delete_by_job_title request
+    """
+    if not body.get('title') or not any([body.get('job_id'), body.get('company'), body.get('employment_type')]):
+        raise ErrorResponse({"error": "Job title and at least one additional field is required"})
+    return job_criteria(body, 'company', ('job_posting_url',))
+
+
+NO_MATCHING_JOBS = {"error": "No jobs found matching the criteria"}
+
+
+def update_preview(jobs, count, token):
+    """
+    Returns:
+    tuple: (response payload, status code) asking to confirm an update of the matched jobs
+    """
+    if not count:
+        return NO_MATCHING_JOBS, 404
+    return {
+        "message": f"Found {count} job(s) matching the criteria. Are you sure you want to update these job(s)?",
+        "job_count": count,
+        "matching_job(s)": [
+            {
+                "title": job.get('title', 'N/A'),
+                "company_name": job.get('company_name', 'N/A'),
+                "employment_type": job.get('employment_type', 'N/A'),
+                "description": job.get('description', 'N/A')
+            } for job in jobs
+        ],
+        **confirmations.confirmation_fields(token, 'confirm_update', 'update', config.CONFIRM_MAX_JOBS, config.CONFIRM_TOKEN_TTL_SECONDS)
+    }, 200
+
+
+def delete_preview(jobs, count, token):
+    """
+    Returns:
+    tuple: (response payload, status code) asking to confirm the deletion of the matched jobs
+    """
+    if not count:
+        return NO_MATCHING_JOBS, 404
+    return {
+        "message": f"Found {count} job(s) matching the criteria. Are you sure you want to delete these job(s)?",
+        "job_count": count,
+        "sample_job": {
+            "title": jobs[0].get('title', 'N/A'),
+            "job_id": jobs[0].get('job_id', 'N/A'),
+            "company": jobs[0].get('company_name', 'N/A'),
+            "employment_type": jobs[0].get('employment_type', 'N/A'),
+            "description": jobs[0].get('description', 'N/A')
+        },
+        **confirmations.confirmation_fields(token, 'confirm_delete', 'deletion', config.CONFIRM_MAX_JOBS, config.CONFIRM_TOKEN_TTL_SECONDS)
+    }, 200
+
+
+def check_confirmation(body, confirm_field):
+    # A confirm request must say 'true'
+    if body.get(confirm_field) != 'true':
+        raise ErrorResponse({"error": "Invalid confirmation value"})
+
+
+def job_update(body):
+    """
+    Returns:
+    dict: The validated fields an update sets (updatable fields only, average_salary as a number)
+    """
+    update_data, error = utils.validate_job_update(body.get('update'))
+    if error:
+        raise ErrorResponse({"error": error})
+    return update_data
+
+
+def jobs_updated(result, update_data):
+    """
+    Returns:
+    tuple: (response payload, status code) of a confirmed update
+    """
+    if result.modified_count:
+        return {"message": f"Successfully updated {result.modified_count} job(s) matching the criteria", "updated_fields": list(update_data.keys())}, 200
+    if not result.matched_count:
+        return {"error": "The confirmed job(s) no longer exist"}, 404
+    return {"message": "No changes were made"}, 200
+
+
+def jobs_deleted(result):
+    """
+    Returns:
+    tuple: (response payload, status code) of a confirmed deletion
+    """
+    if result.deleted_count:
+        return {"message": f"Successfully deleted {result.deleted_count} job(s) matching the criteria"}, 200
+    return {"error": "The confirmed job(s) no longer exist"}, 404
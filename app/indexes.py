@@ -0,0 +1,275 @@
+'''Module for declaring, creating and checking the indexes used by the API'''
+
+import argparse
+import sys
+
+from pymongo import ASCENDING, TEXT, MongoClient
+from pymongo.errors import OperationFailure
+
+from app import config, search, utils
+from app.db import client_options
+
+
+# Every index a query path in career_hub.py relies on, grouped by collection
+# (industry_stats is only read by _id, which MongoDB always indexes).
+# Each entry is the keyword arguments passed to create_index (plus the key pattern).
+REQUIRED_INDEXES = {
+    "jobs": [
+        # view_job_details, and the job_id generator; job ids must stay unique
+        {"name": "job_id_unique", "keys": [("job_id", ASCENDING)], "unique": True},
+        # get_jobs_by_salary, keyset pagination on (average_salary, job_id)
+        {"name": "average_salary", "keys": [("average_salary", ASCENDING), ("job_id", ASCENDING)]},
+        # get_jobs_by_experience, keyset pagination on (experience_level, job_id)
+        {"name": "experience_level", "keys": [("experience_level", ASCENDING), ("job_id", ASCENDING)]},
+        # search_jobs_by_industry, keyset pagination on job_id within one industry
+        {"name": "industry_name_job_id", "keys": [("industry_name", ASCENDING), ("job_id", ASCENDING)]},
+        # get_top_companies_by_industry (covers the $group)
+        {"name": "industry_name_company_name", "keys": [("industry_name", ASCENDING), ("company_name", ASCENDING)]},
+        # update_job_details and delete_by_job_title always filter on title
+        {"name": "title", "keys": [("title", ASCENDING)]},
+        # the expiry sweep in lifecycle.py looks for jobs past their closing_date
+        {"name": "closing_date", "keys": [("closing_date", ASCENDING)]},
+        # search_jobs, weighted full-text index (a collection can only have one text index)
+        {"name": "job_text",
+         "keys": [("title", TEXT), ("description", TEXT), ("detailed_description", TEXT),
+                  ("requirements", TEXT), ("preferred_skills", TEXT)],
+         "weights": {"title": 10, "preferred_skills": 5, "requirements": 3, "description": 2, "detailed_description": 1},
+         "default_language": "english"},
+    ],
+    "companies": [
+        # get_company_info
+        {"name": "name", "keys": [("name", ASCENDING)]},
+        # incremental loads in data_transformation.py upsert companies by company_id
+        {"name": "company_id", "keys": [("company_id", ASCENDING)]},
+    ],
+    "industries": [
+        # get_industry_info, add_industry_info and the industry check in create_job_post
+        {"name": "industry_name", "keys": [("industry_name", ASCENDING)]},
+    ],
+    "jobs_archive": [
+        # include_expired lookups by job_id; the sweep upserts archived jobs by job_id
+        {"name": "job_id_unique", "keys": [("job_id", ASCENDING)], "unique": True},
+    ],
+    "pending_writes": [
+        # Confirmation tokens of the update and delete previews (looked up by _id) are removed once expired
+        {"name": "expires_at_ttl", "keys": [("expires_at", ASCENDING)], "expireAfterSeconds": 0},
+    ],
+}
+
+
+# A representative query for every read route, used by the explain report.
+ROUTE_QUERIES = [
+    {"route": "/search_by_job_id/<job_id>", "collection": "jobs",
+     "filter": {"job_id": 1}},
+    {"route": "/update_by_job_title", "collection": "jobs",
+     "filter": {"title": "Data Scientist", "company_name": "DataDive Analytics"}},
+    {"route": "/delete_by_job_title", "collection": "jobs",
+     "filter": {"title": "Data Scientist", "job_id": 1}},
+    {"route": "/jobs_by_salary", "collection": "jobs",
+     "filter": {"$and": [{"average_salary": {"$gte": 80000}}, {"average_salary": {"$lte": 90000}}]},
+     "sort": [("average_salary", ASCENDING), ("job_id", ASCENDING)]},
+    {"route": "/jobs_by_experience", "collection": "jobs",
+     "filter": {"experience_level": {"$in": ["Entry Level", "Mid Level"]}},
+     "sort": [("experience_level", ASCENDING), ("job_id", ASCENDING)]},
+    {"route": "/search_by_industry/", "collection": "jobs",
+     "filter": {"industry_name": "Finance"},
+     "sort": [("job_id", ASCENDING)]},
+    {"route": "/top_companies_by_industry", "collection": "jobs",
+     "pipeline": utils.top_companies_pipeline("Finance")},
+    {"route": "/search", "collection": "jobs",
+     "pipeline": search.search_pipeline(search.search_query({"q": "data scientist", "remote": True}),
+                                        search.search_projection(None), 100)[0]},
+    {"route": "/industry_stats", "collection": "industry_stats",
+     "filter": {"_id": "Finance"}},
+    {"route": "/industry_info", "collection": "industries",
+     "filter": {"industry_name": "Finance"}},
+    {"route": "/company_info", "collection": "companies",
+     "filter": {"name": "DataDive Analytics"}},
+]
+
+
+def _index_options(spec):
+    """
+    Split an index declaration into its key pattern and create_index options.
+    """
+    options = {key: value for key, value in spec.items() if key != "keys"}
+    return spec["keys"], options
+
+
+def _text_weights(keys, options):
+    """
+    The field weights of a declared text index (fields without a weight count 1).
+    """
+    weights = options.get("weights", {})
+    return {field: weights.get(field, 1) for field, kind in keys if kind == TEXT}
+
+
+def _same_keys(existing, keys, options):
+    """
+    Check whether an existing index (from index_information) has the declared key pattern.
+    Text indexes are stored with an internal key pattern, so their indexed fields are compared instead.
+    """
+    if any(kind == TEXT for _, kind in keys):
+        return set(existing.get("weights", {})) == set(_text_weights(keys, options))
+    return list(existing["key"]) == keys
+
+
+def _same_options(existing, keys, options):
+    """
+    Check whether an existing index (from index_information) matches the declared options.
+    """
+    if any(kind == TEXT for _, kind in keys):
+        if existing.get("weights") != _text_weights(keys, options):
+            return False
+    return (bool(existing.get("unique", False)) == bool(options.get("unique", False))
+            and existing.get("expireAfterSeconds") == options.get("expireAfterSeconds"))
+
+
+def ensure_indexes(db, collections=None, drop_unmanaged=False, suffix=""):
+    """
+    Reconcile the declared indexes against the live database.
+
+    Missing indexes are created, indexes whose key pattern or options differ from the
+    declaration are dropped and rebuilt, and indexes that are not declared are reported
+    (and dropped only when drop_unmanaged is True). With a suffix (eg. '_staging') the
+    indexes declared for each collection are built on '<collection><suffix>' instead, so
+    a freshly loaded collection is indexed before it is renamed into place.
+
+    Returns:
+    list: One dict per action taken, with 'collection', 'index' and 'action' keys
+    """
+    report = []
+    for collection_name, specs in REQUIRED_INDEXES.items():
+        if collections and collection_name not in collections:
+            continue
+
+        collection = db[collection_name + suffix]
+        collection_name = collection.name
+        existing = collection.index_information()
+        declared_names = set()
+
+        for spec in specs:
+            keys, options = _index_options(spec)
+            name = options["name"]
+            declared_names.add(name)
+
+            # Look for an index that already has the declared key pattern, whatever its name
+            match_name = next((index_name for index_name, info in existing.items() if _same_keys(info, keys, options)), None)
+
+            if match_name and _same_options(existing[match_name], keys, options):
+                report.append({"collection": collection_name, "index": match_name, "action": "ok"})
+                declared_names.add(match_name)
+                continue
+
+            # Same keys with different options, or the name is taken by a different key pattern
+            for stale_name in {match_name, name if name in existing else None} - {None}:
+                collection.drop_index(stale_name)
+                report.append({"collection": collection_name, "index": stale_name, "action": "dropped"})
+
+            try:
+                collection.create_index(keys, **options)
+                report.append({"collection": collection_name, "index": name, "action": "created"})
+            except OperationFailure as e:
+                # e.g. a unique index cannot be built because duplicates already exist
+                report.append({"collection": collection_name, "index": name, "action": "failed", "details": str(e)})
+
+        for index_name in existing:
+            if index_name == "_id_" or index_name in declared_names:
+                continue
+            if drop_unmanaged:
+                collection.drop_index(index_name)
+                report.append({"collection": collection_name, "index": index_name, "action": "dropped"})
+            else:
+                report.append({"collection": collection_name, "index": index_name, "action": "unmanaged"})
+
+    return report
+
+
+def _winning_stages(explain_output):
+    """
+    Yield every stage name in the winning plan(s) of an explain document.
+
+    Rejected plans are skipped, and aggregation explains are searched through their
+    nested '$cursor' / 'shards' sections.
+    """
+    if isinstance(explain_output, dict):
+        for key, value in explain_output.items():
+            if key == "rejectedPlans":
+                continue
+            if key == "stage" and isinstance(value, str):
+                yield value
+            else:
+                yield from _winning_stages(value)
+    elif isinstance(explain_output, list):
+        for item in explain_output:
+            yield from _winning_stages(item)
+
+
+def explain_route_queries(db):
+    """
+    Run explain() on the query behind every read route. A 'SORT' stage in the result
+    means the route's page order is not provided by an index.
+
+    Returns:
+    list: One dict per route with 'route', 'stages' and 'collscan' keys
+    """
+    results = []
+    for route_query in ROUTE_QUERIES:
+        collection = db[route_query["collection"]]
+        if "pipeline" in route_query:
+            explain_output = db.command(
+                "explain",
+                {"aggregate": collection.name, "pipeline": route_query["pipeline"], "cursor": {}},
+                verbosity="queryPlanner",
+            )
+        else:
+            cursor = collection.find(route_query["filter"])
+            if "sort" in route_query:
+                cursor = cursor.sort(route_query["sort"])
+            explain_output = cursor.explain()
+
+        stages = sorted(set(_winning_stages(explain_output)))
+        results.append({
+            "route": route_query["route"],
+            "stages": stages,
+            "collscan": "COLLSCAN" in stages,
+        })
+    return results
+
+
+def main(argv=None):
+    """
+    Command line entry point: python -m app.indexes [--ensure] [--explain]
+
+    Returns:
+    int: Exit code, 1 if index creation failed or any route query falls back to a COLLSCAN
+    """
+    parser = argparse.ArgumentParser(description="Create and check the Career Hub MongoDB indexes")
+    parser.add_argument("--uri", default=config.MONGO_URI, help="MongoDB connection string")
+    parser.add_argument("--db", default=config.MONGO_DB, help="Database name")
+    parser.add_argument("--ensure", action="store_true", help="Create or rebuild the declared indexes")
+    parser.add_argument("--drop-unmanaged", action="store_true", help="Drop indexes that are not declared")
+    parser.add_argument("--explain", action="store_true", help="Explain every route query and fail on COLLSCAN")
+    args = parser.parse_args(argv)
+
+    db = MongoClient(args.uri, **client_options())[args.db]
+    exit_code = 0
+
+    if args.ensure or not args.explain:
+        for entry in ensure_indexes(db, drop_unmanaged=args.drop_unmanaged):
+            print(f"{entry['collection']}.{entry['index']}: {entry['action']}" + (f" ({entry['details']})" if 'details' in entry else ""))
+            if entry["action"] == "failed":
+                exit_code = 1
+
+    if args.explain:
+        for result in explain_route_queries(db):
+            status = "COLLSCAN" if result["collscan"] else "ok"
+            print(f"{result['route']}: {status} [{', '.join(result['stages'])}]")
+            if result["collscan"]:
+                exit_code = 1
+
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
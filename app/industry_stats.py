@@ -0,0 +1,398 @@
+'''Module for the materialized industry analytics in the industry_stats collection
+
+One document per industry (_id is the industry name) holds the job count, salary mean
+and percentiles, experience level distribution and remote share of its jobs, the
+companies ordered by job count, and the mean of the industry's growth rates. The
+documents are written by aggregations ending in $merge, either for every industry or
+only for the industries whose jobs changed, so the analytics routes read one document
+by _id instead of aggregating the jobs collection on every request.
+
+Each refresh finishes by fixing up the documents in its scope that it did not write, so
+two refreshes must never overlap: one process refreshes at a time, holding a lease (see
+leases.py). Every app process queues its own changed industries, and only one of them
+runs each scheduled full refresh.
+
+Refresh every industry by hand (eg. from cron) with:
+    python -m app.industry_stats
+'''
+
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+from bisect import bisect_right
+
+from bson import ObjectId
+from pymongo import MongoClient
+
+from app import config, leases
+from app.db import client_options
+
+
+STATS_COLLECTION = "industry_stats"
+
+# Lease held while a refresh runs (longer than a full refresh takes), and how often a
+# refresh that has to wait for it tries again
+REFRESH_LEASE = "industry_stats_refresh"
+REFRESH_LEASE_SECONDS = 900
+LEASE_POLL_SECONDS = 1
+
+# Lease taken for full_interval seconds by the process that runs the scheduled full refresh
+FULL_REFRESH_LEASE = "industry_stats_full_refresh"
+
+# Salary percentiles stored for each industry
+SALARY_PERCENTILES = [0.1, 0.25, 0.5, 0.75, 0.9]
+EXPERIENCE_LEVELS = ["Entry Level", "Mid Level", "Senior Level"]
+
+# Companies stored per industry, pages past them are aggregated from the jobs collection
+STORED_TOP_COMPANIES = 1000
+
+# Job statistics of an industry that no longer has any jobs
+EMPTY_JOB_STATS = {
+    "job_count": 0,
+    "average_salary": None,
+    "salary_percentiles": {},
+    "experience_levels": {level: 0 for level in EXPERIENCE_LEVELS},
+    "remote_share": None,
+    "company_count": 0,
+    "top_companies": []
+}
+
+
+def _industry_match(field, industries):
+    return [{"$match": {field: {"$in": list(industries)}}}] if industries is not None else []
+
+
+def _merge(refresh_field, refresh_id):
+    # Every document a refresh writes is stamped with its id, so the ones it did not write can be found
+    return [
+        {"$addFields": {refresh_field: refresh_id}},
+        {"$merge": {"into": STATS_COLLECTION, "on": "_id", "whenMatched": "merge", "whenNotMatched": "insert"}}
+    ]
+
+
+def job_stats_pipeline(refresh_id, industries=None):
+    """
+    Job count, salary statistics, experience level distribution and remote share per industry.
+
+    Returns:
+    list: The aggregation pipeline (on jobs)
+    """
+    return _industry_match("industry_name", industries) + [
+        {"$group": {
+            "_id": "$industry_name",
+            "job_count": {"$sum": 1},
+            "average_salary": {"$avg": "$average_salary"},
+            "salary_percentiles": {"$percentile": {"input": "$average_salary", "p": SALARY_PERCENTILES, "method": "approximate"}},
+            "remote_jobs": {"$sum": {"$cond": [{"$eq": ["$remote", True]}, 1, 0]}},
+            **{f"experience_{position}": {"$sum": {"$cond": [{"$eq": ["$experience_level", level]}, 1, 0]}}
+               for position, level in enumerate(EXPERIENCE_LEVELS)}
+        }},
+        {"$project": {
+            "job_count": 1,
+            "average_salary": 1,
+            "salary_percentiles": {f"p{round(p * 100)}": {"$arrayElemAt": ["$salary_percentiles", position]}
+                                   for position, p in enumerate(SALARY_PERCENTILES)},
+            "remote_share": {"$divide": ["$remote_jobs", "$job_count"]},
+            "experience_levels": {level: f"$experience_{position}" for position, level in enumerate(EXPERIENCE_LEVELS)}
+        }}
+    ] + _merge("jobs_refresh_id", refresh_id)
+
+
+def top_companies_pipeline(refresh_id, industries=None):
+    """
+    Companies of each industry ordered by job count (highest first) then name, the same
+    order as utils.top_companies_pipeline.
+
+    Returns:
+    list: The aggregation pipeline (on jobs)
+    """
+    return _industry_match("industry_name", industries) + [
+        {"$group": {"_id": {"industry_name": "$industry_name", "company_name": "$company_name"}, "job_count": {"$sum": 1}}},
+        {"$sort": {"_id.industry_name": 1, "job_count": -1, "_id.company_name": 1}},
+        {"$group": {
+            "_id": "$_id.industry_name",
+            "companies": {"$push": {"company_name": "$_id.company_name", "job_count": "$job_count"}},
+            "company_count": {"$sum": 1}
+        }},
+        {"$project": {"company_count": 1, "top_companies": {"$slice": ["$companies", STORED_TOP_COMPANIES]}}}
+    ] + _merge("jobs_refresh_id", refresh_id)
+
+
+def growth_pipeline(refresh_id, industries=None):
+    """
+    Mean growth rate of each industry.
+
+    Returns:
+    list: The aggregation pipeline (on industries)
+    """
+    return _industry_match("industry_name", industries) + [
+        {"$project": {"_id": "$industry_name", "mean_growth_rate": {"$avg": "$growth_rates"}}}
+    ] + _merge("info_refresh_id", refresh_id)
+
+
+def refresh_plan(industries=None):
+    """
+    The aggregations that rebuild the statistics of the given industries (all when None).
+
+    Returns:
+    tuple: (refresh id, list of (collection name, pipeline))
+    """
+    refresh_id = ObjectId()
+    return refresh_id, [
+        ("jobs", job_stats_pipeline(refresh_id, industries)),
+        ("jobs", top_companies_pipeline(refresh_id, industries)),
+        ("industries", growth_pipeline(refresh_id, industries)),
+    ]
+
+
+def cleanup_operations(refresh_id, industries=None):
+    """
+    Fix up the statistics documents in scope that a refresh did not write: industries
+    with neither jobs nor industry info are removed, and the job or growth statistics
+    of industries that only have one of them are cleared.
+
+    Returns:
+    list: (method name, filter, update or None) to apply to the industry_stats collection
+    """
+    scope = {"_id": {"$in": list(industries)}} if industries is not None else {}
+    no_jobs = {"jobs_refresh_id": {"$ne": refresh_id}}
+    no_info = {"info_refresh_id": {"$ne": refresh_id}}
+    return [
+        ("delete_many", {**scope, **no_jobs, **no_info}, None),
+        ("update_many", {**scope, **no_jobs}, {"$set": EMPTY_JOB_STATS}),
+        ("update_many", {**scope, **no_info}, {"$set": {"mean_growth_rate": None}}),
+    ]
+
+
+def refresh(db, industries=None, wait=True):
+    """
+    Rebuild the statistics of the given industries, or of every industry, holding the
+    refresh lease. When another process is refreshing, wait for it to finish, or with
+    wait=False give up.
+
+    Returns:
+    bool: Whether the refresh ran
+    """
+    refresh_id, plan = refresh_plan(industries)
+    owner = str(refresh_id)
+    while not leases.acquire(db, REFRESH_LEASE, owner, REFRESH_LEASE_SECONDS):
+        if not wait:
+            return False
+        time.sleep(LEASE_POLL_SECONDS)
+    try:
+        for collection_name, pipeline in plan:
+            db[collection_name].aggregate(pipeline)
+        for method, query, update in cleanup_operations(refresh_id, industries):
+            getattr(db[STATS_COLLECTION], method)(*([query, update] if update else [query]))
+    finally:
+        leases.release(db, REFRESH_LEASE, owner)
+    return True
+
+
+async def refresh_async(db, industries=None, wait=True):
+    """
+    refresh() through the async client.
+    """
+    refresh_id, plan = refresh_plan(industries)
+    owner = str(refresh_id)
+    while not await leases.acquire_async(db, REFRESH_LEASE, owner, REFRESH_LEASE_SECONDS):
+        if not wait:
+            return False
+        await asyncio.sleep(LEASE_POLL_SECONDS)
+    try:
+        for collection_name, pipeline in plan:
+            cursor = await db[collection_name].aggregate(pipeline)
+            await cursor.to_list(None)
+        for method, query, update in cleanup_operations(refresh_id, industries):
+            await getattr(db[STATS_COLLECTION], method)(*([query, update] if update else [query]))
+    finally:
+        await leases.release_async(db, REFRESH_LEASE, owner)
+    return True
+
+
+def top_companies_page(stats, after, limit):
+    """
+    Take one page of top companies from an industry's statistics document. after is
+    the [job_count, company_name] of the last company seen.
+
+    Returns:
+    list: Up to limit companies, or None if the page runs past the stored companies
+    """
+    companies = stats.get("top_companies", [])
+    start = 0
+    if after is not None:
+        # The list is ordered by job_count descending, then company_name ascending
+        start = bisect_right(companies, (-after[0], after[1] or ""),
+                             key=lambda company: (-company["job_count"], company["company_name"] or ""))
+    page = companies[start:start + limit]
+    if len(page) < limit and stats.get("company_count", 0) > len(companies):
+        return None
+    return page
+
+
+def cache_tags(industries):
+    """
+    Returns:
+    list: The result cache tags of the results built from the refreshed statistics (None for every industry)
+    """
+    if industries is None:
+        return ["industry_stats"]
+    return [f"industry:{industry}" for industry in industries]
+
+
+class IndustryStatsRefresher:
+    """
+    Background thread that refreshes the statistics of the industries marked as changed
+    every interval seconds, and of every industry every full_interval seconds (0 never).
+    on_refresh is called with the refreshed industries (None for all of them). The
+    asyncio API queues industries and calls run_once_async() from its own task instead.
+    """
+
+    def __init__(self, get_db, interval=5, full_interval=0, on_refresh=None):
+        self.get_db = get_db
+        self.interval = interval
+        self.full_interval = full_interval
+        self.on_refresh = on_refresh
+        self._changed = set()
+        self._changed_all = False
+        self._lock = threading.Lock()
+        self._thread = None
+        self._thread_pid = None
+        self._last_full = time.monotonic()
+        self.last_error = None
+
+    def queue(self, industries):
+        """
+        Queue the given industries for the next refresh (None for every industry).
+
+        Returns:
+        bool: Whether any industry was queued
+        """
+        if industries is None:
+            with self._lock:
+                self._changed_all = True
+            return True
+        industries = {industry for industry in industries if industry}
+        if not industries:
+            return False
+        with self._lock:
+            self._changed |= industries
+        return True
+
+    def mark(self, industries):
+        """
+        Queue the given industries (None for every industry) for the next refresh, starting the thread if needed.
+        """
+        if self.queue(industries):
+            self.start()
+
+    def start(self):
+        # A forked worker does not inherit the thread, so it is started again per process
+        if self._thread is None or self._thread_pid != os.getpid() or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or self._thread_pid != os.getpid() or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name="industry-stats-refresher", daemon=True)
+                    self._thread_pid = os.getpid()
+                    self._thread.start()
+
+    def _due(self):
+        # The queued industries (taken off the queue), whether every industry was queued
+        # and whether the scheduled full refresh is due
+        with self._lock:
+            changed, self._changed = self._changed, set()
+            changed_all, self._changed_all = self._changed_all, False
+        full = bool(self.full_interval) and time.monotonic() - self._last_full >= self.full_interval
+        return changed, changed_all, full
+
+    def _skip_full(self):
+        # Another process runs the full refresh of this interval
+        self._last_full = time.monotonic()
+        return False
+
+    def _finish(self, changed, changed_all, full, refreshed):
+        if not refreshed:
+            # Another process is refreshing, or the refresh failed: try again on the next run
+            with self._lock:
+                self._changed |= changed
+                self._changed_all = self._changed_all or changed_all
+            return set()
+        if full:
+            self._last_full = time.monotonic()
+        if self.on_refresh:
+            self.on_refresh(None if full else changed)
+        return None if full else changed
+
+    def run_once(self):
+        """
+        Refresh the changed industries now (or every industry when the full refresh is due).
+
+        Returns:
+        set: The refreshed industries, None if every industry was refreshed
+        """
+        changed, changed_all, full = self._due()
+        if not changed and not changed_all and not full:
+            return set()
+        db = self.get_db()
+        try:
+            # The scheduled full refresh runs in one process, a queued one in this process
+            if full and not changed_all and not leases.acquire(db, FULL_REFRESH_LEASE, leases.process_owner(), self.full_interval):
+                full = self._skip_full()
+            full = full or changed_all
+            refreshed = bool(full or changed) and refresh(db, None if full else changed, wait=False)
+        except Exception as e:
+            self.last_error = str(e)
+            refreshed = False
+        return self._finish(changed, changed_all, full, refreshed)
+
+    async def run_once_async(self):
+        """
+        run_once() through the async client, for a get_db returning an async database.
+        """
+        changed, changed_all, full = self._due()
+        if not changed and not changed_all and not full:
+            return set()
+        db = self.get_db()
+        try:
+            if full and not changed_all and not await leases.acquire_async(db, FULL_REFRESH_LEASE, leases.process_owner(), self.full_interval):
+                full = self._skip_full()
+            full = full or changed_all
+            refreshed = bool(full or changed) and await refresh_async(db, None if full else changed, wait=False)
+        except Exception as e:
+            self.last_error = str(e)
+            refreshed = False
+        return self._finish(changed, changed_all, full, refreshed)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            self.run_once()
+
+
+def main(argv=None):
+    """
+    Command line entry point: python -m app.industry_stats [--industry NAME ...]
+
+    Returns:
+    int: Exit code
+    """
+    parser = argparse.ArgumentParser(description="Refresh the Career Hub industry_stats collection")
+    parser.add_argument("--uri", default=config.MONGO_URI, help="MongoDB connection string")
+    parser.add_argument("--db", default=config.MONGO_DB, help="Database name")
+    parser.add_argument("--industry", action="append", help="Only refresh this industry (repeatable)")
+    args = parser.parse_args(argv)
+
+    client = MongoClient(args.uri, **client_options())
+    try:
+        started = time.perf_counter()
+        refresh(client[args.db], args.industry)
+        print(f"Refreshed industry stats in {time.perf_counter() - started:.1f}s")
+    finally:
+        client.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
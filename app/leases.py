@@ -0,0 +1,81 @@
+'''Module for the leases that keep background work to one process at a time
+
+A lease is a document in the locks collection (_id is the lease name) with its owner
+and an expiry date. Taking it is one find_one_and_update with upsert: it matches when
+the lease is free, expired or already held by the same owner, and when another owner
+holds it the upsert tries to insert a second document with the same _id and fails with
+a duplicate key error. A lease that is not released (eg. the process died) is free
+again once it expires.
+'''
+
+import os
+import socket
+from datetime import datetime, timedelta
+
+from pymongo.errors import DuplicateKeyError
+
+
+LOCKS_COLLECTION = "locks"
+
+
+def process_owner():
+    """
+    Returns:
+    str: The lease owner name of this process
+    """
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def lease_update(name, owner, seconds, now=None):
+    """
+    The find_one_and_update arguments that take the lease for seconds, if it is free,
+    expired or already held by owner.
+
+    Returns:
+    tuple: (filter, update)
+    """
+    now = now or datetime.utcnow()
+    return (
+        {"_id": name, "$or": [{"expires_at": {"$lt": now}}, {"owner": owner}]},
+        {"$set": {"owner": owner, "expires_at": now + timedelta(seconds=seconds)}}
+    )
+
+
+def acquire(db, name, owner, seconds):
+    """
+    Returns:
+    bool: Whether owner holds the lease for the next seconds
+    """
+    query, update = lease_update(name, owner, seconds)
+    try:
+        db[LOCKS_COLLECTION].find_one_and_update(query, update, upsert=True)
+    except DuplicateKeyError:
+        # Held by another owner: the upsert tried to insert a second lease document
+        return False
+    return True
+
+
+def release(db, name, owner):
+    """
+    Give the lease up before it expires, if owner still holds it.
+    """
+    db[LOCKS_COLLECTION].delete_one({"_id": name, "owner": owner})
+
+
+async def acquire_async(db, name, owner, seconds):
+    """
+    acquire() through the async client.
+    """
+    query, update = lease_update(name, owner, seconds)
+    try:
+        await db[LOCKS_COLLECTION].find_one_and_update(query, update, upsert=True)
+    except DuplicateKeyError:
+        return False
+    return True
+
+
+async def release_async(db, name, owner):
+    """
+    release() through the async client.
+    """
+    await db[LOCKS_COLLECTION].delete_one({"_id": name, "owner": owner})
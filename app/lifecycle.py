@@ -0,0 +1,277 @@
+'''Module for the job posting lifecycle: archiving postings past their closing date
+
+With CAREERHUB_JOB_EXPIRY_POLICY=archive, jobs whose closing_date is more than
+CAREERHUB_JOB_EXPIRY_GRACE_DAYS in the past are moved from jobs to jobs_archive in
+batches, so every scan, aggregation and salary query only touches live postings. The
+read routes that list or look up jobs can opt back into the archived postings with
+"include_expired": true, which adds the archive to the query with $unionWith.
+
+closing_date is a date from the data loader, but jobs created through the API may
+carry it as a 'YYYY-MM-DD' string, so both forms are matched. A TTL index cannot move
+documents, only delete them, so the move is done by a sweeper: a background thread in
+each app process (only one process sweeps per interval, through a lease document), or
+by hand / cron with:
+    python -m app.lifecycle [--grace-days N] [--dry-run]
+'''
+
+import argparse
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+from pymongo import MongoClient, ReplaceOne
+
+from app import config, leases, utils
+from app.db import client_options
+
+
+ARCHIVE_COLLECTION = "jobs_archive"
+# Lease (in the locks collection of leases.py) held by the process that sweeps
+LEASE_ID = "job_expiry_sweep"
+
+
+def include_expired(body):
+    """
+    Returns:
+    bool: Whether a read request asked for archived postings too
+    """
+    return isinstance(body, dict) and body.get('include_expired') in (True, 'true')
+
+
+def expired_query(cutoff):
+    """
+    Jobs whose closing_date (a date, or a 'YYYY-MM-DD' string) is before the cutoff.
+
+    Returns:
+    dict: The query
+    """
+    return {"$or": [
+        {"closing_date": {"$lt": cutoff}},
+        {"closing_date": {"$gte": "0000-00-00", "$lt": cutoff.strftime("%Y-%m-%d")}}
+    ]}
+
+
+def cutoff_for(grace_days, now=None):
+    """
+    Returns:
+    datetime: Jobs that closed before this are expired
+    """
+    return (now or datetime.utcnow()) - timedelta(days=grace_days)
+
+
+def archive_operations(jobs, archived_at):
+    """
+    Upserts of the jobs into the archive, keyed by job_id, so archiving the same job
+    again (eg. after a crash between the copy and the delete, or after a full reload
+    brought it back) replaces its archived copy instead of duplicating it.
+
+    Returns:
+    list: The ReplaceOne operations
+    """
+    operations = []
+    for job in jobs:
+        document = {key: value for key, value in job.items() if key != "_id"}
+        document["archived_at"] = archived_at
+        key = {"job_id": job["job_id"]} if job.get("job_id") is not None else {"_id": job["_id"]}
+        operations.append(ReplaceOne(key, document, upsert=True))
+    return operations
+
+
+def sweep(db, grace_days=30, batch_size=1000, now=None, dry_run=False):
+    """
+    Move every expired job to the archive, batch_size jobs at a time: each batch is
+    copied with one bulk upsert, then deleted from jobs by _id.
+
+    Returns:
+    dict: 'archived' (number of jobs), 'job_ids' and 'industries' of the moved jobs
+    """
+    query = expired_query(cutoff_for(grace_days, now))
+    if dry_run:
+        return {"archived": db.jobs.count_documents(query), "job_ids": [], "industries": set()}
+
+    archived_at = now or datetime.utcnow()
+    job_ids, industries = [], set()
+    while True:
+        jobs = list(db.jobs.find(query).sort("_id", 1).limit(batch_size))
+        if not jobs:
+            break
+        db[ARCHIVE_COLLECTION].bulk_write(archive_operations(jobs, archived_at), ordered=False)
+        db.jobs.delete_many({"_id": {"$in": [job["_id"] for job in jobs]}})
+        job_ids.extend(job.get("job_id") for job in jobs)
+        industries.update(job.get("industry_name") for job in jobs)
+    return {"archived": len(job_ids), "job_ids": job_ids, "industries": industries - {None}}
+
+
+async def sweep_async(db, grace_days=30, batch_size=1000, now=None):
+    """
+    sweep() through the async client.
+    """
+    query = expired_query(cutoff_for(grace_days, now))
+    archived_at = now or datetime.utcnow()
+    job_ids, industries = [], set()
+    while True:
+        jobs = await db.jobs.find(query).sort("_id", 1).limit(batch_size).to_list(None)
+        if not jobs:
+            break
+        await db[ARCHIVE_COLLECTION].bulk_write(archive_operations(jobs, archived_at), ordered=False)
+        await db.jobs.delete_many({"_id": {"$in": [job["_id"] for job in jobs]}})
+        job_ids.extend(job.get("job_id") for job in jobs)
+        industries.update(job.get("industry_name") for job in jobs)
+    return {"archived": len(job_ids), "job_ids": job_ids, "industries": industries - {None}}
+
+
+def archive_projection(projection):
+    """
+    Returns:
+    dict: The projection for archived jobs, the same fields without the archived_at stamp
+    """
+    if any(value == 1 for field, value in projection.items() if field != "_id"):
+        return projection
+    return {**projection, "archived_at": 0}
+
+
+def union_pipeline(query, projection, sort_keys=None, limit=None):
+    """
+    The aggregation over jobs and jobs_archive that replaces find(query, projection)
+    .sort(sort_keys).limit(limit) when archived postings are included.
+
+    Returns:
+    list: The aggregation pipeline (on jobs)
+    """
+    pipeline = [
+        {"$match": query},
+        {"$unionWith": {"coll": ARCHIVE_COLLECTION, "pipeline": [{"$match": query}]}}
+    ]
+    if sort_keys:
+        pipeline.append({"$sort": dict(sort_keys)})
+    if limit:
+        pipeline.append({"$limit": limit})
+    pipeline.append({"$project": archive_projection(projection)})
+    return pipeline
+
+
+def find_page(db, query, projection, sort_keys, limit, after=None, include_archived=False):
+    """
+    utils.find_page on the jobs collection, or on jobs and jobs_archive together.
+
+    Returns:
+    tuple: (list of documents, next cursor token or None on the last page)
+    """
+    if not include_archived:
+        return utils.find_page(db.jobs, query, projection, sort_keys, limit, after)
+    query, projection, added_fields = utils.prepare_page(query, projection, sort_keys, after)
+    documents = list(db.jobs.aggregate(union_pipeline(query, projection, sort_keys, limit + 1)))
+    return utils.finish_page(documents, sort_keys, limit, added_fields)
+
+
+def find_jobs(db, query, projection, include_archived=False):
+    """
+    Returns:
+    Cursor: The jobs matching the query, with the archived ones when asked for
+    """
+    if not include_archived:
+        return db.jobs.find(query, projection)
+    return db.jobs.aggregate(union_pipeline(query, projection))
+
+
+class JobExpirySweeper:
+    """
+    Background thread that archives the expired jobs every interval seconds. Every app
+    process runs one, and the lease makes sure only one of them sweeps per interval.
+    on_sweep is called with the result of each sweep that moved jobs. The asyncio API
+    calls run_once_async() from its own task instead of starting the thread.
+    """
+
+    def __init__(self, get_db, interval=3600, grace_days=30, batch_size=1000, on_sweep=None):
+        self.get_db = get_db
+        self.interval = interval
+        self.grace_days = grace_days
+        self.batch_size = batch_size
+        self.on_sweep = on_sweep
+        self._lock = threading.Lock()
+        self._thread = None
+        self._thread_pid = None
+        self.last_error = None
+
+    def start(self):
+        # A forked worker does not inherit the thread, so it is started again per process
+        if self._thread is None or self._thread_pid != os.getpid() or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or self._thread_pid != os.getpid() or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name="job-expiry-sweeper", daemon=True)
+                    self._thread_pid = os.getpid()
+                    self._thread.start()
+
+    def run_once(self):
+        """
+        Sweep now if no other process holds the lease.
+
+        Returns:
+        dict: The sweep result, None if another process is sweeping or the sweep failed
+        """
+        db = self.get_db()
+        try:
+            if not leases.acquire(db, LEASE_ID, leases.process_owner(), self.interval):
+                return None
+            result = sweep(db, self.grace_days, self.batch_size)
+        except Exception as e:
+            # Try again on the next run
+            self.last_error = str(e)
+            return None
+        if result["archived"] and self.on_sweep:
+            self.on_sweep(result)
+        return result
+
+    async def run_once_async(self):
+        """
+        run_once() through the async client, for a get_db returning an async database.
+        on_sweep is awaited.
+        """
+        db = self.get_db()
+        try:
+            if not await leases.acquire_async(db, LEASE_ID, leases.process_owner(), self.interval):
+                return None
+            result = await sweep_async(db, self.grace_days, self.batch_size)
+        except Exception as e:
+            self.last_error = str(e)
+            return None
+        if result["archived"] and self.on_sweep:
+            await self.on_sweep(result)
+        return result
+
+    def _run(self):
+        while True:
+            self.run_once()
+            time.sleep(self.interval)
+
+
+def main(argv=None):
+    """
+    Command line entry point: python -m app.lifecycle [--grace-days N] [--dry-run]
+
+    Returns:
+    int: Exit code
+    """
+    parser = argparse.ArgumentParser(description="Archive the Career Hub jobs past their closing date")
+    parser.add_argument("--uri", default=config.MONGO_URI, help="MongoDB connection string")
+    parser.add_argument("--db", default=config.MONGO_DB, help="Database name")
+    parser.add_argument("--grace-days", type=int, default=config.JOB_EXPIRY_GRACE_DAYS, help="Days after closing_date a job is kept")
+    parser.add_argument("--batch-size", type=int, default=config.JOB_EXPIRY_BATCH_SIZE, help="Jobs moved per batch")
+    parser.add_argument("--dry-run", action="store_true", help="Only count the expired jobs")
+    args = parser.parse_args(argv)
+
+    client = MongoClient(args.uri, **client_options())
+    try:
+        started = time.perf_counter()
+        result = sweep(client[args.db], args.grace_days, args.batch_size, dry_run=args.dry_run)
+        action = "would be archived" if args.dry_run else "archived"
+        print(f"{result['archived']} expired jobs {action} in {time.perf_counter() - started:.1f}s")
+    finally:
+        client.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
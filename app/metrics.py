@@ -0,0 +1,300 @@
+'''Module for the per-route and per-command metrics served on /metrics
+
+Each request is timed from before_request until its response is closed (for NDJSON
+streams, until the last line is sent), and counted per route (the URL rule, eg.
+/search_by_job_id/<job_id>), method and status. Its response size, the time spent
+encoding JSON and, through a PyMongo CommandListener, the MongoDB time, round trips and
+documents returned while it ran are recorded in histograms per route. The listener also
+keeps per-command totals for every MongoDB command of the process, including the ones
+sent by background threads.
+
+Recording is a few additions under a lock, so it is meant to stay on in production
+(CAREERHUB_METRICS=0 turns it off). The metrics are per process, like /pool_stats:
+scrape every worker, or run a single worker per container.
+'''
+
+import contextvars
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+
+from pymongo import monitoring
+
+
+# Upper bounds of the histogram buckets
+LATENCY_BUCKETS_SECONDS = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+SIZE_BUCKETS_BYTES = [256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216]
+ROUND_TRIP_BUCKETS = [0, 1, 2, 3, 5, 10, 25, 50, 100]
+DOCUMENT_BUCKETS = [0, 1, 10, 100, 1000, 10000, 100000]
+
+# The apps add the utf-8 charset to text responses
+PROMETHEUS_MIMETYPE = "text/plain; version=0.0.4"
+
+# The request being served by the current thread or asyncio task
+_current_request = contextvars.ContextVar("careerhub_request", default=None)
+
+
+class RequestStats:
+    """
+    What one request spent outside the route's own code. asyncio.gather() copies the
+    context, so the concurrent queries of an async route add to the same object.
+    """
+
+    __slots__ = ("started", "db_seconds", "round_trips", "documents", "serialize_seconds")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_seconds = 0.0
+        self.round_trips = 0
+        self.documents = 0
+        self.serialize_seconds = 0.0
+
+
+class Histogram:
+    """
+    Bucket counts, sum and count of the observed values, per label set.
+    """
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.series = defaultdict(lambda: [[0] * (len(bounds) + 1), 0.0, 0])
+
+    def observe(self, labels, value):
+        series = self.series[labels]
+        series[0][bisect_left(self.bounds, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+
+def _labels(names, values):
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _render_histogram(lines, name, help_text, histogram, label_names):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    bounds = [str(bound) for bound in histogram.bounds] + ["+Inf"]
+    for labels, (buckets, total, count) in sorted(histogram.series.items()):
+        cumulative = 0
+        for bound, bucket_count in zip(bounds, buckets):
+            cumulative += bucket_count
+            lines.append(f"{name}_bucket{_labels(label_names + ('le',), labels + (bound,))} {cumulative}")
+        lines.append(f"{name}_sum{_labels(label_names, labels)} {round(total, 6)!r}")
+        lines.append(f"{name}_count{_labels(label_names, labels)} {count}")
+
+
+def _render_counter(lines, name, help_text, counts, label_names, kind="counter"):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {kind}")
+    for labels, value in sorted(counts.items()):
+        lines.append(f"{name}{_labels(label_names, labels)} {value}")
+
+
+class RequestMetrics:
+    """
+    Per-route request counters and histograms of this process.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = defaultdict(int)  # (route, method, status) -> count
+            self.latency = Histogram(LATENCY_BUCKETS_SECONDS)
+            self.response_size = Histogram(SIZE_BUCKETS_BYTES)
+            self.db_time = Histogram(LATENCY_BUCKETS_SECONDS)
+            self.round_trips = Histogram(ROUND_TRIP_BUCKETS)
+            self.documents = Histogram(DOCUMENT_BUCKETS)
+            self.serialize_time = Histogram(LATENCY_BUCKETS_SECONDS)
+
+    def record(self, stats, route, method, status, size):
+        """
+        Record a finished request. size is None when it is not known (streamed responses
+        in the async app).
+        """
+        seconds = time.perf_counter() - stats.started
+        labels = (route, method)
+        with self._lock:
+            self.requests[(route, method, str(status))] += 1
+            self.latency.observe(labels, seconds)
+            if size is not None:
+                self.response_size.observe(labels, size)
+            self.db_time.observe(labels, stats.db_seconds)
+            self.round_trips.observe(labels, stats.round_trips)
+            self.documents.observe(labels, stats.documents)
+            self.serialize_time.observe(labels, stats.serialize_seconds)
+
+    def render(self, lines):
+        names = ("route", "method")
+        with self._lock:
+            _render_counter(lines, "careerhub_http_requests_total", "Requests served, by route, method and status.",
+                            self.requests, ("route", "method", "status"))
+            _render_histogram(lines, "careerhub_http_request_duration_seconds", "Time from the start of the request until its response was sent.",
+                              self.latency, names)
+            _render_histogram(lines, "careerhub_http_response_size_bytes", "Size of the response bodies.",
+                              self.response_size, names)
+            _render_histogram(lines, "careerhub_http_request_db_seconds", "MongoDB time of each request (sum of its command durations).",
+                              self.db_time, names)
+            _render_histogram(lines, "careerhub_http_request_db_round_trips", "MongoDB commands sent by each request.",
+                              self.round_trips, names)
+            _render_histogram(lines, "careerhub_http_request_db_documents", "Documents returned by MongoDB to each request.",
+                              self.documents, names)
+            _render_histogram(lines, "careerhub_http_request_serialize_seconds", "Time each request spent encoding JSON.",
+                              self.serialize_time, names)
+
+
+def _returned_documents(command_name, reply):
+    # find, aggregate and getMore return their documents in a cursor batch
+    if not hasattr(reply, "get"):
+        return 0
+    cursor = reply.get("cursor")
+    if not cursor:
+        return 1 if command_name == "findAndModify" and reply.get("value") else 0
+    return len(cursor.get("firstBatch") or cursor.get("nextBatch") or ())
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """
+    Command listener that times every MongoDB command of the process, and adds each
+    command's duration, round trip and returned documents to the request it ran for.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.duration = Histogram(LATENCY_BUCKETS_SECONDS)
+            self.failures = defaultdict(int)
+            self.documents = defaultdict(int)
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        seconds = event.duration_micros / 1e6
+        documents = _returned_documents(event.command_name, event.reply)
+        stats = _current_request.get()
+        if stats is not None:
+            stats.db_seconds += seconds
+            stats.round_trips += 1
+            stats.documents += documents
+        with self._lock:
+            self.duration.observe((event.command_name,), seconds)
+            if documents:
+                self.documents[(event.command_name,)] += documents
+
+    def failed(self, event):
+        seconds = event.duration_micros / 1e6
+        stats = _current_request.get()
+        if stats is not None:
+            stats.db_seconds += seconds
+            stats.round_trips += 1
+        with self._lock:
+            self.duration.observe((event.command_name,), seconds)
+            self.failures[(event.command_name,)] += 1
+
+    def render(self, lines):
+        names = ("command",)
+        with self._lock:
+            _render_histogram(lines, "careerhub_mongodb_command_duration_seconds", "Duration of the MongoDB commands, by command name.",
+                              self.duration, names)
+            _render_counter(lines, "careerhub_mongodb_command_failures_total", "MongoDB commands that failed, by command name.",
+                            self.failures, names)
+            _render_counter(lines, "careerhub_mongodb_documents_returned_total", "Documents returned by MongoDB cursors, by command name.",
+                            self.documents, names)
+
+
+request_metrics = RequestMetrics()
+command_metrics = CommandMetrics()
+
+
+def start_request():
+    """
+    Start timing the request of the current thread or task.
+
+    Returns:
+    RequestStats: The request's counters
+    """
+    stats = RequestStats()
+    _current_request.set(stats)
+    return stats
+
+
+def current_request():
+    """
+    Returns:
+    RequestStats: The counters of the request being served, None outside a request
+    """
+    return _current_request.get()
+
+
+def route_label(url_rule):
+    """
+    Returns:
+    str: The route label of a request, its URL rule (so path parameters do not create new series)
+    """
+    return url_rule.rule if url_rule is not None else "unmatched"
+
+
+def counted_body(body, sent):
+    """
+    Wrap a streamed response body so the bytes sent are added up in sent[0]. The body
+    is closed when the wrapper is, so a streamed cursor is still released on disconnect.
+    """
+    try:
+        for chunk in body:
+            sent[0] += len(chunk)
+            yield chunk
+    finally:
+        close = getattr(body, "close", None)
+        if close:
+            close()
+
+
+def time_serialization(json_provider):
+    """
+    Wrap a JSON provider's response() so the time it takes is added to the current request.
+    """
+    response = json_provider.response
+
+    def timed_response(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return response(*args, **kwargs)
+        finally:
+            stats = _current_request.get()
+            if stats is not None:
+                stats.serialize_seconds += time.perf_counter() - started
+
+    json_provider.response = timed_response
+
+
+def render(pool=None):
+    """
+    Build the /metrics response body in the Prometheus text format. pool is the
+    snapshot of app.db.pool_metrics, exported as gauges.
+
+    Returns:
+    str: The metrics
+    """
+    lines = []
+    request_metrics.render(lines)
+    command_metrics.render(lines)
+    if pool:
+        for name, key, help_text in (
+            ("careerhub_mongodb_pool_checkouts_total", "checkouts", "Connections checked out of the pool."),
+            ("careerhub_mongodb_pool_checkout_failures_total", "checkout_failures", "Pool checkouts that failed."),
+            ("careerhub_mongodb_pool_connections_open", "connections_open", "Connections open in the pool."),
+        ):
+            kind = "gauge" if key == "connections_open" else "counter"
+            _render_counter(lines, name, help_text, {(): pool[key]}, (), kind)
+    return "\n".join(lines) + "\n"
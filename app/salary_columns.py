@@ -0,0 +1,412 @@
+'''Module for the in-memory salary column store behind /salary_stats
+
+Each process keeps a column snapshot of the jobs collection: average_salary as a float
+array, and industry_name, experience_level and employment_type dictionary-encoded as
+integer codes (plus the remote flag). Rows are kept in salary order, so the salaries a
+/salary_stats request selects with a boolean mask are already sorted: percentiles are read
+by position and histogram counts found with a binary search per bin edge, without a
+database round trip.
+
+Jobs written through this process are queued by refresh_jobs() and applied before the
+next query, and the snapshot is reloaded when it is older than ttl seconds so writes made
+by other processes show up too. A reload is built without holding the lock, while the
+other requests keep using the previous snapshot. The jobs written while it reads the
+collection are applied again once it is swapped in, since the scan may have passed them
+before they were written.
+'''
+
+import asyncio
+import threading
+import time
+
+import numpy as np
+
+from app import utils
+
+
+# Categorical columns that can be filtered and grouped on
+CATEGORY_FIELDS = ["industry_name", "experience_level", "employment_type"]
+COLUMN_PROJECTION = {"_id": 0, "job_id": 1, "average_salary": 1, "remote": 1, **{field: 1 for field in CATEGORY_FIELDS}}
+
+DEFAULT_PERCENTILES = [10, 25, 50, 75, 90]
+DEFAULT_BINS = 20
+MAX_BINS = 200
+
+
+class Snapshot:
+    """
+    One immutable set of columns. Rows are jobs, ordered by salary (jobs without one last).
+    """
+
+    def __init__(self, job_ids, salaries, remote, codes, values, loaded_at=None):
+        self.job_ids = job_ids        # int64
+        self.salaries = salaries      # float64, sorted, NaN when a job has no salary
+        self.remote = remote          # int8: 1 remote, 0 not remote, -1 unknown
+        self.codes = codes            # field -> int32 codes into values[field]
+        self.values = values          # field -> list of distinct values
+        self.lookup = {field: {value: code for code, value in enumerate(field_values)} for field, field_values in values.items()}
+        self.loaded_at = time.monotonic() if loaded_at is None else loaded_at
+
+    @classmethod
+    def from_jobs(cls, jobs, values=None):
+        """
+        Build the columns from job documents (COLUMN_PROJECTION fields). values are the
+        dictionaries of a previous snapshot, so existing codes stay the same.
+        """
+        values = {field: list(values[field]) if values else [] for field in CATEGORY_FIELDS}
+        lookup = {field: {value: code for code, value in enumerate(values[field])} for field in CATEGORY_FIELDS}
+
+        rows = [job for job in jobs if job.get("job_id") is not None]
+        salaries = np.fromiter((_salary(job.get("average_salary")) for job in rows), dtype=np.float64, count=len(rows))
+        # NaN sorts last
+        order = np.argsort(salaries, kind="stable")
+        rows = [rows[position] for position in order]
+        salaries = salaries[order]
+        job_ids = np.fromiter((job["job_id"] for job in rows), dtype=np.int64, count=len(rows))
+        remote = np.fromiter((_flag(job.get("remote")) for job in rows), dtype=np.int8, count=len(rows))
+
+        codes = {}
+        for field in CATEGORY_FIELDS:
+            field_lookup, field_values = lookup[field], values[field]
+
+            def encode(value):
+                code = field_lookup.get(value)
+                if code is None:
+                    code = field_lookup[value] = len(field_values)
+                    field_values.append(value)
+                return code
+
+            codes[field] = np.fromiter((encode(job.get(field)) for job in rows), dtype=np.int32, count=len(rows))
+        return cls(job_ids, salaries, remote, codes, values)
+
+    def replace_jobs(self, job_ids, jobs):
+        """
+        A new snapshot with the rows of the given jobs replaced by their current documents
+        (rows of jobs without a document are dropped).
+
+        Returns:
+        Snapshot: The new snapshot
+        """
+        keep = ~np.isin(self.job_ids, np.asarray(list(job_ids), dtype=np.int64))
+        changed = Snapshot.from_jobs(jobs, self.values)
+        order = np.argsort(np.concatenate([self.salaries[keep], changed.salaries]), kind="stable")
+
+        def merged(old, new):
+            return np.concatenate([old[keep], new])[order]
+
+        return Snapshot(
+            merged(self.job_ids, changed.job_ids),
+            merged(self.salaries, changed.salaries),
+            merged(self.remote, changed.remote),
+            {field: merged(self.codes[field], changed.codes[field]) for field in CATEGORY_FIELDS},
+            changed.values,
+            # Applying writes does not make the rest of the snapshot any fresher
+            loaded_at=self.loaded_at
+        )
+
+    def mask(self, filters):
+        """
+        Rows with a salary that match every filter. filters maps a categorical field to a
+        list of accepted values, and 'remote' to True or False.
+
+        Returns:
+        numpy.ndarray: Boolean mask over the rows
+        """
+        mask = ~np.isnan(self.salaries)
+        for field, accepted in filters.items():
+            if field == "remote":
+                mask &= self.remote == (1 if accepted else 0)
+                continue
+            accepted_codes = [self.lookup[field][value] for value in accepted if value in self.lookup[field]]
+            mask &= np.isin(self.codes[field], np.asarray(accepted_codes, dtype=np.int32))
+        return mask
+
+
+def parse_request(body):
+    """
+    Read the filters and options of a /salary_stats request: industry_name,
+    experience_level and employment_type (a string or a list), remote, percentiles,
+    bins (a count or a list of edges) and group_by.
+
+    Returns:
+    tuple: (filters, percentiles, bins, group_by)
+
+    Raises:
+    ValueError: If an option is invalid
+    """
+    filters = {}
+    for field in CATEGORY_FIELDS:
+        value = body.get(field)
+        if value is None:
+            continue
+        values = [value] if isinstance(value, str) else value
+        if not isinstance(values, list) or not values or not all(isinstance(item, str) for item in values):
+            raise ValueError(f"{field} must be a string or a list of strings")
+        filters[field] = values
+    if 'experience_level' in filters:
+        levels, invalid_level = utils.normalize_experience_levels(filters['experience_level'])
+        if invalid_level:
+            raise ValueError(f"{invalid_level} is not a valid experience level in the career hub. Valid options include Entry Level, Mid Level, and Senior Level")
+        filters['experience_level'] = levels
+    if body.get('remote') is not None:
+        if not isinstance(body['remote'], bool):
+            raise ValueError("remote must be true or false")
+        filters['remote'] = body['remote']
+
+    percentiles = body.get('percentiles', DEFAULT_PERCENTILES)
+    if (not isinstance(percentiles, list) or not percentiles
+            or not all(isinstance(p, (int, float)) and not isinstance(p, bool) and 0 <= p <= 100 for p in percentiles)):
+        raise ValueError("percentiles must be a list of numbers between 0 and 100")
+
+    bins = body.get('bins', DEFAULT_BINS)
+    if isinstance(bins, list):
+        if len(bins) < 2 or len(bins) > MAX_BINS + 1 or not all(isinstance(edge, (int, float)) for edge in bins) or bins != sorted(bins):
+            raise ValueError(f"bins must be a count or a sorted list of 2 to {MAX_BINS + 1} bin edges")
+    elif not isinstance(bins, int) or isinstance(bins, bool) or not 1 <= bins <= MAX_BINS:
+        raise ValueError(f"bins must be a count between 1 and {MAX_BINS} or a list of bin edges")
+
+    group_by = body.get('group_by')
+    if group_by is not None and group_by not in CATEGORY_FIELDS + ["remote"]:
+        raise ValueError(f"group_by must be one of {', '.join(CATEGORY_FIELDS + ['remote'])}")
+
+    return filters, percentiles, bins, group_by
+
+
+def _salary(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _flag(value):
+    return -1 if value is None else int(bool(value))
+
+
+def describe(salaries, percentiles, bins):
+    """
+    Summary statistics and histogram of a sorted array of salaries. bins is a number of
+    equal width bins over the salary range, or a list of bin edges. Percentiles are
+    interpolated linearly and bins include their left edge (the last one both edges), as
+    in numpy.percentile and numpy.histogram.
+
+    Returns:
+    dict: count, mean, min, max, percentiles and histogram
+    """
+    count = len(salaries)
+    if not count:
+        return {"count": 0, "mean": None, "min": None, "max": None, "percentiles": {}, "histogram": {"bin_edges": [], "counts": []}}
+    low, high = float(salaries[0]), float(salaries[-1])
+
+    positions = np.asarray(percentiles, dtype=np.float64) / 100 * (count - 1)
+    below = np.floor(positions).astype(np.int64)
+    above = np.minimum(below + 1, count - 1)
+    values = salaries[below] + (salaries[above] - salaries[below]) * (positions - below)
+
+    if isinstance(bins, list):
+        edges = np.asarray(bins, dtype=np.float64)
+    else:
+        edges = np.linspace(low - 0.5, high + 0.5, bins + 1) if low == high else np.linspace(low, high, bins + 1)
+    bounds = np.searchsorted(salaries, edges, side="left")
+    bounds[-1] = np.searchsorted(salaries, edges[-1], side="right")
+
+    return {
+        "count": int(count),
+        "mean": round(float(salaries.mean()), 2),
+        "min": low,
+        "max": high,
+        "percentiles": {f"p{_label(p)}": round(float(value), 2) for p, value in zip(percentiles, values)},
+        "histogram": {"bin_edges": [round(float(edge), 2) for edge in edges], "counts": np.diff(bounds).tolist()}
+    }
+
+
+def _label(percentile):
+    return int(percentile) if float(percentile).is_integer() else percentile
+
+
+class SalaryColumns:
+    """
+    The salary column snapshot of this process.
+    """
+
+    def __init__(self, get_db, ttl=300):
+        self.get_db = get_db
+        self.ttl = ttl
+        self._snapshot = None
+        self._pending = set()
+        self._loading = False
+        self._expired = False
+        self._written_during_load = set()
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+
+    def _stale(self):
+        return self._snapshot is None or self._expired or time.monotonic() - self._snapshot.loaded_at > self.ttl
+
+    def _find_jobs(self, query):
+        return self.get_db().jobs.find(query, COLUMN_PROJECTION).batch_size(5000)
+
+    def snapshot(self):
+        """
+        The current snapshot, reloaded when stale and with the queued job changes applied.
+        Only the first load is waited for: while one thread reloads a stale snapshot, the
+        others keep using it.
+
+        Returns:
+        Snapshot: The columns
+        """
+        if self._stale():
+            self._reload()
+        while self._pending and self._snapshot is not None:
+            base, job_ids = self._take_pending()
+            if job_ids:
+                self._swap_applied(base, job_ids, self._find_jobs({"job_id": {"$in": list(job_ids)}}))
+        return self._snapshot
+
+    def _reload(self):
+        if not self._load_lock.acquire(blocking=self._snapshot is None):
+            return
+        try:
+            if not self._stale():
+                return
+            self._start_load()
+            snapshot = None
+            try:
+                snapshot = Snapshot.from_jobs(self._find_jobs({}))
+            finally:
+                self._finish_load(snapshot)
+        finally:
+            self._load_lock.release()
+
+    def _start_load(self):
+        with self._lock:
+            self._loading = True
+            # An expiry from here on needs another reload, the scan may pass its jobs
+            self._expired = False
+            self._written_during_load = set()
+
+    def _finish_load(self, snapshot):
+        with self._lock:
+            self._loading = False
+            if snapshot is not None:
+                self._snapshot = snapshot
+            # The load may have read these jobs before they were written
+            self._pending |= self._written_during_load
+            self._written_during_load = set()
+
+    def _take_pending(self):
+        with self._lock:
+            job_ids, self._pending = self._pending, set()
+            return self._snapshot, job_ids
+
+    def _swap_applied(self, base, job_ids, jobs):
+        snapshot = base.replace_jobs(job_ids, jobs)
+        with self._lock:
+            if self._snapshot is base:
+                self._snapshot = snapshot
+            else:
+                # A reload (or another thread's changes) was swapped in meanwhile, apply them to that one
+                self._pending |= job_ids
+
+    def load(self):
+        self.snapshot()
+
+    def expire(self):
+        """
+        Reload the whole snapshot before the next query, for writes whose jobs are not known one by one.
+        """
+        with self._lock:
+            self._expired = True
+
+    def refresh_jobs(self, job_ids):
+        """
+        Queue the given jobs to be re-read before the next query. Nothing is queued
+        before the first load starts, since it reads every job.
+        """
+        job_ids = {job_id for job_id in job_ids if isinstance(job_id, int)}
+        if not job_ids:
+            return
+        with self._lock:
+            if self._snapshot is None and not self._loading:
+                return
+            self._pending |= job_ids
+            if self._loading:
+                self._written_during_load |= job_ids
+
+    def stats(self, filters, percentiles=DEFAULT_PERCENTILES, bins=DEFAULT_BINS, group_by=None):
+        """
+        Salary statistics of the jobs matching the filters, overall and (with group_by,
+        one of CATEGORY_FIELDS or 'remote') for each value of that field.
+
+        Returns:
+        dict: The describe() output, plus 'groups' when grouping
+        """
+        return salary_stats(self.snapshot(), filters, percentiles, bins, group_by)
+
+
+def salary_stats(snapshot, filters, percentiles=DEFAULT_PERCENTILES, bins=DEFAULT_BINS, group_by=None):
+    """
+    Compute SalaryColumns.stats() on a snapshot.
+    """
+    mask = snapshot.mask(filters)
+    salaries = snapshot.salaries[mask]
+    result = describe(salaries, percentiles, bins)
+    if group_by:
+        column = (snapshot.remote if group_by == "remote" else snapshot.codes[group_by])[mask]
+        codes = [-1, 0, 1] if group_by == "remote" else range(len(snapshot.values[group_by]))
+        groups = []
+        for code in codes:
+            # Selecting with a mask keeps the salaries sorted
+            group_salaries = salaries[column == code]
+            if not len(group_salaries):
+                continue
+            value = (None if code < 0 else bool(code)) if group_by == "remote" else snapshot.values[group_by][code]
+            groups.append({"value": value, **describe(group_salaries, percentiles, bins)})
+        result["groups"] = sorted(groups, key=lambda group: -group["count"])
+    result["snapshot_age_seconds"] = round(time.monotonic() - snapshot.loaded_at, 1)
+    return result
+
+
+class AsyncSalaryColumns(SalaryColumns):
+    """
+    SalaryColumns for the asyncio API (async_app), loaded through the async client.
+    The jobs are read on the event loop, and the columns are built (and sorted) in a
+    worker thread so other requests keep being served meanwhile.
+    """
+
+    def __init__(self, get_db, ttl=300):
+        super().__init__(get_db, ttl)
+        self._async_lock = None
+
+    async def snapshot(self):
+        if self._stale():
+            await self._reload()
+        while self._pending and self._snapshot is not None:
+            base, job_ids = self._take_pending()
+            if job_ids:
+                jobs = await self._find_jobs({"job_id": {"$in": list(job_ids)}}).to_list(None)
+                await asyncio.to_thread(self._swap_applied, base, job_ids, jobs)
+        return self._snapshot
+
+    async def _reload(self):
+        # Created on first use so it belongs to the running event loop
+        if self._async_lock is None:
+            self._async_lock = asyncio.Lock()
+        if self._async_lock.locked() and self._snapshot is not None:
+            return
+        async with self._async_lock:
+            if not self._stale():
+                return
+            self._start_load()
+            snapshot = None
+            try:
+                jobs = await self._find_jobs({}).to_list(None)
+                snapshot = await asyncio.to_thread(Snapshot.from_jobs, jobs)
+            finally:
+                self._finish_load(snapshot)
+
+    async def load(self):
+        await self.snapshot()
+
+    async def stats(self, filters, percentiles=DEFAULT_PERCENTILES, bins=DEFAULT_BINS, group_by=None):
+        return salary_stats(await self.snapshot(), filters, percentiles, bins, group_by)
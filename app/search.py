@@ -0,0 +1,167 @@
+'''Module for building the full-text job search behind /search
+
+A search is one aggregation: the $text match (answered by the weighted job_text index)
+plus the filters, then a $facet that returns one page of results ranked by relevance
+together with the facet counts of the whole result set, so a search costs one round trip.
+'''
+
+from app import utils
+
+
+# Relevance order of the results, ties broken by job_id so the order is total
+SEARCH_SORT = [("score", -1), ("job_id", 1)]
+
+# Fields returned for each job when the client does not ask for specific fields
+DEFAULT_SEARCH_FIELDS = ["job_id", "title", "company_name", "industry_name", "average_salary",
+                         "experience_level", "employment_type", "remote"]
+
+# Fields counted in the facets, and how many values are returned for each
+FACET_FIELDS = ["industry_name", "experience_level", "employment_type", "remote"]
+FACET_SIZE = 20
+
+# Salary bands of the salary facet, salaries outside them (or missing) are counted as 'other'
+SALARY_BOUNDARIES = [0, 50000, 75000, 100000, 125000, 150000, 200000]
+
+
+def _one_or_many(value, name):
+    """
+    Accept a string or a list of strings as a filter value.
+
+    Returns:
+    list: The filter values
+    """
+    values = [value] if isinstance(value, str) else value
+    if not isinstance(values, list) or not values or not all(isinstance(item, str) for item in values):
+        raise ValueError(f"{name} must be a string or a list of strings")
+    return values
+
+
+def search_query(body):
+    """
+    Build the $match filter of a search from the request body: the text in 'q' and the
+    optional min_salary, max_salary, experience_level, employment_type, industry_name
+    and remote filters.
+
+    Returns:
+    dict: A MongoDB filter
+
+    Raises:
+    ValueError: If the search text is missing or a filter is invalid
+    """
+    text = body.get('q')
+    if not isinstance(text, str) or not text.strip():
+        raise ValueError("q (the search text) must be provided")
+    query = {"$text": {"$search": text}}
+
+    salary = {}
+    for name, operator in (('min_salary', '$gte'), ('max_salary', '$lte')):
+        if body.get(name) is not None:
+            try:
+                salary[operator] = float(body[name])
+            except (TypeError, ValueError):
+                raise ValueError(f"{name} must be a number")
+    if salary.get('$gte', 0) > salary.get('$lte', float('inf')):
+        raise ValueError("min_salary cannot be greater than max_salary")
+    if salary:
+        query["average_salary"] = salary
+
+    if body.get('experience_level'):
+        levels, invalid_level = utils.normalize_experience_levels(_one_or_many(body['experience_level'], 'experience_level'))
+        if invalid_level:
+            raise ValueError(f"{invalid_level} is not a valid experience level in the career hub. Valid options include Entry Level, Mid Level, and Senior Level")
+        query["experience_level"] = {"$in": levels}
+
+    for name in ('employment_type', 'industry_name'):
+        if body.get(name):
+            query[name] = {"$in": _one_or_many(body[name], name)}
+
+    if body.get('remote') is not None:
+        if not isinstance(body['remote'], bool):
+            raise ValueError("remote must be true or false")
+        query["remote"] = body['remote']
+
+    return query
+
+
+def search_projection(fields):
+    """
+    Build the projection of the result page. The relevance score is always returned.
+
+    Returns:
+    dict: The projection
+    """
+    projection = {"_id": 0, "score": 1}
+    for field in fields or DEFAULT_SEARCH_FIELDS:
+        projection[field] = 1
+    return projection
+
+
+def search_pipeline(query, projection, limit, after=None):
+    """
+    Build the search aggregation. after is the [score, job_id] of the last job seen.
+
+    Returns:
+    tuple: (the aggregation pipeline, fields added to the projection that must be removed from the results)
+    """
+    # job_id is needed to build the next cursor
+    added_fields = []
+    if "job_id" not in projection and any(value == 1 for field, value in projection.items() if field != '_id'):
+        projection = dict(projection, job_id=1)
+        added_fields.append("job_id")
+
+    page = [{"$sort": dict(SEARCH_SORT)}]
+    if after is not None:
+        page.append({"$match": utils.keyset_filter(SEARCH_SORT, after)})
+    page += [{"$limit": limit + 1}, {"$project": projection}]
+
+    facets = {
+        "jobs": page,
+        "total": [{"$count": "count"}],
+        "average_salary": [{"$bucket": {
+            "groupBy": "$average_salary",
+            "boundaries": SALARY_BOUNDARIES,
+            "default": "other",
+            "output": {"count": {"$sum": 1}}
+        }}]
+    }
+    for field in FACET_FIELDS:
+        facets[field] = [
+            {"$group": {"_id": f"${field}", "count": {"$sum": 1}}},
+            {"$sort": {"count": -1, "_id": 1}},
+            {"$limit": FACET_SIZE}
+        ]
+
+    pipeline = [
+        {"$match": query},
+        {"$addFields": {"score": {"$meta": "textScore"}}},
+        {"$facet": facets}
+    ]
+    return pipeline, added_fields
+
+
+def search_facets(result):
+    """
+    Reshape the facet output of a search aggregation for the response.
+
+    Returns:
+    dict: Field -> list of {'value', 'count'}, and the salary bands as {'min', 'max', 'count'}
+    """
+    facets = {field: [{"value": bucket["_id"], "count": bucket["count"]} for bucket in result.get(field, [])]
+              for field in FACET_FIELDS}
+
+    upper_bounds = dict(zip(SALARY_BOUNDARIES, SALARY_BOUNDARIES[1:]))
+    facets["average_salary"] = [
+        {"min": bucket["_id"], "max": upper_bounds.get(bucket["_id"]), "count": bucket["count"]}
+        if bucket["_id"] != "other" else {"min": None, "max": None, "count": bucket["count"]}
+        for bucket in result.get("average_salary", [])
+    ]
+    return facets
+
+
+def search_total(result):
+    """
+    Returns:
+    int: The number of jobs matching the search
+    """
+    total = result.get("total")
+    return total[0]["count"] if total else 0
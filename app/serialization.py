@@ -0,0 +1,98 @@
+'''Module for encoding API responses as JSON
+
+Flask's default JSON provider encodes every jsonify() response with the json module,
+which walks the documents in Python, cannot encode ObjectId and writes datetimes as HTTP
+dates. With CAREERHUB_JSON_BACKEND=orjson (the default) both apps use OrjsonProvider
+instead: orjson encodes dicts, lists, datetimes (ISO 8601, like the NDJSON streams) and
+NumPy values natively in C, ObjectId and Decimal128 through default(), and the response
+body is written from the encoded bytes. CAREERHUB_JSON_BACKEND=json keeps Flask's
+provider. The NDJSON streams use dumps(), which falls back to the json module when
+orjson is not installed.
+'''
+
+import json
+from datetime import date, datetime
+
+from bson import Decimal128, ObjectId
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def default(obj):
+    """
+    Encode the BSON values orjson and the json module do not know about.
+
+    Returns:
+    str: The value as a string
+
+    Raises:
+    TypeError: If the value cannot be encoded
+    """
+    if isinstance(obj, (ObjectId, Decimal128)):
+        return str(obj)
+    if isinstance(obj, (datetime, date)):
+        # Only reached through the json module, orjson encodes them itself
+        return obj.isoformat()
+    raise TypeError(f"Type {type(obj)} not serializable")
+
+
+def _options(sort_keys=False, indent=False):
+    options = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+    if sort_keys:
+        options |= orjson.OPT_SORT_KEYS
+    if indent:
+        options |= orjson.OPT_INDENT_2
+    return options
+
+
+def dumps(obj, sort_keys=False):
+    """
+    Encode a value as JSON, with orjson when it is installed.
+
+    Returns:
+    bytes: The UTF-8 encoded JSON
+    """
+    if orjson is None:
+        return json.dumps(obj, default=default, sort_keys=sort_keys, separators=(',', ':')).encode('utf-8')
+    return orjson.dumps(obj, default=default, option=_options(sort_keys))
+
+
+class OrjsonProvider(JSONProvider):
+    """
+    Flask (and Quart) JSON provider backed by orjson. Keys are sorted like Flask's
+    default provider, so responses keep the same layout.
+    """
+
+    sort_keys = True
+    compact = None
+    mimetype = "application/json"
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=default, option=_options(kwargs.get('sort_keys', self.sort_keys), kwargs.get('indent'))).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        body = orjson.dumps(obj, default=default, option=_options(self.sort_keys, indent) | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def init_app(app, backend):
+    """
+    Install the JSON provider selected by CAREERHUB_JSON_BACKEND on a Flask or Quart app.
+
+    Raises:
+    ImportError: If the orjson backend is selected and orjson is not installed
+    """
+    if backend != 'orjson':
+        return
+    if orjson is None:
+        raise ImportError("The orjson JSON backend requires the 'orjson' package (pip install orjson), or set CAREERHUB_JSON_BACKEND=json")
+    app.json = OrjsonProvider(app)
@@ -0,0 +1,269 @@
+'''Module for matching jobs to a candidate's skills with an in-process inverted index
+
+Every job's preferred_skills, requirements and responsibilities are reduced to a set of
+normalized skill tokens, and the index maps each token to the sorted array of job ids
+that carry it. A match only touches the posting lists of the submitted skills, so its
+cost depends on how common those skills are, not on the number of jobs.
+
+Each process holds its own index. Writes made through this process are applied as they
+happen (refresh_jobs), and the whole index is rebuilt when it is older than ttl seconds
+so writes made by other processes show up too. A posting list is never changed in place:
+a write replaces the lists of the job's tokens with new arrays, so matches read them
+without taking the lock.
+'''
+
+import asyncio
+import heapq
+import re
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from itertools import chain
+
+
+# Job fields the skill tokens are read from
+SKILL_FIELDS = ["preferred_skills", "requirements", "responsibilities"]
+SKILL_PROJECTION = {"_id": 0, "job_id": 1, **{field: 1 for field in SKILL_FIELDS}}
+
+WORD_RE = re.compile(r"[a-z0-9][a-z0-9+#]*(?:\.[a-z0-9]+)*")
+STOPWORDS = frozenset([
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "into", "is", "of",
+    "on", "or", "our", "the", "to", "with", "within", "strong", "experience", "skills",
+    "ability", "knowledge", "proficiency", "understanding", "excellent", "work", "working"
+])
+
+
+def normalize_skill(skill):
+    """
+    Lower-case a skill and collapse its whitespace and surrounding punctuation,
+    eg. ' Machine  Learning. ' -> 'machine learning'.
+
+    Returns:
+    str: The normalized skill ('' if nothing is left)
+    """
+    if not isinstance(skill, str):
+        return ""
+    return " ".join(skill.lower().split()).strip(" .,;:!?()[]'\"")
+
+
+def skill_tokens(skills):
+    """
+    The tokens of a list of skills: each normalized skill, plus its words when it has
+    several (so 'Proficiency in Python and SQL' also yields 'python' and 'sql').
+
+    Returns:
+    set: The skill tokens
+    """
+    tokens = set()
+    for skill in skills or []:
+        skill = normalize_skill(skill)
+        if not skill:
+            continue
+        tokens.add(skill)
+        words = [word for word in WORD_RE.findall(skill) if word not in STOPWORDS]
+        if len(words) > 1:
+            tokens.update(words)
+    return tokens
+
+
+def _contains(job_ids, job_id):
+    position = bisect_left(job_ids, job_id)
+    return position < len(job_ids) and job_ids[position] == job_id
+
+
+def skills_changed(fields):
+    """
+    Returns:
+    bool: Whether a write that set the given job fields (None for a whole document) can change skill tokens
+    """
+    return fields is None or any(field in SKILL_FIELDS for field in fields)
+
+
+def job_tokens(job):
+    """
+    Returns:
+    set: The skill tokens of a job document
+    """
+    tokens = set()
+    for field in SKILL_FIELDS:
+        value = job.get(field)
+        tokens |= skill_tokens([value] if isinstance(value, str) else value)
+    return tokens
+
+
+class SkillIndex:
+    """
+    Inverted index from skill token to the sorted job ids that have it. The tokens of
+    each job are kept too, so a job's entries can be replaced without scanning every
+    posting list (and for the Jaccard score).
+    """
+
+    def __init__(self, get_db, ttl=300):
+        self.get_db = get_db
+        self.ttl = ttl
+        self._postings = None
+        self._tokens = {}
+        self._loaded_at = 0.0
+        self._expired = False
+        self._lock = threading.Lock()
+
+    def _stale(self):
+        return self._postings is None or self._expired or time.monotonic() - self._loaded_at > self.ttl
+
+    def expire(self):
+        """
+        Rebuild the whole index on its next use, for writes whose jobs are not known one by one.
+        """
+        self._expired = True
+
+    def _store(self, jobs):
+        postings = {}
+        tokens_by_job = {}
+        for job in jobs:
+            job_id = job.get("job_id")
+            if job_id is None:
+                continue
+            tokens = tokens_by_job[job_id] = frozenset(job_tokens(job))
+            for token in tokens:
+                postings.setdefault(token, []).append(job_id)
+        # Compact sorted arrays instead of lists of int objects
+        self._postings = {token: array("q", sorted(job_ids)) for token, job_ids in postings.items()}
+        self._tokens = tokens_by_job
+        self._loaded_at = time.monotonic()
+
+    def load(self):
+        """
+        Build the index from the jobs collection if it is not loaded or is older than ttl.
+        """
+        if self._stale():
+            with self._lock:
+                if self._stale():
+                    # Cleared before the read, so an expiry during the rebuild is kept
+                    self._expired = False
+                    self._store(self.get_db().jobs.find({}, SKILL_PROJECTION).batch_size(5000))
+
+    def _apply(self, job_ids, jobs):
+        """
+        Replace the tokens of the given jobs with those of their current documents
+        (a job without a document was deleted). Only the posting lists of the jobs' old
+        and new tokens are rebuilt, each into a new array.
+        """
+        with self._lock:
+            if self._postings is None:
+                return
+            found = {job["job_id"]: job for job in jobs if job.get("job_id") is not None}
+            removed, added = {}, {}
+            for job_id in job_ids:
+                old = self._tokens.pop(job_id, frozenset())
+                new = frozenset(job_tokens(found[job_id])) if job_id in found else frozenset()
+                if job_id in found:
+                    self._tokens[job_id] = new
+                for token in old - new:
+                    removed.setdefault(token, set()).add(job_id)
+                for token in new - old:
+                    added.setdefault(token, set()).add(job_id)
+            for token in removed.keys() | added.keys():
+                job_ids_left = set(self._postings.get(token, ())) - removed.get(token, set())
+                job_ids_left |= added.get(token, set())
+                if job_ids_left:
+                    self._postings[token] = array("q", sorted(job_ids_left))
+                else:
+                    self._postings.pop(token, None)
+
+    def refresh_jobs(self, job_ids):
+        """
+        Re-read the given jobs and update their entries. Nothing is read while the index is not loaded.
+        """
+        job_ids = [job_id for job_id in set(job_ids) if isinstance(job_id, int)]
+        if self._postings is None or not job_ids:
+            return
+        jobs = list(self.get_db().jobs.find({"job_id": {"$in": job_ids}}, SKILL_PROJECTION))
+        self._apply(job_ids, jobs)
+
+    def match(self, skills, limit=10, metric="jaccard", min_overlap=1):
+        """
+        Find the jobs sharing the most skill tokens with the given skills. Only the posting
+        lists of the query tokens are read: merging them counts |query & job| for every
+        job that has at least one of the skills.
+
+        metric 'overlap' scores a job by the share of the query tokens it has, and
+        'jaccard' by |query & job| / |query | job|, which also penalizes jobs asking for
+        many skills the candidate does not have.
+
+        Returns:
+        list: Up to limit (job_id, score, matched tokens) tuples, best first
+        """
+        self.load()
+        return self._match(skills, limit, metric, min_overlap)
+
+    def _match(self, skills, limit, metric, min_overlap):
+        query = skill_tokens(skills)
+        postings, tokens_by_job = self._postings, self._tokens
+        # One lookup per token, since a write may drop a token between two lookups
+        lists = {token: job_ids for token, job_ids in ((token, postings.get(token)) for token in query) if job_ids}
+        counts = Counter(chain.from_iterable(lists.values()))
+        query_size = len(query)
+
+        if metric == "overlap":
+            scored = ((overlap / query_size, -job_id) for job_id, overlap in counts.items() if overlap >= min_overlap)
+        else:
+            scored = ((overlap / (query_size + (len(tokens_by_job.get(job_id, ())) or overlap) - overlap), -job_id)
+                      for job_id, overlap in counts.items() if overlap >= min_overlap)
+
+        matches = []
+        for value, negative_id in heapq.nlargest(limit, scored):
+            job_id = -negative_id
+            matched = sorted(token for token, job_ids in lists.items() if _contains(job_ids, job_id))
+            matches.append((job_id, round(value, 4), matched))
+        return matches
+
+    def stats(self):
+        """
+        Returns:
+        dict: Jobs and tokens indexed, postings held and the age of the index in seconds
+        """
+        postings = self._postings or {}
+        return {
+            "jobs": len(self._tokens),
+            "tokens": len(postings),
+            "postings": sum(len(job_ids) for job_ids in postings.values()),
+            "age_seconds": round(time.monotonic() - self._loaded_at, 1) if self._postings is not None else None
+        }
+
+
+class AsyncSkillIndex(SkillIndex):
+    """
+    SkillIndex for the asyncio API (async_app), loaded through the async client.
+    """
+
+    def __init__(self, get_db, ttl=300):
+        super().__init__(get_db, ttl)
+        self._async_lock = None
+
+    async def load(self):
+        if not self._stale():
+            return
+        # Created on first use so it belongs to the running event loop
+        if self._async_lock is None:
+            self._async_lock = asyncio.Lock()
+        if self._async_lock.locked() and self._postings is not None:
+            # Another request is rebuilding the index, the current one is served meanwhile
+            return
+        async with self._async_lock:
+            if self._stale():
+                self._expired = False
+                cursor = self.get_db().jobs.find({}, SKILL_PROJECTION).batch_size(5000)
+                self._store(await cursor.to_list(None))
+
+    async def refresh_jobs(self, job_ids):
+        job_ids = [job_id for job_id in set(job_ids) if isinstance(job_id, int)]
+        if self._postings is None or not job_ids:
+            return
+        jobs = await self.get_db().jobs.find({"job_id": {"$in": job_ids}}, SKILL_PROJECTION).to_list(None)
+        self._apply(job_ids, jobs)
+
+    async def match(self, skills, limit=10, metric="jaccard", min_overlap=1):
+        await self.load()
+        return self._match(skills, limit, metric, min_overlap)
@@ -1,7 +1,19 @@
 """This module will encode and parse the query string params."""
 
+import asyncio
+import base64
+import json
+import os
+import threading
+from datetime import datetime
 from urllib.parse import parse_qs
 
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app import serialization
+
 
 def parse_query_params(query_string):
     """
@@ -14,21 +26,455 @@ def parse_query_params(query_string):
     return query_params
 
 
-def generate_unique_job_id(jobs_collection):
+# Documents fetched per round trip when streaming a result set
+STREAM_BATCH_SIZE = 500
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+
+def wants_stream(request, body=None):
+    """
+    Check whether the client asked for a streamed NDJSON response, either with an
+    'Accept: application/x-ndjson' header or a stream=true flag in the query string or body.
+    The parsed body can be passed in when the request object cannot parse it synchronously.
+
+    Returns:
+    bool: True if the response should be streamed
+    """
+    if NDJSON_MIMETYPE in request.headers.get('Accept', ''):
+        return True
+    if body is None:
+        body = request.get_json(silent=True)
+    flag = request.args.get('stream') or (body.get('stream') if isinstance(body, dict) else None)
+    return str(flag).lower() == 'true'
+
+
+def json_default(obj):
+    """
+    Serialize the BSON types the json module does not know about.
+    """
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    raise TypeError(f"Type {type(obj)} not serializable")
+
+
+def ndjson_lines(cursor, complete=None):
+    """
+    Yield each document of a cursor as one line of NDJSON, so only one batch of
+    documents is held in memory at a time. complete, if given, is applied to each
+    document (as a one element list) before it is written.
+    """
+    try:
+        for document in cursor:
+            if complete:
+                document = complete([document])[0]
+            yield serialization.dumps(document) + b'\n'
+    finally:
+        # Release the server-side cursor if the client disconnects part way through
+        cursor.close()
+
+
+# Page size used when the client does not send a limit, and the largest page allowed
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(values):
+    """
+    Encode the sort key values of the last document on a page as an opaque continuation token.
+
+    Returns:
+    str: A URL-safe token
+    """
+    raw = json.dumps(values, default=json_default, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, key_count):
+    """
+    Decode a continuation token created by encode_cursor.
+
+    Returns:
+    list: The sort key values of the last document seen
+
+    Raises:
+    ValueError: If the token is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(raw)
+    except (TypeError, ValueError, UnicodeDecodeError):
+        raise ValueError('Invalid cursor')
+    if not isinstance(values, list) or len(values) != key_count:
+        raise ValueError('Invalid cursor')
+    return values
+
+
+def page_params(body, args, key_count):
+    """
+    Read the 'limit' and 'cursor' paging parameters from the request body (or query string).
+
+    Returns:
+    tuple: (page size, decoded cursor values or None)
+
+    Raises:
+    ValueError: If the limit or cursor is invalid
+    """
+    body = body if isinstance(body, dict) else {}
+    limit = body.get('limit', args.get('limit', DEFAULT_PAGE_SIZE))
+    token = body.get('cursor', args.get('cursor'))
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        raise ValueError('limit must be an integer')
+    if limit < 1:
+        raise ValueError('limit must be at least 1')
+    after = decode_cursor(token, key_count) if token else None
+    return min(limit, MAX_PAGE_SIZE), after
+
+
+def keyset_filter(sort_keys, after):
+    """
+    Build the filter that selects documents sorted after the given key values,
+    eg. for (average_salary, job_id): salary > s OR (salary == s AND job_id > j).
+    Each key is a (field, direction) pair.
+
+    Returns:
+    dict: A MongoDB filter that the compound index on the sort keys can answer with a range seek
+    """
+    clauses = []
+    for position, (field, direction) in enumerate(sort_keys):
+        clause = {prev_field: after[prev_position] for prev_position, (prev_field, _) in enumerate(sort_keys[:position])}
+        clause[field] = {"$gt" if direction == 1 else "$lt": after[position]}
+        clauses.append(clause)
+    return {"$or": clauses}
+
+
+def prepare_page(query, projection, sort_keys, after=None):
+    """
+    Build the query and projection for one page of a keyset-paginated listing.
+
+    Returns:
+    tuple: (query, projection, fields added to the projection that must be removed from the results)
+    """
+    if after is not None:
+        query = {"$and": [query, keyset_filter(sort_keys, after)]}
+
+    # The sort keys are needed to build the next cursor, add them to an inclusion projection
+    added_fields = []
+    if any(value == 1 for field, value in projection.items() if field != '_id'):
+        projection = dict(projection)
+        for field, _ in sort_keys:
+            if field not in projection:
+                projection[field] = 1
+                added_fields.append(field)
+    return query, projection, added_fields
+
+
+def find_page(collection, query, projection, sort_keys, limit, after=None):
+    """
+    Fetch one page of a query in sort key order, seeking past the previous page with
+    keyset_filter instead of skip(), so every page costs the same.
+
+    Returns:
+    tuple: (list of documents, next cursor token or None on the last page)
+    """
+    query, projection, added_fields = prepare_page(query, projection, sort_keys, after)
+    documents = list(collection.find(query, projection).sort(sort_keys).limit(limit + 1))
+    return finish_page(documents, sort_keys, limit, added_fields)
+
+
+def finish_page(documents, sort_keys, limit, added_fields=()):
+    """
+    Trim a page fetched with limit + 1 documents and build its next cursor.
+
+    Returns:
+    tuple: (list of documents, next cursor token or None on the last page)
+    """
+    next_cursor = None
+    if len(documents) > limit:
+        documents = documents[:limit]
+        next_cursor = encode_cursor([documents[-1].get(field) for field, _ in sort_keys])
+
+    for document in documents:
+        for field in added_fields:
+            document.pop(field, None)
+
+    return documents, next_cursor
+
+
+def normalize_experience_levels(experience_levels):
+    """
+    Map free-form experience levels (eg. "entry", "mid-level") to the stored values.
+
+    Returns:
+    tuple: (list of experience levels, the first unrecognized input or None)
+    """
+    levels = []
+    for level in experience_levels:
+        level = level.lower()
+        if "entry" in level:
+            levels.append("Entry Level")
+        elif "mid" in level:
+            levels.append("Mid Level")
+        elif "senior" in level:
+            levels.append("Senior Level")
+        else:
+            return levels, level
+    return levels, None
+
+
+def validate_job_post(data):
+    """
+    Validate the body of a new job posting.
+
+    Returns:
+    str: An error message, or None if the job post is valid
+    """
+    if not isinstance(data, dict):
+        return 'Job post must be a JSON object'
+    if not data.get('title') or not data.get('industry') or not data.get('company_name'):
+        return 'Title, industry, and company name are required fields'
+    if not isinstance(data['industry'], str):
+        return 'industry must be a string'
+    return None
+
+
+# Job fields users can change through the update routes (job_id must stay unique)
+UPDATABLE_FIELDS = ['description', 'average_salary', 'location']
+
+
+def validate_job_update(update_data):
+    """
+    Validate the fields of a job update against UPDATABLE_FIELDS, converting
+    average_salary to a number.
+
+    Returns:
+    tuple: (the fields to $set, an error message or None)
+    """
+    if not isinstance(update_data, dict) or not update_data:
+        return None, 'update must be a non-empty object'
+    if 'job_id' in update_data:
+        return None, 'The job_id field cannot be manually updated by users as it should remain unique.'
+    for field in update_data:
+        if field not in UPDATABLE_FIELDS:
+            return None, f'Invalid update field: {field}'
+    update_data = dict(update_data)
+    if 'average_salary' in update_data:
+        try:
+            update_data['average_salary'] = float(update_data['average_salary'])
+        except (TypeError, ValueError):
+            return None, 'Invalid salary format'
+    return update_data, None
+
+
+def parse_json_records(body, content_type):
     """
-    Generate a unique job_id for a new job posting.
+    Parse a request body holding either a JSON array or NDJSON (one JSON object per line).
 
     Returns:
-    int: A unique job_id
+    list: The parsed records
+
+    Raises:
+    ValueError: If the body cannot be parsed
+    """
+    text = body.decode('utf-8') if isinstance(body, bytes) else body
+    if 'ndjson' in (content_type or '') or not text.lstrip().startswith('['):
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+    records = json.loads(text)
+    if not isinstance(records, list):
+        raise ValueError('Body must be a JSON array or NDJSON')
+    return records
+
+
+# The job with the highest job_id, where a new counter starts
+HIGHEST_JOB_QUERY = {"filter": {}, "sort": [("job_id", -1)], "projection": {"job_id": 1}}
+
+
+class JobIdAllocator:
     """
-    # Find the highest existing job_id
-    highest_job = jobs_collection.find_one(
-        {},
-        sort=[("job_id", -1)],
-        projection={"job_id": 1}
-    )
-    
-    # If jobs exist, increment the highest job_id
-    new_job_id = highest_job['job_id'] + 1
+    Allocate unique job_ids from a counter document in the counters collection.
+
+    Each process reserves a block of ids with a single atomic $inc and hands them out
+    from memory, so most calls cost no round trip at all and ids never collide across
+    processes. Ids left in a block when a process exits are simply skipped.
 
-    return new_job_id
+    get_db is called whenever the database is needed, so the allocator can be created
+    at import time without opening a connection.
+    """
+
+    counter_id = "job_id"
+
+    def __init__(self, get_db, block_size=1):
+        self.get_db = get_db
+        self.block_size = max(1, int(block_size))
+        self._lock = threading.Lock()
+        self._seeded = False
+        self._next_id = 0
+        self._block_end = 0
+        # A forked worker must not hand out ids from its parent's block
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._block_end = 0
+
+    def _seed_counter(self, highest_job):
+        # Arguments of the upsert that moves the counter past highest_job
+        return {
+            "filter": {"_id": self.counter_id},
+            "update": {"$max": {"seq": highest_job['job_id'] if highest_job else 0}},
+            "upsert": True
+        }
+
+    def _reserve_counter(self, count):
+        # Arguments of the atomic $inc that reserves count ids
+        return {
+            "filter": {"_id": self.counter_id},
+            "update": {"$inc": {"seq": count}},
+            "upsert": True,
+            "return_document": ReturnDocument.AFTER
+        }
+
+    def _take(self, job_ids, count):
+        """
+        Hand out ids from what is left of the local block until job_ids holds count of them.
+
+        Returns:
+        int: How many ids to reserve before the next call (rounded up to a whole block), 0 once done
+        """
+        if self._next_id < self._block_end:
+            take = min(count - len(job_ids), self._block_end - self._next_id)
+            job_ids.extend(range(self._next_id, self._next_id + take))
+            self._next_id += take
+        return max(self.block_size, count - len(job_ids)) if len(job_ids) < count else 0
+
+    def _seed(self):
+        """
+        Make sure the counter starts after the highest job_id already in the jobs collection
+        (eg. data loaded with mongoimport). Runs once per process.
+        """
+        db = self.get_db()
+        highest_job = db.jobs.find_one(**HIGHEST_JOB_QUERY)
+        try:
+            db.counters.update_one(**self._seed_counter(highest_job))
+        except DuplicateKeyError:
+            # Another process created the counter at the same time, $max is still applied by it
+            pass
+        self._seeded = True
+
+    def reserve(self, count):
+        """
+        Atomically reserve count consecutive job_ids from the counter.
+
+        Returns:
+        range: The reserved job_ids
+        """
+        if not self._seeded:
+            self._seed()
+        counter = self.get_db().counters.find_one_and_update(**self._reserve_counter(count))
+        return range(counter['seq'] - count + 1, counter['seq'] + 1)
+
+    def next_id(self):
+        """
+        Generate a unique job_id for a new job posting.
+
+        Returns:
+        int: A unique job_id
+        """
+        return self.allocate(1)[0]
+
+    def allocate(self, count):
+        """
+        Generate count unique job_ids, using what is left of the local block first and
+        reserving the rest (rounded up to a whole block) in a single round trip.
+
+        Returns:
+        list: count unique job_ids
+        """
+        with self._lock:
+            job_ids = []
+            needed = self._take(job_ids, count)
+            while needed:
+                block = self.reserve(needed)
+                self._next_id, self._block_end = block.start, block.stop
+                needed = self._take(job_ids, count)
+            return job_ids
+
+
+class AsyncJobIdAllocator(JobIdAllocator):
+    """
+    JobIdAllocator for the asyncio API (async_app). It uses the same counter document,
+    so ids stay unique across the sync and async servers. Only the round trips differ.
+    """
+
+    def __init__(self, get_db, block_size=1):
+        super().__init__(get_db, block_size=block_size)
+        self._async_lock = None
+
+    def _reset(self):
+        super()._reset()
+        self._async_lock = None
+
+    async def _seed(self):
+        db = self.get_db()
+        highest_job = await db.jobs.find_one(**HIGHEST_JOB_QUERY)
+        try:
+            await db.counters.update_one(**self._seed_counter(highest_job))
+        except DuplicateKeyError:
+            pass
+        self._seeded = True
+
+    async def reserve(self, count):
+        if not self._seeded:
+            await self._seed()
+        counter = await self.get_db().counters.find_one_and_update(**self._reserve_counter(count))
+        return range(counter['seq'] - count + 1, counter['seq'] + 1)
+
+    async def next_id(self):
+        return (await self.allocate(1))[0]
+
+    async def allocate(self, count):
+        # Created on first use so it belongs to the running event loop
+        if self._async_lock is None:
+            self._async_lock = asyncio.Lock()
+        async with self._async_lock:
+            job_ids = []
+            needed = self._take(job_ids, count)
+            while needed:
+                block = await self.reserve(needed)
+                self._next_id, self._block_end = block.start, block.stop
+                needed = self._take(job_ids, count)
+            return job_ids
+
+
+def top_companies_pipeline(industry, after=None, limit=None):
+    """
+    Build the aggregation pipeline that counts job listings per company in an industry.
+    Companies are ordered by job count (highest first) then name, and after/limit
+    select one page of that order (after is the [job_count, company_name] of the last company seen).
+
+    Returns:
+    list: The aggregation pipeline
+    """
+    pipeline = [
+        {"$match": {"industry_name": industry}},
+        {"$group": {
+            "_id": "$company_name",
+            "job_count": {"$sum": 1}
+        }},
+        {"$sort": {"job_count": -1, "_id": 1}}
+    ]
+    if after is not None:
+        pipeline.append({"$match": keyset_filter([("job_count", -1), ("_id", 1)], after)})
+    if limit is not None:
+        pipeline.append({"$limit": limit})
+    pipeline.append({"$project": {
+        "_id": 0,
+        "company_name": "$_id",
+        "job_count": 1
+    }})
+    return pipeline
@@ -0,0 +1,9 @@
+from quart import Quart
+
+from app import config, serialization
+
+# asyncio variant of the Career Hub API, served with an ASGI server (eg. hypercorn async_app:app)
+app = Quart(__name__)
+serialization.init_app(app, config.JSON_BACKEND)
+
+from async_app import career_hub # registers the routes, same contracts as app/career_hub.py
@@ -0,0 +1,707 @@
+'''Module for serving API requests with asyncio
+
+Same routes, request bodies and responses as app/career_hub.py, but every MongoDB round
+trip is awaited on the event loop instead of blocking a worker thread, so one process can
+keep many requests in flight. Independent round trips within a request run concurrently.
+The request parsing, validation and response building are shared with the sync API
+(app/handlers.py), so the routes here only await the queries.
+'''
+
+# Import libraries
+import asyncio
+
+from pymongo.errors import BulkWriteError
+from quart import Response, request, jsonify
+
+from app import batch, cache, companies, config, confirmations, handlers, industry_stats, lifecycle, metrics, salary_columns, search, serialization, skill_index, utils
+from app.constants import (
+    JOB_ID_BLOCK_SIZE, SALARY_SORT, EXPERIENCE_SORT, INDUSTRY_SORT, TOP_COMPANIES_SORT_KEYS,
+    MAX_BULK_JOB_POSTS, UPDATE_INSTRUCTIONS, DELETE_INSTRUCTIONS
+)
+from async_app import app
+from app.db import pool_metrics
+from async_app.db import close_client, get_db
+
+
+# The sync API's result cache: this app does not read it, but its writes invalidate the
+# entries they change (so with the shared redis backend the sync API never serves them stale)
+result_cache = cache.create_cache(config)
+
+# Shares the counters document with the sync API, so ids never collide between the two
+job_id_allocator = utils.AsyncJobIdAllocator(get_db, block_size=JOB_ID_BLOCK_SIZE)
+
+
+# Company fields of jobs in the normalized schema are looked up here
+company_table = companies.AsyncCompanyTable(get_db, ttl=config.COMPANY_TABLE_TTL_SECONDS)
+
+# Skill index behind /match; written jobs are re-read into it as they change
+job_skill_index = skill_index.AsyncSkillIndex(get_db, ttl=config.SKILL_INDEX_TTL_SECONDS)
+
+# Salary columns behind /salary_stats; written jobs are re-read before the next query
+salary_column_store = salary_columns.AsyncSalaryColumns(get_db, ttl=config.SALARY_COLUMNS_TTL_SECONDS)
+
+# Industries whose jobs changed are queued here, refresh_industry_stats() runs the refresh
+stats_refresher = industry_stats.IndustryStatsRefresher(
+    get_db,
+    interval=config.INDUSTRY_STATS_REFRESH_SECONDS,
+    full_interval=config.INDUSTRY_STATS_FULL_REFRESH_SECONDS,
+    on_refresh=lambda industries: result_cache.invalidate(industry_stats.cache_tags(industries))
+)
+
+# Run by sweep_expired_jobs() with CAREERHUB_JOB_EXPIRY_POLICY=archive; archived jobs are gone from jobs, like deleted ones
+expiry_sweeper = lifecycle.JobExpirySweeper(
+    get_db,
+    interval=config.JOB_EXPIRY_SWEEP_SECONDS,
+    grace_days=config.JOB_EXPIRY_GRACE_DAYS,
+    batch_size=config.JOB_EXPIRY_BATCH_SIZE,
+    on_sweep=lambda result: jobs_changed(result["job_ids"], result["industries"])
+)
+
+
+async def plan_company_fields(projection):
+    """
+    Async version of app.career_hub.plan_company_fields.
+
+    Returns:
+    tuple: (projection for the jobs query, function that completes a list of jobs, or None)
+    """
+    if config.JOB_SCHEMA != 'normalized':
+        return projection, None
+    projection, fields, drop = companies.plan_projection(projection)
+    if not fields:
+        return projection, None
+    table = await company_table.companies()
+    return projection, lambda jobs: companies.complete_jobs(jobs, table, fields, drop)
+
+
+async def find_page(collection, query, projection, sort_keys, limit, after=None, include_archived=False):
+    """
+    Async version of lifecycle.find_page: fetch one keyset-paginated page of a query on
+    jobs, or on jobs and jobs_archive together.
+
+    Returns:
+    tuple: (list of documents, next cursor token or None on the last page)
+    """
+    query, projection, added_fields = utils.prepare_page(query, projection, sort_keys, after)
+    if include_archived:
+        cursor = await collection.aggregate(lifecycle.union_pipeline(query, projection, sort_keys, limit + 1))
+        documents = await cursor.to_list(None)
+    else:
+        documents = await collection.find(query, projection).sort(sort_keys).limit(limit + 1).to_list(None)
+    return utils.finish_page(documents, sort_keys, limit, added_fields)
+
+
+async def ndjson_lines(cursor, complete=None):
+    """
+    Async version of utils.ndjson_lines: yield each document of a cursor as a line of NDJSON.
+    """
+    try:
+        async for document in cursor:
+            if complete:
+                document = complete([document])[0]
+            yield serialization.dumps(document) + b'\n'
+    finally:
+        await cursor.close()
+
+
+async def find_jobs(collection, query, projection, include_archived=False):
+    """
+    Returns:
+    cursor: The jobs matching the query, with the archived ones when asked for
+    """
+    if not include_archived:
+        return collection.find(query, projection)
+    return await collection.aggregate(lifecycle.union_pipeline(query, projection))
+
+
+async def request_body():
+    body = await request.get_json(silent=True)
+    return body if isinstance(body, dict) else {}
+
+
+async def list_jobs(body, query, projection, sort_keys, not_found, count_total=False):
+    """
+    Async version of app.career_hub.list_jobs. The page and the total count are
+    independent queries, so they run concurrently.
+    """
+    db = get_db()
+    projection, complete_jobs = await plan_company_fields(projection)
+    archived = lifecycle.include_expired(body)
+
+    if utils.wants_stream(request, body):
+        cursor = (await find_jobs(db.jobs, query, projection, archived)).batch_size(utils.STREAM_BATCH_SIZE)
+        return Response(ndjson_lines(cursor, complete_jobs), mimetype=utils.NDJSON_MIMETYPE), 200
+
+    limit, after = handlers.page_params(body, request.args, len(sort_keys))
+    counts = []
+    if count_total:
+        counts.append(db.jobs.count_documents(query))
+        if archived:
+            counts.append(db[lifecycle.ARCHIVE_COLLECTION].count_documents(query))
+    (jobs, next_cursor), *totals = await asyncio.gather(find_page(db.jobs, query, projection, sort_keys, limit, after, archived), *counts)
+    if complete_jobs:
+        jobs = complete_jobs(jobs)
+
+    payload, status = handlers.jobs_page(jobs, next_cursor, limit, after, not_found, sum(totals) if count_total else None)
+    return jsonify(payload), status
+
+
+async def jobs_changed(job_ids=(), industries=(), fields=None):
+    """
+    Async version of app.career_hub.jobs_changed: drop the affected cached results,
+    re-read the changed jobs into the skill index, queue them for the salary columns and
+    queue the changed industries for the industry statistics refresh (job_ids and
+    industries are None when too many jobs changed to list them).
+    """
+    if job_ids is None:
+        result_cache.invalidate(industry_stats.cache_tags(None))
+        if skill_index.skills_changed(fields):
+            job_skill_index.expire()
+        salary_column_store.expire()
+        stats_refresher.queue(None)
+        return
+    result_cache.invalidate([f"industry:{industry}" for industry in industries if industry])
+    if skill_index.skills_changed(fields):
+        await job_skill_index.refresh_jobs(job_ids)
+    salary_column_store.refresh_jobs(job_ids)
+    stats_refresher.queue(industries)
+
+
+async def refresh_industry_stats():
+    """
+    Background task: refresh the statistics of the queued industries every
+    CAREERHUB_INDUSTRY_STATS_REFRESH_SECONDS, and of every industry on the full refresh
+    schedule, as the sync API's refresher thread does.
+    """
+    while True:
+        await asyncio.sleep(stats_refresher.interval)
+        await stats_refresher.run_once_async()
+
+
+async def sweep_expired_jobs():
+    """
+    Background task: archive the jobs past their closing date every
+    CAREERHUB_JOB_EXPIRY_SWEEP_SECONDS, when no other process holds the sweep lease.
+    """
+    while True:
+        await expiry_sweeper.run_once_async()
+        await asyncio.sleep(expiry_sweeper.interval)
+
+
+@app.before_serving
+async def startup():
+    for name, store in (("skill index", job_skill_index), ("salary columns", salary_column_store)):
+        try:
+            await store.load()
+        except Exception as e:
+            app.logger.warning("Could not build the %s: %s", name, e)
+    app.add_background_task(refresh_industry_stats)
+    if config.JOB_EXPIRY_POLICY == 'archive':
+        app.add_background_task(sweep_expired_jobs)
+
+
+@app.after_serving
+async def shutdown():
+    await close_client()
+
+
+async def start_request_metrics():
+    metrics.start_request()
+
+
+async def record_request_metrics(response):
+    """
+    Record the request in the /metrics histograms. Quart runs this before a streamed
+    body is sent, so streamed responses are timed up to their first line and their size
+    is not recorded.
+    """
+    stats = metrics.current_request()
+    if stats is not None:
+        metrics.request_metrics.record(stats, metrics.route_label(request.url_rule), request.method,
+                                       response.status_code, response.content_length)
+    return response
+
+
+# Per-route latency, payload size, JSON encoding and MongoDB time, served on /metrics
+if config.METRICS_ENABLED:
+    metrics.time_serialization(app.json)
+    app.before_request(start_request_metrics)
+    app.after_request(record_request_metrics)
+
+
+@app.route("/")
+async def get_initial_response():
+    """
+    Initial entry point for the API, providing a friendly welcome message and basic API information.
+    """
+    return jsonify({
+        'apiVersion': 'v1.0',
+        'status': '200',
+        'message': 'Welcome to the Career Hub API! (asyncio server)',
+        'note': 'Routes and request bodies are the same as the sync API. All POST endpoints provide detailed instructions when accessed with a GET request'
+    }), 200
+
+
+@app.route("/create/jobPost", methods=['POST', 'GET'])
+async def create_job_post():
+    """
+    Create a new job posting. The industry lookup and the job_id allocation are
+    independent, so they run concurrently, as do the industry and job inserts.
+    """
+    if request.method == 'GET':
+        return jsonify({
+            "message": "This endpoint creates a new job posting. Send a POST request with job details in the body to create a new job post. Required fields are 'title', 'industry', and 'company_name'. Any additional fields provided will be included in the job post."
+        }), 200
+
+    try:
+        db = get_db()
+        job_post = handlers.new_job_post(await request.get_json(silent=True))
+        industry_name = handlers.industry_name(job_post)
+
+        # Allocate the job_id and check the industry at the same time
+        job_post['job_id'], industry = await asyncio.gather(
+            job_id_allocator.next_id(),
+            db.industries.find_one({"industry_name": industry_name})
+        )
+
+        # Insert the job post, and the industry if it is new, at the same time
+        writes = [db.jobs.insert_one(job_post)]
+        if not industry:
+            writes.append(db.industries.insert_one({"industry_name": industry_name}))
+        result = (await asyncio.gather(*writes))[0]
+        await jobs_changed([job_post['job_id']], handlers.job_industries([job_post]))
+
+        payload, status = handlers.job_post_created(result, job_post, not industry)
+        return jsonify(payload), status
+
+    except handlers.ErrorResponse as e:
+        return jsonify(e.payload), e.status
+    except Exception as e:
+        return jsonify({'error': 'An unexpected error occurred', 'details': str(e)}), 500
+
+
+@app.route("/create/jobPosts/bulk", methods=['POST', 'GET'])
+async def create_job_posts_bulk():
+    """
+    Create many job postings from a JSON array or NDJSON, validated with the same rules
+    as /create/jobPost. The job_id block and the industry upserts are independent, so
+    they run concurrently.
+    """
+    if request.method == 'GET':
+        return jsonify({
+            "message": f"This endpoint creates many job postings at once. Send a POST request with a JSON array of job posts, or NDJSON (one job post per line) with Content-Type 'application/x-ndjson'. Each job post follows the same rules as /create/jobPost. Up to {MAX_BULK_JOB_POSTS} job posts are accepted per request and the response reports the result of every record."
+        }), 200
+
+    try:
+        db = get_db()
+        results, job_posts = handlers.bulk_job_posts(await request.get_data(), request.content_type)
+
+        # Allocate the job_ids and add the new industries at the same time
+        industry_names, upserts = handlers.industry_upserts(job_posts.values())
+        writes = [job_id_allocator.allocate(len(job_posts))]
+        if upserts:
+            writes.append(db.industries.bulk_write(upserts, ordered=False))
+        outcomes = await asyncio.gather(*writes)
+        new_industries = [industry_names[position] for position in outcomes[1].upserted_ids] if upserts else []
+        for job_post, job_id in zip(job_posts.values(), outcomes[0]):
+            job_post['job_id'] = job_id
+
+        for chunk in handlers.insert_chunks(job_posts):
+            try:
+                await db.jobs.insert_many([job_post for _, job_post in chunk], ordered=False)
+                handlers.record_inserts(results, chunk)
+            except BulkWriteError as e:
+                handlers.record_inserts(results, chunk, e)
+
+        await jobs_changed([job_post['job_id'] for job_post in job_posts.values()], handlers.job_industries(job_posts.values()))
+
+        payload, status = handlers.bulk_created(results, new_industries)
+        return jsonify(payload), status
+
+    except handlers.ErrorResponse as e:
+        return jsonify(e.payload), e.status
+    except Exception as e:
+        return jsonify({'error': 'An unexpected error occurred', 'details': str(e)}), 500
+
+
+@app.route("/jobPosts/batch", methods=['POST', 'GET'])
+async def batch_update_jobs():
+    """
+    Update or delete the jobs matching a list of filters as one unordered bulk write.
+    """
+    if request.method == 'GET':
+        return jsonify({
+            "message": f"This endpoint updates or deletes the jobs matching many filters at once. Send a POST request with a JSON array (or NDJSON) of operations, each {{\"filter\": {{...}}, \"update\": {{...}}}} or {{\"filter\": {{...}}, \"delete\": true}}. Updates can set {', '.join(utils.UPDATABLE_FIELDS)}. Up to {batch.MAX_BATCH_OPERATIONS} operations are accepted per request and the response reports the result of every operation."
+        }), 200
+
+    try:
+        db = get_db()
+        results, operations = handlers.batch_operations(await request.get_data(), request.content_type)
+
+        outcomes, totals = [], None
+        if operations:
+            parsed = [operation for _, operation in operations]
+
+            # Read which jobs the batch touches before deleted ones are gone
+            job_ids, industries = await batch.affected_jobs_async(db, parsed)
+
+            outcomes, totals = await batch.execute_async(db, parsed)
+            await jobs_changed(job_ids, industries, batch.written_fields(parsed))
+
+        payload, status = handlers.batch_applied(results, operations, outcomes, totals)
+        return jsonify(payload), status
+
+    except handlers.ErrorResponse as e:
+        return jsonify(e.payload), e.status
+    except Exception as e:
+        return jsonify({'error': 'An unexpected error occurred', 'details': str(e)}), 500
+
+
+@app.route("/add/industry_info", methods=['POST', 'GET'])
+async def add_industry_info():
+    """
+    Add or update industry information in the database.
+    """
+    if request.method == 'GET':
+        return jsonify({
+            "message": "This endpoint adds or updates industry information. Send a POST request with industry details in the body. 'industry_name' is required, all other fields are optional and will be added or updated as provided."
+        }), 200
+
+    try:
+        industry_name, industry_doc = handlers.industry_info_update(await request_body())
+        result = await get_db().industries.update_one(
+            {"industry_name": industry_name},
+            {"$set": industry_doc},
+            upsert=True
+        )
+        await jobs_changed(industries=[industry_name])
+
+        payload, status = handlers.industry_info_saved(result, industry_name)
+        return jsonify(payload), status
+
+    except handlers.ErrorResponse as e:
+        return jsonify(e.payload), e.status
+    except Exception as e:
+        return jsonify({'error': 'An unexpected error occurred', 'details': str(e)}), 500
+
+
+@app.route("/search_by_job_id/<job_id>", methods=['GET'])
+async def view_job_details(job_id):
+    """
+    Search for a specific job posting using its unique job ID.
+    """
+    try:
+        job_id = int(job_id)
+
+        body = None
+        if request.content_length:
+            if not request.is_json:
+                return jsonify({"error": "Invalid JSON in request body"}), 400
+            body = await request.get_json()
+        projection, archived = handlers.job_details_projection(body)
+
+        projection, complete_jobs = await plan_company_fields(projection)
+        db = get_db()
+        job = await db.jobs.find({"job_id": job_id}, projection).to_list(None)
+        if not job and archived:
+            job = await db[lifecycle.ARCHIVE_COLLECTION].find({"job_id": job_id}, lifecycle.archive_projection(projection)).to_list(None)
+        if complete_jobs:
+            job = complete_jobs(job)
+        return jsonify(job), 200
+
+    except ValueError:
+        return jsonify({"error": "Invalid job_id format"}), 400
+    except Exception as e:
+        return jsonify({"error": "An unexpected error occurred", "details": str(e)}), 500
+
+
+@app.route("/update_by_job_title", methods=['GET', 'POST'])
+async def update_job_details():
+    """
+    Update jobs matching a title and at least one other field, after a confirmation request.
+    """
+    try:
+        if request.method == 'GET':
+            return jsonify(UPDATE_INSTRUCTIONS), 200
+
+        body = await request_body()
+        query = handlers.update_criteria(body)
+
+        if 'confirm_update' not in body:
+            # Read the matching jobs once and bind a confirmation token to them
+            payload, status = handlers.update_preview(*await confirmations.preview_async(get_db(), 'update', query, config.CONFIRM_MAX_JOBS, config.CONFIRM_TOKEN_TTL_SECONDS))
+            return jsonify(payload), status
+
+        handlers.check_confirmation(body, 'confirm_update')
+        update_data = handlers.job_update(body)
+
+        # The jobs shown by the preview, selected by _id
+        target, job_ids, industries = await confirmations.confirm_target_async(get_db(), body.get('confirmation_token'), 'update', query)
+
+        result = await get_db().jobs.update_many(target, {"$set": update_data})
+        await jobs_changed(job_ids, industries, update_data)
+
+        payload, status = handlers.jobs_updated(result, update_data)
+        return jsonify(payload), status
+
+    except handlers.ErrorResponse as e:
+        return jsonify(e.payload), e.status
+    except ValueError as e:
+        # The confirmation token is invalid, expired, used or was issued for other criteria
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": "An unexpected error occurred", "details": str(e)}), 500
+
+
+@app.route('/delete_by_job_title', methods=['GET', 'POST'])
+async def delete_by_job_title():
+    """
+    Delete jobs matching a title and at least one other field, after a confirmation request.
+    """
+    try:
+        if request.method == 'GET':
+            return jsonify(DELETE_INSTRUCTIONS), 200
+
+        body = await request_body()
+        query = handlers.delete_criteria(body)
+
+        if 'confirm_delete' not in body:
+            # Read the matching jobs once and bind a confirmation token to them
+            payload, status = handlers.delete_preview(*await confirmations.preview_async(get_db(), 'delete', query, config.CONFIRM_MAX_JOBS, config.CONFIRM_TOKEN_TTL_SECONDS))
+            return jsonify(payload), status
+
+        handlers.check_confirmation(body, 'confirm_delete')
+
+        # The jobs shown by the preview, selected by _id
+        target, job_ids, industries = await confirmations.confirm_target_async(get_db(), body.get('confirmation_token'), 'delete', query)
+
+        result = await get_db().jobs.delete_many(target)
+        await jobs_changed(job_ids, industries)
+
+        payload, status = handlers.jobs_deleted(result)
+        return jsonify(payload), status
+
+    except handlers.ErrorResponse as e:
+        return jsonify(e.payload), e.status
+    except ValueError as e:
+        # The confirmation token is invalid, expired, used or was issued for other criteria
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": "An unexpected error occurred", "details": str(e)}), 500
+
+
+@app.route('/jobs_by_salary', methods=['GET'])
+async def get_jobs_by_salary():
+    """
+    Query jobs within a salary range, paginated or streamed as NDJSON.
+    """
+    try:
+        body = await request_body()
+        query, projection, not_found = handlers.salary_range(body)
+        return await list_jobs(body, query, projection, SALARY_SORT, not_found)
+
+    except handlers.ErrorResponse as e:
+        return jsonify(e.payload), e.status
+    except Exception as e:
+        return jsonify({"error": "An unexpected error occurred", "details": str(e)}), 500
+
+
+@app.route('/jobs_by_experience', methods=['GET'])
+async def get_jobs_by_experience():
+    """
+    Retrieve jobs by experience level(s), paginated or streamed as NDJSON.
+    """
+    try:
+        body = await request_body()
+        query, projection, not_found = handlers.experience_levels(body)
+        return await list_jobs(body, query, projection, EXPERIENCE_SORT, not_found)
+
+    except handlers.ErrorResponse as e:
+        return jsonify(e.payload), e.status
+    except Exception as e:
+        return jsonify({"error": "An unexpected error occurred", "details": str(e)}), 500
+
+
+@app.route('/top_companies_by_industry', methods=['GET'])
+async def get_top_companies_by_industry():
+    """
+    Fetch top companies in a given industry based on the number of job listings.
+    """
+    try:
+        body = await request_body()
+        industry = handlers.required(body, 'industry_name', "industry parameter must be provided")
+        limit, after = handlers.page_params(body, request.args, TOP_COMPANIES_SORT_KEYS)
+
+        # Served from the industry's statistics document, aggregated from the jobs past the stored companies
+        db = get_db()
+        stats = await db[industry_stats.STATS_COLLECTION].find_one({"_id": industry}, {"top_companies": 1, "company_count": 1})
+        top_companies = industry_stats.top_companies_page(stats, after, limit + 1) if stats else None
+        if top_companies is None:
+            cursor = await db.jobs.aggregate(utils.top_companies_pipeline(industry, after=after, limit=limit + 1))
+            top_companies = await cursor.to_list(None)
+
+        payload, status = handlers.top_companies_page(top_companies, limit, after, industry)
+        return jsonify(payload), status
+
+    except handlers.ErrorResponse as e:
+        return jsonify(e.payload), e.status
+    except Exception as e:
+        return jsonify({"error": "An unexpected error occurred", "details": str(e)}), 500
+
+
+@app.route('/industry_stats', methods=['GET'])
+async def get_industry_stats():
+    """
+    Fetch the precomputed analytics of an industry from the industry_stats collection.
+    """
+    try:
+        industry_name = handlers.required(await request_body(), 'industry_name')
+        stats = await get_db()[industry_stats.STATS_COLLECTION].find_one({"_id": industry_name}, handlers.INDUSTRY_STATS_PROJECTION)
+
+        payload, status = handlers.industry_stats_response(stats, industry_name)
+        return jsonify(payload), status
+
+    except handlers.ErrorResponse as e:
+        return jsonify(e.payload), e.status
+    except Exception as e:
+        return jsonify({"error": "An unexpected error occurred", "details": str(e)}), 500
+
+
+@app.route('/industry_info', methods=['GET'])
+async def get_industry_info():
+    """
+    Fetch industry information based on industry name.
+    """
+    try:
+        industry_name, projection = handlers.industry_info_request(await request_body())
+        industry = await get_db().industries.find_one({"industry_name": industry_name}, projection)
+
+        payload, status = handlers.industry_info_response(industry, industry_name)
+        return jsonify(payload), status
+
+    except handlers.ErrorResponse as e:
+        return jsonify(e.payload), e.status
+    except Exception as e:
+        return jsonify({"error": "An unexpected error occurred", "details": str(e)}), 500
+
+
+@app.route('/company_info', methods=['GET'])
+async def get_company_info():
+    """
+    Fetch company information based on company name.
+    """
+    try:
+        company_name, projection = handlers.company_info_request(await request_body())
+        company = await get_db().companies.find_one({"name": company_name}, projection)
+
+        payload, status = handlers.company_info_response(company, company_name)
+        return jsonify(payload), status
+
+    except handlers.ErrorResponse as e:
+        return jsonify(e.payload), e.status
+    except Exception as e:
+        return jsonify({"error": "An unexpected error occurred", "details": str(e)}), 500
+
+
+@app.route("/search_by_industry/", methods=['GET'])
+async def search_jobs_by_industry():
+    """
+    Search for job postings in a specific industry, with the total number of matching jobs.
+    """
+    try:
+        body = await request_body()
+        query, projection, not_found = handlers.industry_jobs(body)
+        return await list_jobs(body, query, projection, INDUSTRY_SORT, not_found, count_total=True)
+
+    except handlers.ErrorResponse as e:
+        return jsonify(e.payload), e.status
+    except Exception as e:
+        return jsonify({"error": "An unexpected error occurred", "details": str(e)}), 500
+
+
+@app.route("/search", methods=['GET'])
+async def search_jobs():
+    """
+    Full-text job search with filters and facet counts, answered by a single aggregation.
+    """
+    try:
+        body = await request_body()
+        query, projection, limit, after = handlers.search_request(body, request.args)
+
+        projection, complete_jobs = await plan_company_fields(projection)
+        pipeline, added_fields = search.search_pipeline(query, projection, limit, after)
+        cursor = await get_db().jobs.aggregate(pipeline)
+        results = await cursor.to_list(None)
+
+        payload, status = handlers.search_results(results[0] if results else {}, added_fields, complete_jobs, limit, after, body)
+        return jsonify(payload), status
+
+    except handlers.ErrorResponse as e:
+        return jsonify(e.payload), e.status
+    except Exception as e:
+        return jsonify({"error": "An unexpected error occurred", "details": str(e)}), 500
+
+
+@app.route("/match", methods=['GET'])
+async def match_jobs_by_skills():
+    """
+    Find the jobs that best match a list of skills, scored from the skill index.
+    """
+    try:
+        body = await request_body()
+        matches = await job_skill_index.match(*handlers.match_request(body))
+
+        query, projection = handlers.matched_jobs_query(matches, body)
+        projection, complete_jobs = await plan_company_fields(projection)
+        jobs = await get_db().jobs.find(query, projection).to_list(None)
+        if complete_jobs:
+            jobs = complete_jobs(jobs)
+
+        payload, status = handlers.match_response(matches, jobs)
+        return jsonify(payload), status
+
+    except handlers.ErrorResponse as e:
+        return jsonify(e.payload), e.status
+    except Exception as e:
+        return jsonify({"error": "An unexpected error occurred", "details": str(e)}), 500
+
+
+@app.route("/salary_stats", methods=['GET'])
+async def get_salary_stats():
+    """
+    Salary histogram, percentiles and mean of the jobs matching the optional filters,
+    answered from this process's in-memory salary columns.
+    """
+    try:
+        body = await request_body()
+        return jsonify(await salary_column_store.stats(*handlers.salary_stats_request(body))), 200
+
+    except handlers.ErrorResponse as e:
+        return jsonify(e.payload), e.status
+    except Exception as e:
+        return jsonify({"error": "An unexpected error occurred", "details": str(e)}), 500
+
+
+@app.route("/cache_stats", methods=['GET'])
+async def get_cache_stats():
+    """
+    Report the result cache counters of this process.
+    """
+    return jsonify(result_cache.stats()), 200
+
+
+@app.route("/pool_stats", methods=['GET'])
+async def get_pool_stats():
+    """
+    Report the MongoDB connection pool counters of this process.
+    """
+    return jsonify(pool_metrics.snapshot()), 200
+
+
+@app.route("/metrics", methods=['GET'])
+async def get_metrics():
+    """
+    Request, MongoDB command and connection pool metrics of this process, in the
+    Prometheus text format.
+    """
+    return Response(metrics.render(pool_metrics.snapshot()), mimetype=metrics.PROMETHEUS_MIMETYPE), 200
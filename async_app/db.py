@@ -0,0 +1,55 @@
+'''Module for creating the asyncio MongoDB client lazily'''
+
+import os
+import threading
+
+from pymongo import AsyncMongoClient
+
+from app import config
+from app.db import client_options
+
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """
+    Return the asyncio MongoDB client for this process, creating it on first use (and
+    again in a forked worker). It uses the same pool settings and pool metrics as the
+    sync client in app/db.py.
+
+    Returns:
+    AsyncMongoClient: The client
+    """
+    global _client, _client_pid
+    pid = os.getpid()
+    if _client is None or _client_pid != pid:
+        with _client_lock:
+            if _client is None or _client_pid != pid:
+                _client = AsyncMongoClient(config.MONGO_URI, **client_options())
+                _client_pid = pid
+    return _client
+
+
+def get_db():
+    """
+    Return the careerhub database on this process's asyncio client.
+
+    Returns:
+    AsyncDatabase: The database
+    """
+    return get_client()[config.MONGO_DB]
+
+
+async def close_client():
+    """
+    Close the client of this process, eg. when the server shuts down.
+    """
+    global _client, _client_pid
+    client = _client
+    _client = None
+    _client_pid = None
+    if client is not None:
+        await client.close()
@@ -0,0 +1,83 @@
+'''Compare the sync (gunicorn, threads) and asyncio (hypercorn) servers under load
+
+Both servers run a single worker process against the mongod given by
+CAREERHUB_MONGO_URI, and the same request mix is replayed at increasing concurrency,
+so the table shows where the thread pool saturates and how the event loop keeps up:
+    python benchmarks/async_bench.py --concurrency 8,32,128,256 --duration 20
+
+Only routes both servers provide should be in the mix (request_mix.jsonl is fine).
+'''
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+import load_test
+
+
+def start_sync(port, threads):
+    env = dict(os.environ, CAREERHUB_WORKERS='1', CAREERHUB_THREADS=str(threads),
+               CAREERHUB_BIND=f'127.0.0.1:{port}', CAREERHUB_ACCESS_LOG='')
+    return subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py'], cwd=load_test.REPO_ROOT, env=env)
+
+
+def start_async(port):
+    return subprocess.Popen([sys.executable, '-m', 'hypercorn', '--workers', '1', '--bind', f'127.0.0.1:{port}', 'async_app:app'],
+                            cwd=load_test.REPO_ROOT)
+
+
+def run_server(server, port, levels, args, requests):
+    """
+    Run the load at each concurrency level against an already started server, then stop it.
+
+    Returns:
+    list: One {'concurrency', 'total'} entry per level, total being the TOTAL summary row
+    """
+    url = f'http://127.0.0.1:{port}'
+    try:
+        if not load_test.wait_until_up(url):
+            raise RuntimeError(f'server on port {port} did not start')
+        load_test.run_load(url, requests, min(3, args.duration), levels[0])  # warm up
+        results = []
+        for concurrency in levels:
+            rows = load_test.summarize(load_test.run_load(url, requests, args.duration, concurrency))
+            results.append({'concurrency': concurrency, 'total': rows[-1]})
+        return results
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare the sync and asyncio Career Hub servers')
+    parser.add_argument('--mix', default=os.path.join(load_test.REPO_ROOT, 'benchmarks', 'request_mix.jsonl'), help='Request mix file (JSON lines)')
+    parser.add_argument('--concurrency', default='8,32,128,256', help='Comma separated concurrency levels')
+    parser.add_argument('--duration', type=float, default=20, help='Seconds of load per level')
+    parser.add_argument('--threads', type=int, default=8, help='Threads of the single gunicorn worker')
+    parser.add_argument('--port', type=int, default=5056, help='Port for the servers')
+    parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+    args = parser.parse_args(argv)
+
+    requests = load_test.load_request_mix(args.mix)
+    levels = [int(value) for value in args.concurrency.split(',')]
+
+    results = {
+        'sync': run_server(start_sync(args.port, args.threads), args.port, levels, args, requests),
+        'async': run_server(start_async(args.port), args.port, levels, args, requests)
+    }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+
+    print(f"\n{'concurrency':>12}{'sync req/s':>14}{'sync p99 ms':>14}{'async req/s':>14}{'async p99 ms':>14}")
+    for sync_entry, async_entry in zip(results['sync'], results['async']):
+        print(f"{sync_entry['concurrency']:>12}{sync_entry['total']['rps']:>14}{sync_entry['total']['p99_ms']:>14}"
+              f"{async_entry['total']['rps']:>14}{async_entry['total']['p99_ms']:>14}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
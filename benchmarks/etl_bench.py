@@ -0,0 +1,83 @@
+'''Benchmark data_transformation.py on synthetic feeds
+
+Runs each output format in a fresh process on generated csvs and reports the wall time,
+jobs/sec and peak RSS, so the memory growth of the in-memory JSON format can be compared
+with the streaming NDJSON format (whose peak RSS should stay flat as the jobs grow):
+    python benchmarks/etl_bench.py --jobs 10000,100000,1000000
+
+The json format joins companies with a scan per job, so by default it is only run up to
+--json-max-jobs rows.
+'''
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import synthetic_feed
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Run in the child: transform, then print the child's own peak RSS in KiB
+CHILD = '''
+import resource, sys
+sys.path.insert(0, {root!r})
+import data_transformation
+data_transformation.main({argv!r})
+print("MAXRSS", resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+'''
+
+
+def run_format(data_dir, output_dir, output_format, extra_args=()):
+    """
+    Run one transformation in a subprocess.
+
+    Returns:
+    dict: Wall time in seconds and peak RSS in MiB
+    """
+    argv = ['--data-dir', data_dir, '--output-dir', output_dir, '--format', output_format, *extra_args]
+    started = time.perf_counter()
+    completed = subprocess.run([sys.executable, '-c', CHILD.format(root=REPO_ROOT, argv=argv)],
+                               check=True, capture_output=True, text=True)
+    elapsed = time.perf_counter() - started
+    maxrss = next(int(line.split()[1]) for line in completed.stdout.splitlines() if line.startswith('MAXRSS'))
+    return {'seconds': round(elapsed, 2), 'peak_rss_mib': round(maxrss / 1024, 1)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark data_transformation.py output formats')
+    parser.add_argument('--jobs', default='10000,100000,1000000', help='Comma separated job counts')
+    parser.add_argument('--companies', type=int, default=10000, help='Company rows per feed, fixed so only the jobs grow')
+    parser.add_argument('--formats', default='json,ndjson', help='Comma separated formats to run')
+    parser.add_argument('--json-max-jobs', type=int, default=10000, help='Largest feed the json format is run on')
+    parser.add_argument('--workdir', help='Directory for the generated feeds (default: a temporary directory)')
+    parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+    args = parser.parse_args(argv)
+
+    results = []
+    with tempfile.TemporaryDirectory(dir=args.workdir) as workdir:
+        for jobs in [int(value) for value in args.jobs.split(',')]:
+            data_dir = os.path.join(workdir, f'feed-{jobs}')
+            synthetic_feed.generate(data_dir, jobs, args.companies)
+            for output_format in args.formats.split(','):
+                if output_format == 'json' and jobs > args.json_max_jobs:
+                    continue
+                output_dir = os.path.join(workdir, f'out-{jobs}-{output_format}')
+                os.makedirs(output_dir, exist_ok=True)
+                result = run_format(data_dir, output_dir, output_format)
+                result.update({'jobs': jobs, 'format': output_format, 'jobs_per_sec': round(jobs / result['seconds'])})
+                results.append(result)
+                if not args.json:
+                    print(f"{jobs:>10} jobs  {output_format:<8}{result['seconds']:>10} s{result['jobs_per_sec']:>12} jobs/s{result['peak_rss_mib']:>10} MiB peak RSS")
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,92 @@
+'''Benchmark the company join of data_transformation.py
+
+Times building the lookup tables and joining jobs against them for growing job counts
+with a fixed number of companies. The keyed tables should give the same jobs/sec at
+every size; the original scan over the company list (run up to --scan-max-jobs) slows
+down with the number of companies:
+    python benchmarks/join_bench.py --jobs 10000,100000,1000000 --companies 100000
+'''
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import synthetic_feed
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import data_transformation as dt
+
+
+def scan_join(data_dir, companies):
+    """
+    The join as it was written before the keyed tables: a scan of the company list per job.
+    """
+    count = 0
+    for row in dt.read_csv(os.path.join(data_dir, dt.JOBS_CSV)):
+        job_id = int(row['id'])
+        company = next((c for c in companies if c['company_id'] == job_id), None)
+        dt.build_job(row, {}, {}, dt.company_fields(company) if company else None)
+        count += 1
+    return count
+
+
+def keyed_join(data_dir, company_table):
+    count = 0
+    for row in dt.read_csv(os.path.join(data_dir, dt.JOBS_CSV)):
+        dt.build_job(row, {}, {}, company_table.get(int(row['id'])))
+        count += 1
+    return count
+
+
+def bench(data_dir, jobs, scan):
+    started = time.perf_counter()
+    _, industry_id_to_name = dt.read_lookups(data_dir)
+    companies = dt.read_companies(os.path.join(data_dir, dt.COMPANIES_CSV), industry_id_to_name)
+    company_table = dt.build_company_table(companies)
+    build_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    if scan:
+        scan_join(data_dir, companies)
+    else:
+        keyed_join(data_dir, company_table)
+    join_seconds = time.perf_counter() - started
+    return {
+        'jobs': jobs,
+        'join': 'scan' if scan else 'keyed',
+        'table_seconds': round(build_seconds, 3),
+        'join_seconds': round(join_seconds, 3),
+        'jobs_per_sec': round(jobs / join_seconds) if join_seconds else 0
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the ETL company join')
+    parser.add_argument('--jobs', default='10000,100000,1000000', help='Comma separated job counts')
+    parser.add_argument('--companies', type=int, default=100000, help='Company rows per feed')
+    parser.add_argument('--scan-max-jobs', type=int, default=10000, help='Largest job count the scan join is run on')
+    parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+    args = parser.parse_args(argv)
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for jobs in [int(value) for value in args.jobs.split(',')]:
+            data_dir = os.path.join(workdir, f'feed-{jobs}')
+            synthetic_feed.generate(data_dir, jobs, args.companies)
+            for scan in ([True, False] if jobs <= args.scan_max_jobs else [False]):
+                result = bench(data_dir, jobs, scan)
+                results.append(result)
+                if not args.json:
+                    print(f"{jobs:>10} jobs x {args.companies} companies  {result['join']:<6}"
+                          f"tables {result['table_seconds']:>8} s  join {result['join_seconds']:>8} s{result['jobs_per_sec']:>12} jobs/s")
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
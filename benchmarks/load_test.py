@@ -0,0 +1,225 @@
+'''Load test harness for the Career Hub API
+
+Replays a weighted mix of requests (one JSON object per line, see request_mix.jsonl)
+from many concurrent client threads and reports requests/sec and p50/p95/p99 latency
+per endpoint.
+
+Against a server that is already running:
+    python benchmarks/load_test.py --url http://localhost:5001 --duration 30 --concurrency 32
+
+Scaling curve across gunicorn worker counts (starts gunicorn against the local mongod
+given by CAREERHUB_MONGO_URI, eg. mongodb://localhost:27017/):
+    python benchmarks/load_test.py --workers 1,2,4,8 --duration 20 --concurrency 64
+'''
+
+import argparse
+import http.client
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlparse
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_request_mix(path):
+    """
+    Read the request mix, one request per line with 'name', 'method', 'path',
+    optional 'body' and optional 'weight'.
+
+    Returns:
+    list: The requests
+    """
+    requests = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                request = json.loads(line)
+                request.setdefault('name', f"{request['method']} {request['path']}")
+                request.setdefault('weight', 1)
+                requests.append(request)
+    return requests
+
+
+def percentile(sorted_values, fraction):
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def run_load(url, requests, duration, concurrency, seed=0):
+    """
+    Send the request mix from concurrency threads (one keep-alive connection each) for
+    duration seconds.
+
+    Returns:
+    dict: Per-endpoint latencies in milliseconds and error counts, plus the elapsed time
+    """
+    target = urlparse(url)
+    names = [request['name'] for request in requests]
+    weights = [request['weight'] for request in requests]
+    by_name = {request['name']: request for request in requests}
+
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client(thread_number):
+        rng = random.Random(seed + thread_number)
+        connection = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=30)
+        local_latencies = defaultdict(list)
+        local_errors = defaultdict(int)
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights)[0]
+            request = by_name[name]
+            body = json.dumps(request['body']) if 'body' in request else None
+            headers = {'Content-Type': 'application/json'} if body is not None else {}
+            started = time.perf_counter()
+            try:
+                connection.request(request['method'], request['path'], body=body, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                if response.status >= 500:
+                    local_errors[name] += 1
+                local_latencies[name].append((time.perf_counter() - started) * 1000)
+            except (OSError, http.client.HTTPException):
+                local_errors[name] += 1
+                connection.close()
+                connection = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=30)
+        connection.close()
+        with lock:
+            for name, values in local_latencies.items():
+                latencies[name].extend(values)
+            for name, count in local_errors.items():
+                errors[name] += count
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(number,)) for number in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {'latencies': latencies, 'errors': errors, 'elapsed': time.perf_counter() - started}
+
+
+def summarize(result):
+    """
+    Returns:
+    list: One row per endpoint (and a 'TOTAL' row) with requests/sec and latency percentiles
+    """
+    rows = []
+    all_latencies = []
+    for name in sorted(set(result['latencies']) | set(result['errors'])):
+        values = sorted(result['latencies'].get(name, []))
+        all_latencies.extend(values)
+        rows.append(_row(name, values, result['errors'].get(name, 0), result['elapsed']))
+    rows.append(_row('TOTAL', sorted(all_latencies), sum(result['errors'].values()), result['elapsed']))
+    return rows
+
+
+def _row(name, values, error_count, elapsed):
+    return {
+        'endpoint': name,
+        'requests': len(values),
+        'errors': error_count,
+        'rps': round(len(values) / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(values, 0.50), 2),
+        'p95_ms': round(percentile(values, 0.95), 2),
+        'p99_ms': round(percentile(values, 0.99), 2),
+    }
+
+
+def print_rows(rows, title):
+    print(f"\n{title}")
+    print(f"{'endpoint':<24}{'requests':>10}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for row in rows:
+        print(f"{row['endpoint']:<24}{row['requests']:>10}{row['errors']:>8}{row['rps']:>10}{row['p50_ms']:>10}{row['p95_ms']:>10}{row['p99_ms']:>10}")
+
+
+def wait_until_up(url, timeout=30):
+    target = urlparse(url)
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            connection = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=2)
+            connection.request('GET', '/')
+            connection.getresponse().read()
+            return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def run_with_gunicorn(worker_count, threads, port, args, requests):
+    """
+    Start gunicorn with worker_count workers, run the load against it and stop it.
+
+    Returns:
+    list: The summary rows
+    """
+    env = dict(os.environ, CAREERHUB_WORKERS=str(worker_count), CAREERHUB_THREADS=str(threads),
+               CAREERHUB_BIND=f'127.0.0.1:{port}', CAREERHUB_ACCESS_LOG='')
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py'], cwd=REPO_ROOT, env=env)
+    url = f'http://127.0.0.1:{port}'
+    try:
+        if not wait_until_up(url):
+            raise RuntimeError(f'gunicorn with {worker_count} workers did not start')
+        run_load(url, requests, min(3, args.duration), args.concurrency)  # warm up
+        return summarize(run_load(url, requests, args.duration, args.concurrency))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Replay a request mix against the Career Hub API')
+    parser.add_argument('--mix', default=os.path.join(REPO_ROOT, 'benchmarks', 'request_mix.jsonl'), help='Request mix file (JSON lines)')
+    parser.add_argument('--url', default='http://localhost:5001', help='Base URL of a running server')
+    parser.add_argument('--duration', type=float, default=20, help='Seconds of load per run')
+    parser.add_argument('--concurrency', type=int, default=32, help='Concurrent client connections')
+    parser.add_argument('--workers', help='Comma separated gunicorn worker counts to start and compare, eg. 1,2,4,8')
+    parser.add_argument('--threads', type=int, default=4, help='Threads per gunicorn worker when --workers is used')
+    parser.add_argument('--port', type=int, default=5055, help='Port for the gunicorn servers started with --workers')
+    parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+    args = parser.parse_args(argv)
+
+    requests = load_request_mix(args.mix)
+
+    if not args.workers:
+        rows = summarize(run_load(args.url, requests, args.duration, args.concurrency))
+        if args.json:
+            print(json.dumps(rows, indent=2))
+        else:
+            print_rows(rows, f'{args.url}, concurrency {args.concurrency}')
+        return 0
+
+    scaling = []
+    for worker_count in [int(value) for value in args.workers.split(',')]:
+        rows = run_with_gunicorn(worker_count, args.threads, args.port, args, requests)
+        scaling.append({'workers': worker_count, 'results': rows})
+        if not args.json:
+            print_rows(rows, f'{worker_count} worker(s) x {args.threads} thread(s), concurrency {args.concurrency}')
+
+    if args.json:
+        print(json.dumps(scaling, indent=2))
+    else:
+        print('\nScaling curve (total req/s, p99 ms)')
+        for entry in scaling:
+            total = entry['results'][-1]
+            print(f"{entry['workers']:>4} workers: {total['rps']:>10} req/s  p99 {total['p99_ms']} ms")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,86 @@
+'''Compare /match scoring from the skill index with a scan over every job
+
+Builds the skill index from a synthetic feed in process (no mongod needed) and times the
+top-K match for a few skill lists against scoring every job's skill set per request,
+which is what a query without the index would have to do:
+    python benchmarks/match_bench.py --jobs 200000
+'''
+
+import argparse
+import heapq
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import synthetic_feed
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import data_transformation as dt
+from app import skill_index
+
+QUERIES = [
+    ['Python', 'SQL'],
+    ['Spark', 'AWS', 'Docker', 'Go'],
+    ['Tableau', 'R', 'Strong analytical skills'],
+]
+
+
+def scan_match(jobs, skills, limit):
+    query = skill_index.skill_tokens(skills)
+    scored = []
+    for job in jobs:
+        tokens = skill_index.job_tokens(job)
+        if query & tokens:
+            scored.append((len(query & tokens) / len(query | tokens), -job['job_id']))
+    return [-negative_id for _, negative_id in heapq.nlargest(limit, scored)]
+
+
+def timed_ms(function, runs):
+    started = time.perf_counter()
+    for _ in range(runs):
+        result = function()
+    return (time.perf_counter() - started) / runs * 1000, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare skill index matching with a full scan')
+    parser.add_argument('--jobs', type=int, default=200000, help='Job rows in the feed')
+    parser.add_argument('--limit', type=int, default=10, help='Matches per query')
+    parser.add_argument('--runs', type=int, default=5, help='Runs per query')
+    parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        synthetic_feed.generate(workdir, args.jobs, companies=max(1, args.jobs // 10))
+        jobs = [{field: job.get(field) for field in skill_index.SKILL_PROJECTION if field != '_id'} for job in dt.iter_jobs(workdir)]
+
+    index = skill_index.SkillIndex(get_db=None)
+    tracemalloc.start()
+    build_seconds = time.perf_counter()
+    index._store(jobs)
+    build_seconds = time.perf_counter() - build_seconds
+    index_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    results = []
+    for skills in QUERIES:
+        index_ms, matches = timed_ms(lambda: index._match(skills, args.limit, 'jaccard', 1), args.runs)
+        scan_ms, scanned = timed_ms(lambda: scan_match(jobs, skills, args.limit), args.runs)
+        results.append({
+            'skills': skills,
+            'index_ms': round(index_ms, 2),
+            'scan_ms': round(scan_ms, 2),
+            'same_top_k': [job_id for job_id, _, _ in matches] == scanned
+        })
+
+    summary = {'build_seconds': round(build_seconds, 2), 'index_mb': round(index_bytes / 1e6, 1),
+               **index.stats(), 'queries': results}
+    print(json.dumps(summary, indent=None if args.json else 2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,95 @@
+'''Measure the overhead of the /metrics instrumentation (app/metrics.py)
+
+Times, in process (no mongod needed):
+  - request: a Flask request to a route returning a small JSON document through the
+    test client, with and without the metrics hooks; the difference is the per-request cost
+  - command: one CommandListener.succeeded() call with a 100-document find reply, the
+    cost added to every MongoDB command
+  - render: building the /metrics response after the requests above
+    python benchmarks/metrics_bench.py --requests 20000
+'''
+
+import argparse
+import json
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+from flask import Flask, jsonify, request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app import metrics, serialization
+
+
+def build_app(instrumented):
+    """
+    Returns:
+    Flask: An app with one /jobs/<job_id> route, with the metrics hooks when instrumented
+    """
+    app = Flask('metrics_bench')
+    serialization.init_app(app, 'orjson')
+
+    @app.route('/jobs/<job_id>')
+    def job(job_id):
+        return jsonify({'job_id': int(job_id), 'title': 'Data Engineer', 'average_salary': 95000.0}), 200
+
+    if instrumented:
+        def start():
+            metrics.start_request()
+
+        def record(response):
+            stats = metrics.current_request()
+            labels = (metrics.route_label(request.url_rule), request.method, response.status_code)
+            size = response.content_length
+            response.call_on_close(lambda: metrics.request_metrics.record(stats, *labels, size))
+            return response
+
+        metrics.time_serialization(app.json)
+        app.before_request(start)
+        app.after_request(record)
+    return app
+
+
+def time_requests(app, count):
+    client = app.test_client()
+    started = time.perf_counter()
+    for job_id in range(count):
+        client.get(f'/jobs/{job_id}').close()
+    return (time.perf_counter() - started) / count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure the metrics instrumentation overhead')
+    parser.add_argument('--requests', type=int, default=20000, help='Requests per run')
+    parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+    args = parser.parse_args(argv)
+
+    plain = time_requests(build_app(False), args.requests)
+    instrumented = time_requests(build_app(True), args.requests)
+
+    event = SimpleNamespace(duration_micros=850, command_name='find', reply={'cursor': {'firstBatch': [{}] * 100}})
+    metrics.start_request()
+    started = time.perf_counter()
+    for _ in range(args.requests):
+        metrics.command_metrics.succeeded(event)
+    command = (time.perf_counter() - started) / args.requests
+
+    started = time.perf_counter()
+    body = metrics.render()
+    render = time.perf_counter() - started
+
+    summary = {
+        'request_us': round(plain * 1e6, 1),
+        'instrumented_request_us': round(instrumented * 1e6, 1),
+        'overhead_per_request_us': round((instrumented - plain) * 1e6, 1),
+        'overhead_per_command_us': round(command * 1e6, 2),
+        'render_ms': round(render * 1000, 2),
+        'render_bytes': len(body)
+    }
+    print(json.dumps(summary, indent=None if args.json else 2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
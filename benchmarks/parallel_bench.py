@@ -0,0 +1,64 @@
+'''Scaling benchmark for the parallel ETL (data_transformation.py --workers)
+
+Generates one synthetic feed and transforms it to NDJSON with 1, 2, 4, ... worker
+processes, reporting the time and speedup of each run and checking that every run
+writes exactly the same jobs.ndjson as the serial one:
+    python benchmarks/parallel_bench.py --jobs 1000000 --workers 1,2,4,8
+'''
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+
+import etl_bench
+import synthetic_feed
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the parallel ETL across worker counts')
+    parser.add_argument('--jobs', type=int, default=1000000, help='Job rows in the feed')
+    parser.add_argument('--companies', type=int, default=100000, help='Company rows in the feed')
+    parser.add_argument('--workers', default=f'1,2,4,{os.cpu_count()}', help='Comma separated worker counts')
+    parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+    args = parser.parse_args(argv)
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        data_dir = os.path.join(workdir, 'feed')
+        synthetic_feed.generate(data_dir, args.jobs, args.companies)
+        serial_digest = None
+        for workers in sorted({int(value) for value in args.workers.split(',')}):
+            output_dir = os.path.join(workdir, f'out-{workers}')
+            os.makedirs(output_dir)
+            result = etl_bench.run_format(data_dir, output_dir, 'ndjson', ['--workers', str(workers)])
+            digest = file_digest(os.path.join(output_dir, 'jobs.ndjson'))
+            serial_digest = serial_digest or digest
+            result.update({
+                'workers': workers,
+                'jobs_per_sec': round(args.jobs / result['seconds']),
+                'speedup': round(results[0]['seconds'] / result['seconds'], 2) if results else 1.0,
+                'identical': digest == serial_digest
+            })
+            results.append(result)
+            if not args.json:
+                print(f"{workers:>4} workers{result['seconds']:>10} s{result['jobs_per_sec']:>12} jobs/s"
+                      f"  speedup {result['speedup']:>5}  peak RSS {result['peak_rss_mib']} MiB  identical {result['identical']}")
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    return 0 if all(result['identical'] for result in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,90 @@
+'''Compare the JSON and Parquet outputs of data_transformation.py
+
+Transforms one synthetic feed to both formats, then reports the size of jobs.json and
+jobs.parquet and the time to read them back (all columns, and only the two columns an
+analytics job might need). It is also the check of the Parquet round trip: every
+collection read back from Parquet must be identical to the JSON output, and the script
+exits with status 1 when one is not. Needs pyarrow.
+    python benchmarks/parquet_bench.py --jobs 1000000
+'''
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import synthetic_feed
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import data_transformation as dt
+
+PRUNED_COLUMNS = ['job_id', 'average_salary']
+
+
+def timed(function):
+    started = time.perf_counter()
+    result = function()
+    return result, round(time.perf_counter() - started, 3)
+
+
+def round_trip_matches(json_dir, parquet_dir):
+    """
+    Returns:
+    dict: Collection name -> whether the documents read from Parquet equal the JSON output
+    """
+    results = {}
+    for name in ('jobs', 'industries', 'companies'):
+        with open(os.path.join(json_dir, f'{name}.json'), encoding='utf-8') as f:
+            expected = json.load(f)
+        # Dates come back as datetimes; serialize them the way the JSON output does
+        actual = json.loads(json.dumps(list(dt.iter_parquet(os.path.join(parquet_dir, f'{name}.parquet'))), default=dt.datetime_serializer))
+        results[name] = actual == expected
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare the JSON and Parquet ETL outputs')
+    parser.add_argument('--jobs', type=int, default=100000, help='Job rows in the feed')
+    parser.add_argument('--companies', type=int, default=10000, help='Company rows in the feed')
+    parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        data_dir, json_dir, parquet_dir = (os.path.join(workdir, name) for name in ('feed', 'json', 'parquet'))
+        synthetic_feed.generate(data_dir, args.jobs, args.companies)
+        os.makedirs(json_dir)
+        os.makedirs(parquet_dir)
+        _, json_write = timed(lambda: dt.main(['--data-dir', data_dir, '--output-dir', json_dir]))
+        _, parquet_write = timed(lambda: dt.main(['--data-dir', data_dir, '--output-dir', parquet_dir, '--format', 'parquet']))
+
+        json_path = os.path.join(json_dir, 'jobs.json')
+        parquet_path = os.path.join(parquet_dir, 'jobs.parquet')
+
+        def load_json():
+            with open(json_path, encoding='utf-8') as f:
+                return len(json.load(f))
+
+        result = {
+            'jobs': args.jobs,
+            'json_mib': round(os.path.getsize(json_path) / 2 ** 20, 1),
+            'parquet_mib': round(os.path.getsize(parquet_path) / 2 ** 20, 1),
+            'json_write_seconds': json_write,
+            'parquet_write_seconds': parquet_write,
+            'json_read_seconds': timed(load_json)[1],
+            'parquet_read_seconds': timed(lambda: sum(1 for _ in dt.iter_parquet(parquet_path)))[1],
+            'parquet_pruned_read_seconds': timed(lambda: sum(1 for _ in dt.iter_parquet(parquet_path, columns=PRUNED_COLUMNS)))[1],
+            'round_trip': round_trip_matches(json_dir, parquet_dir),
+        }
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        for key, value in result.items():
+            print(f"{key:<30}{value}")
+    return 0 if all(result['round_trip'].values()) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,126 @@
+'''Measure /salary_stats latency from the in-memory salary columns
+
+Builds the salary column snapshot from a synthetic feed in process (no mongod needed)
+and times a few filtered and grouped requests. With --uri the feed is also loaded into a
+scratch database and the equivalent aggregation ($match, $group with $avg and
+$percentile, $bucket) is timed for comparison:
+    python benchmarks/salary_stats_bench.py --jobs 1000000 [--uri mongodb://localhost:27017/]
+'''
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+import synthetic_feed
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import data_transformation as dt
+from app import salary_columns
+
+# Requests run by the benchmark: everything, filtered, and grouped
+REQUESTS = [
+    {},
+    {'industry_name': 'Finance', 'remote': True},
+    {'experience_level': ['Mid Level', 'Senior Level'], 'bins': [0, 50000, 100000, 150000, 200000]},
+    {'group_by': 'industry_name'},
+]
+
+
+def aggregation_pipelines(filters, percentiles, edges, group_by):
+    """
+    The aggregations /salary_stats would need without the column store: one for the
+    summary statistics and one for the histogram.
+
+    Returns:
+    tuple: (statistics pipeline, histogram pipeline)
+    """
+    match = {'average_salary': {'$type': 'number'}}
+    for field, value in filters.items():
+        match[field] = value if field == 'remote' else {'$in': value}
+    stats = [
+        {'$match': match},
+        {'$group': {
+            '_id': f'${group_by}' if group_by else None,
+            'count': {'$sum': 1},
+            'mean': {'$avg': '$average_salary'},
+            'min': {'$min': '$average_salary'},
+            'max': {'$max': '$average_salary'},
+            'percentiles': {'$percentile': {'input': '$average_salary', 'p': [p / 100 for p in percentiles], 'method': 'approximate'}}
+        }}
+    ]
+    histogram = [
+        {'$match': match},
+        {'$bucket': {'groupBy': '$average_salary', 'boundaries': edges, 'default': 'other', 'output': {'count': {'$sum': 1}}}}
+    ]
+    return stats, histogram
+
+
+def timed_ms(function, runs):
+    values = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        function()
+        values.append((time.perf_counter() - started) * 1000)
+    values.sort()
+    return {'p50_ms': round(values[len(values) // 2], 2), 'max_ms': round(values[-1], 2)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure salary statistics latency')
+    parser.add_argument('--jobs', type=int, default=1000000, help='Job rows in the feed')
+    parser.add_argument('--runs', type=int, default=20, help='Runs per request')
+    parser.add_argument('--uri', help='Also time the aggregation on this mongod (uses a scratch database)')
+    parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        synthetic_feed.generate(workdir, args.jobs, companies=max(1, args.jobs // 10))
+        jobs = [{field: job.get(field) for field in salary_columns.COLUMN_PROJECTION if field != '_id'} for job in dt.iter_jobs(workdir)]
+
+        tracemalloc.start()
+        build_seconds = time.perf_counter()
+        snapshot = salary_columns.Snapshot.from_jobs(jobs)
+        build_seconds = time.perf_counter() - build_seconds
+        snapshot_bytes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        results = []
+        for body in REQUESTS:
+            filters, percentiles, bins, group_by = salary_columns.parse_request(body)
+            result = {'request': body, 'columns': timed_ms(lambda: salary_columns.salary_stats(snapshot, filters, percentiles, bins, group_by), args.runs)}
+            results.append((result, filters, percentiles, bins, group_by))
+
+        if args.uri:
+            from pymongo import MongoClient
+
+            client = MongoClient(args.uri)
+            db = client['careerhub_salary_bench']
+            try:
+                dt.load_into_mongo(db, {'jobs': dt.iter_jobs(workdir)})
+                for result, filters, percentiles, bins, group_by in results:
+                    salaries = snapshot.salaries[snapshot.mask(filters)]
+                    edges = bins if isinstance(bins, list) else np.histogram_bin_edges(salaries, bins=bins).tolist()
+                    stats, histogram = aggregation_pipelines(filters, percentiles, edges, group_by)
+                    result['aggregation'] = timed_ms(lambda: (list(db.jobs.aggregate(stats)), list(db.jobs.aggregate(histogram))), args.runs)
+            finally:
+                client.drop_database(db.name)
+                client.close()
+
+    summary = {
+        'jobs': int(len(snapshot.job_ids)),
+        'build_seconds': round(build_seconds, 2),
+        'snapshot_mb': round(snapshot_bytes / 1e6, 1),
+        'requests': [result for result, *_ in results]
+    }
+    print(json.dumps(summary, indent=None if args.json else 2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,150 @@
+'''Compare the denormalized and normalized job layouts (data_transformation.py --schema)
+
+Reports, for jobs built from a synthetic feed:
+  - document size: mean BSON bytes per job in each layout
+  - write amplification: bytes rewritten when one company's details change, for
+    companies with 1, 10 and 100 jobs (every job copy vs the one company document)
+  - read latency: time to decode a job with its company fields, either directly
+    (denormalized) or decoded and completed from the in-process company table (normalized)
+
+With --uri, both layouts are also loaded into a scratch database on that mongod and the
+real find_one latency and update_many cost are measured:
+    python benchmarks/schema_bench.py --jobs 100000 --uri mongodb://localhost:27017/
+'''
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import bson
+
+import synthetic_feed
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import data_transformation as dt
+from app import companies as company_fields
+
+COMPANY_FIELD_NAMES = list(company_fields.COMPANY_JOB_FIELDS)
+
+
+def build_layouts(data_dir):
+    _, industry_id_to_name = dt.read_lookups(data_dir)
+    companies = dt.read_companies(os.path.join(data_dir, dt.COMPANIES_CSV), industry_id_to_name)
+    denormalized = list(dt.iter_jobs(data_dir, dt.build_company_table(companies)))
+    normalized = [dt.normalize_job(dict(job)) for job in denormalized]
+    return denormalized, normalized, companies
+
+
+def mean_size(documents):
+    return statistics.mean(len(bson.encode(document)) for document in documents)
+
+
+def in_process_reads(denormalized, normalized, companies, samples):
+    """
+    Returns:
+    dict: Mean microseconds to produce one job with its company fields in each layout
+    """
+    table = {company['company_id']: company for company in companies}
+    denormalized_bson = [bson.encode(document) for document in denormalized[:samples]]
+    normalized_bson = [bson.encode(document) for document in normalized[:samples]]
+
+    started = time.perf_counter()
+    for encoded in denormalized_bson:
+        bson.decode(encoded)
+    denormalized_us = (time.perf_counter() - started) / len(denormalized_bson) * 1e6
+
+    started = time.perf_counter()
+    for encoded in normalized_bson:
+        company_fields.complete_jobs([bson.decode(encoded)], table, COMPANY_FIELD_NAMES)
+    normalized_us = (time.perf_counter() - started) / len(normalized_bson) * 1e6
+    return {'denormalized_us': round(denormalized_us, 2), 'normalized_us': round(normalized_us, 2)}
+
+
+def mongod_costs(uri, denormalized, normalized, companies, samples):
+    """
+    Load both layouts into a scratch database and time job reads and a company update.
+
+    Returns:
+    dict: find_one latency percentiles per layout and the documents touched by a company update
+    """
+    from pymongo import MongoClient
+
+    client = MongoClient(uri)
+    db = client['careerhub_schema_bench']
+    try:
+        client.drop_database(db.name)
+        db.jobs_denormalized.insert_many([dict(job) for job in denormalized], ordered=False)
+        db.jobs_normalized.insert_many([dict(job) for job in normalized], ordered=False)
+        db.companies.insert_many([dict(company) for company in companies], ordered=False)
+        for name in ('jobs_denormalized', 'jobs_normalized'):
+            db[name].create_index('job_id')
+            db[name].create_index('company_id')
+
+        table = company_fields.CompanyTable(lambda: db)
+        table.companies()
+        job_ids = [job['job_id'] for job in denormalized[:samples]]
+
+        def latencies(read):
+            values = []
+            for job_id in job_ids:
+                started = time.perf_counter()
+                read(job_id)
+                values.append((time.perf_counter() - started) * 1000)
+            values.sort()
+            return {'p50_ms': round(values[len(values) // 2], 3), 'p95_ms': round(values[int(len(values) * 0.95)], 3)}
+
+        result = {
+            'denormalized_read': latencies(lambda job_id: db.jobs_denormalized.find_one({'job_id': job_id}, {'_id': 0})),
+            'normalized_read': latencies(lambda job_id: company_fields.complete_jobs(
+                [db.jobs_normalized.find_one({'job_id': job_id}, {'_id': 0})], table.companies(), COMPANY_FIELD_NAMES)),
+        }
+
+        company_id = denormalized[0]['company_id']
+        update = {'$set': {'company_description': 'Updated description'}}
+        result['company_update_jobs_rewritten'] = db.jobs_denormalized.update_many({'company_id': company_id}, update).modified_count
+        result['company_update_normalized_documents'] = db.companies.update_one({'company_id': company_id}, {'$set': {'description': 'Updated description'}}).modified_count
+        return result
+    finally:
+        client.drop_database('careerhub_schema_bench')
+        client.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare the denormalized and normalized job layouts')
+    parser.add_argument('--jobs', type=int, default=20000, help='Job rows in the feed')
+    parser.add_argument('--samples', type=int, default=5000, help='Jobs read per latency measurement')
+    parser.add_argument('--uri', help='Also measure against this mongod (uses a scratch database)')
+    parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        synthetic_feed.generate(workdir, args.jobs)
+        denormalized, normalized, companies = build_layouts(workdir)
+
+    denormalized_size = mean_size(denormalized)
+    normalized_size = mean_size(normalized)
+    company_size = mean_size(companies)
+    result = {
+        'jobs': args.jobs,
+        'mean_job_bytes': {'denormalized': round(denormalized_size), 'normalized': round(normalized_size)},
+        'company_update_bytes_rewritten': {
+            f'{jobs_per_company}_jobs_per_company': {
+                'denormalized': round(jobs_per_company * denormalized_size),
+                'normalized': round(company_size)
+            } for jobs_per_company in (1, 10, 100)
+        },
+        'in_process_read': in_process_reads(denormalized, normalized, companies, args.samples),
+    }
+    if args.uri:
+        result['mongod'] = mongod_costs(args.uri, denormalized, normalized, companies, args.samples)
+
+    print(json.dumps(result, indent=None if args.json else 2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
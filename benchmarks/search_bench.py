@@ -0,0 +1,93 @@
+'''Measure /search latency on a large jobs collection
+
+Loads a synthetic feed into a scratch database on the mongod given by --uri, builds the
+declared indexes (including the weighted job_text index), then runs the search
+aggregation for a set of queries with and without filters and reports latency
+percentiles against the target:
+    python benchmarks/search_bench.py --uri mongodb://localhost:27017/ --jobs 1000000 --target-ms 250
+
+Exits with 1 if any query's p95 is above the target.
+'''
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+from pymongo import MongoClient
+
+import synthetic_feed
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import data_transformation as dt
+from app import search
+
+# Searches run by the benchmark: broad and narrow text, alone and with filters
+SEARCHES = [
+    {'q': 'data'},
+    {'q': 'machine learning engineer'},
+    {'q': 'python sql', 'remote': True},
+    {'q': 'stakeholders', 'min_salary': 80000, 'max_salary': 120000, 'experience_level': ['Mid Level', 'Senior Level']},
+    {'q': '"business analyst"', 'employment_type': 'Full-time', 'industry_name': 'Finance'},
+]
+
+
+def time_search(db, body, limit, runs):
+    """
+    Returns:
+    dict: Latency percentiles of the search aggregation and the number of matching jobs
+    """
+    pipeline, _ = search.search_pipeline(search.search_query(body), search.search_projection(None), limit)
+    values = []
+    result = {}
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = next(db.jobs.aggregate(pipeline), {})
+        values.append((time.perf_counter() - started) * 1000)
+    values.sort()
+    return {
+        'total_jobs': search.search_total(result),
+        'p50_ms': round(values[len(values) // 2], 2),
+        'p95_ms': round(values[min(len(values) - 1, int(len(values) * 0.95))], 2),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure full-text search latency')
+    parser.add_argument('--uri', required=True, help='mongod to run against (uses a scratch database)')
+    parser.add_argument('--jobs', type=int, default=1000000, help='Job rows in the feed')
+    parser.add_argument('--limit', type=int, default=100, help='Page size of each search')
+    parser.add_argument('--runs', type=int, default=20, help='Runs per search')
+    parser.add_argument('--target-ms', type=float, default=250, help='p95 latency target per search')
+    parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+    args = parser.parse_args(argv)
+
+    client = MongoClient(args.uri)
+    db = client['careerhub_search_bench']
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            synthetic_feed.generate(workdir, args.jobs, companies=max(1, args.jobs // 10))
+            started = time.perf_counter()
+            dt.load_into_mongo(db, {'jobs': dt.iter_jobs(workdir)})
+            load_seconds = time.perf_counter() - started
+
+        results = [dict(search=body, **time_search(db, body, args.limit, args.runs)) for body in SEARCHES]
+    finally:
+        client.drop_database(db.name)
+        client.close()
+
+    slow = [result for result in results if result['p95_ms'] > args.target_ms]
+    if args.json:
+        print(json.dumps({'jobs': args.jobs, 'load_seconds': round(load_seconds, 1), 'target_ms': args.target_ms, 'results': results}, indent=2))
+    else:
+        print(f"{args.jobs} jobs loaded and indexed in {load_seconds:.1f}s, target p95 {args.target_ms} ms\n")
+        print(f"{'matches':>10}{'p50 ms':>10}{'p95 ms':>10}  search")
+        for result in results:
+            print(f"{result['total_jobs']:>10}{result['p50_ms']:>10}{result['p95_ms']:>10}  {json.dumps(result['search'])}")
+    return 1 if slow else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,91 @@
+'''Compare the JSON encoders of the API responses (app/serialization.py)
+
+Encodes a listing response of --docs job documents from a synthetic feed (10^4 by default,
+with their datetime fields and an ObjectId _id) and reports the response size, the
+median time and the throughput in MB/s of:
+  - jsonify: Flask's default JSON provider (the json module), the previous path
+  - orjson: serialization.OrjsonProvider, used by both apps with CAREERHUB_JSON_BACKEND=orjson
+  - ndjson json / ndjson orjson: the streamed listings, one line per job
+  - raw bson: the documents as RawBSONDocument, converted with bson.json_util
+Flask's default provider cannot encode ObjectId, so the _id is left out of its input,
+as the routes do with their {"_id": 0} projection:
+    python benchmarks/serialization_bench.py --docs 10000 --runs 20
+'''
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import bson
+from bson import ObjectId, json_util
+from bson.raw_bson import RawBSONDocument
+from flask import Flask
+
+import synthetic_feed
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import data_transformation as dt
+from app import serialization, utils
+
+
+def build_documents(count):
+    """
+    Returns:
+    list: count job documents as the routes read them, each with an ObjectId _id
+    """
+    with tempfile.TemporaryDirectory() as workdir:
+        synthetic_feed.generate(workdir, count, companies=max(1, count // 10))
+        jobs = list(dt.iter_jobs(workdir))[:count]
+    return [{'_id': ObjectId(), **job} for job in jobs]
+
+
+def encoders(documents):
+    """
+    Returns:
+    dict: name -> function returning the encoded response body
+    """
+    flask_app = Flask('jsonify')
+    orjson_app = Flask('orjson')
+    serialization.init_app(orjson_app, 'orjson')
+    without_ids = [{key: value for key, value in document.items() if key != '_id'} for document in documents]
+    raw_documents = [RawBSONDocument(bson.encode(document)) for document in documents]
+    return {
+        'jsonify': lambda: flask_app.json.response({'jobs': without_ids}).get_data(),
+        'orjson': lambda: orjson_app.json.response({'jobs': documents}).get_data(),
+        'ndjson json': lambda: ''.join(json.dumps(document, default=utils.json_default) + '\n' for document in documents).encode('utf-8'),
+        'ndjson orjson': lambda: b''.join(serialization.dumps(document) + b'\n' for document in documents),
+        'raw bson': lambda: json_util.dumps({'jobs': raw_documents}, json_options=json_util.RELAXED_JSON_OPTIONS).encode('utf-8'),
+    }
+
+
+def measure(encode, runs):
+    body = encode()
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        encode()
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    median = timings[len(timings) // 2]
+    return {'bytes': len(body), 'p50_ms': round(median * 1000, 2), 'mb_per_second': round(len(body) / median / 1e6, 1)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare the JSON response encoders')
+    parser.add_argument('--docs', type=int, default=10000, help='Job documents per response')
+    parser.add_argument('--runs', type=int, default=20, help='Runs per encoder')
+    parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+    args = parser.parse_args(argv)
+
+    documents = build_documents(args.docs)
+    results = {name: measure(encode, args.runs) for name, encode in encoders(documents).items()}
+    summary = {'docs': len(documents), 'encoders': results}
+    print(json.dumps(summary, indent=None if args.json else 2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
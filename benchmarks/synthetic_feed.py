@@ -0,0 +1,80 @@
+'''Generate synthetic Career Hub csv feeds of any size for the ETL benchmarks
+
+Writes the five csvs data_transformation.py reads, with the same columns as mp2-data/:
+    python benchmarks/synthetic_feed.py /tmp/feed --jobs 1000000 --companies 100000
+'''
+
+import argparse
+import csv
+import os
+import random
+import sys
+
+TITLES = ['Data Scientist', 'Data Engineer', 'IT Consultant', 'Machine Learning Engineer', 'Business Analyst', 'Software Engineer']
+INDUSTRIES = ['Consulting', 'Finance', 'Tech', 'Healthcare', 'Retail', 'Energy']
+EMPLOYMENT_TYPES = ['Full-time', 'Part-time', 'Contract', 'Internship']
+EDUCATION = ["High School Diploma", "Bachelor's Degree", "Master's Degree", 'PhD']
+SKILLS = ['Python', 'SQL', 'Spark', 'Tableau', 'R', 'Go', 'AWS', 'Docker']
+BENEFITS = ['Dental insurance', 'Health insurance', 'Paid time off', 'Parental leave', 'Retirement plan', 'Gym membership']
+SENTENCES = ['Collaborate closely with cross-functional teams and stakeholders.',
+             'Develop and implement state-of-the-art data analysis tools and methods.',
+             'Present findings and insights to non-technical stakeholders.',
+             'Analyze and interpret complex datasets to inform business decision-making.']
+
+
+def generate(directory, jobs, companies=None, industries=100, seed=0):
+    """
+    Write companies.csv, industry_info.csv, jobs.csv, employment_details.csv and
+    education_and_skills.csv with jobs rows (and companies rows, default one per job).
+    """
+    rng = random.Random(seed)
+    companies = jobs if companies is None else companies
+    os.makedirs(directory, exist_ok=True)
+
+    def writer(name, header):
+        f = open(os.path.join(directory, name), 'w', encoding='utf-8', newline='')
+        w = csv.writer(f)
+        w.writerow(header)
+        return f, w
+
+    f, w = writer('industry_info.csv', ['id', 'industry_name', 'growth_rate', 'industry_skills', 'top_companies', 'trends'])
+    with f:
+        for i in range(1, industries + 1):
+            w.writerow([i, INDUSTRIES[i % len(INDUSTRIES)], round(rng.random() / 10, 2), ', '.join(rng.sample(SKILLS, 3)),
+                        'Deloitte, PwC, EY', 'AI Strategy, Remote Work'])
+
+    f, w = writer('companies.csv', ['id', 'name', 'size', 'type', 'location', 'website', 'description', 'hr_contact'])
+    with f:
+        for i in range(1, companies + 1):
+            w.writerow([i, f'Company {i}', rng.choice(['1-10', '11-50', '51-200']), rng.choice(['Startup', 'Enterprise']),
+                        'Seattle, WA', f'https://company{i}.com', f'Company {i} is a leading firm.', f'hr@company{i}.com'])
+
+    jobs_file, jobs_writer = writer('jobs.csv', ['id', 'title', 'description', 'years_of_experience', 'detailed_description', 'responsibilities', 'requirements'])
+    emp_file, emp_writer = writer('employment_details.csv', ['id', 'employment_type', 'average_salary', 'benefits', 'remote', 'job_posting_url', 'posting_date', 'closing_date'])
+    edu_file, edu_writer = writer('education_and_skills.csv', ['id', 'required_education', 'preferred_skills', 'job_id'])
+    with jobs_file, emp_file, edu_file:
+        for i in range(1, jobs + 1):
+            title = rng.choice(TITLES)
+            jobs_writer.writerow([i, title, rng.choice(SENTENCES), rng.randint(0, 10),
+                                  f'The role of a {title} at our firm involves data work.',
+                                  ', '.join(rng.sample(SENTENCES, 2)), 'Strong analytical skills., Proficiency in Python and SQL.'])
+            month = rng.randint(1, 9)
+            emp_writer.writerow([i, rng.choice(EMPLOYMENT_TYPES), rng.randint(40000, 200000), ', '.join(rng.sample(BENEFITS, 3)),
+                                 rng.choice(['True', 'False']), f'https://jobs.example.com/job-{i}',
+                                 f'2023-0{month}-{rng.randint(10, 28)}', f'2023-1{rng.randint(0, 2)}-{rng.randint(10, 28)}'])
+            edu_writer.writerow([i, rng.choice(EDUCATION), ', '.join(rng.sample(SKILLS, 3)), i])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate synthetic Career Hub csv feeds')
+    parser.add_argument('directory', help='Directory the csvs are written to')
+    parser.add_argument('--jobs', type=int, default=100000, help='Number of job rows')
+    parser.add_argument('--companies', type=int, help='Number of company rows (default: one per job)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed')
+    args = parser.parse_args(argv)
+    generate(args.directory, args.jobs, args.companies, seed=args.seed)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,22 +1,58 @@
-# This script assumes that the same row in each csv correspond to the same job. 
+# This script assumes that the same row in each csv correspond to the same job.
+#
+# Usage:
+#   python data_transformation.py                  # jobs.json, industries.json and companies.json (for mongoimport --jsonArray)
+#   python data_transformation.py --format ndjson  # stream jobs.ndjson row by row (for mongoimport without --jsonArray)
+#   python data_transformation.py --format mongo --swap  # load straight into the careerhub database
+#   python data_transformation.py --format mongo --incremental  # write only what changed since the last load
+#   python data_transformation.py --format ndjson --workers 8      # parse and join jobs in 8 processes
+#   python data_transformation.py --format parquet                 # typed, compressed columnar files (needs pyarrow)
+#   python data_transformation.py --input parquet --data-dir . --format mongo  # load from those files
+#
+# The ndjson format never holds the jobs in memory: jobs.csv is read one row at a time
+# and joined against lookup tables, so memory depends on the lookup tables, not on the
+# number of jobs.
 
+import argparse
 import csv
+import hashlib
+import io
 import json
+import multiprocessing
+import os
+import sys
 import pymongo
 from datetime import datetime
 from collections import defaultdict
 
-# Importing Data 
-companies_csv = 'mp2-data/companies.csv'
-industries_csv = 'mp2-data/industry_info.csv'
-jobs_csv = 'mp2-data/jobs.csv'
-education_skills_csv = 'mp2-data/education_and_skills.csv'
-employment_details_csv = 'mp2-data/employment_details.csv'
+# Importing Data
+DATA_DIR = 'mp2-data'
+COMPANIES_CSV = 'companies.csv'
+INDUSTRIES_CSV = 'industry_info.csv'
+JOBS_CSV = 'jobs.csv'
+EDUCATION_SKILLS_CSV = 'education_and_skills.csv'
+EMPLOYMENT_DETAILS_CSV = 'employment_details.csv'
 
-# Initialize data structures for new schema
-jobs = []
-companies = []
-industries = []
+# Collections are loaded under this suffix and renamed into place by --swap
+STAGING_SUFFIX = '_staging'
+DEFAULT_BATCH_SIZE = 1000
+
+# Rows per Parquet row group (and per batch read back)
+PARQUET_ROW_GROUP_SIZE = 100000
+
+# Records per chunk handed to a worker process by --workers
+DEFAULT_CHUNK_ROWS = 20000
+
+# Fingerprints of the documents written by the last load, read by --incremental
+MANIFEST_FILE = 'etl_manifest.json'
+# The field (and its type) that identifies a document of each collection between loads
+COLLECTION_KEYS = {'jobs': ('job_id', int), 'companies': ('company_id', int), 'industries': ('industry_name', str)}
+
+COMPANY_FIELDS = ["company_id", "company_name", "company_size", "company_type", "company_location",
+                  "company_website", "company_description", "company_hr_contact", "industry_name"]
+# Left out of jobs by --schema normalized; the API reads them from the companies collection
+# (company_id, company_name and industry_name stay, the routes filter and group on them)
+NORMALIZED_DROPPED_FIELDS = COMPANY_FIELDS[2:8]
 
 def get_experience_level(years):
     if years < 2:
@@ -30,10 +66,15 @@ def get_experience_level(years):
 def parse_list_string(s):
     return [item.strip() for item in s.strip('"').split(',') if item.strip()]
 
-# Read and process industries data
-with open(industries_csv, mode='r', encoding='utf-8-sig') as file:
-    reader = csv.DictReader(file)
-    for row in reader:
+def read_csv(path):
+    with open(path, mode='r', encoding='utf-8-sig') as file:
+        yield from csv.DictReader(file)
+
+# Read and process industries data, along with the industry id -> name map, in one pass
+def read_industries(path):
+    industries = []
+    industry_id_to_name = {}
+    for row in read_csv(path):
         industry = {
             "industry_name": row['industry_name'],
             "growth_rate": float(row['growth_rate']),
@@ -42,15 +83,16 @@ with open(industries_csv, mode='r', encoding='utf-8-sig') as file:
             "trends": parse_list_string(row['trends'])
         }
         industries.append(industry)
+        industry_id_to_name[int(row['id'])] = row['industry_name']
+    return industries, industry_id_to_name
 
-
-
-# Reaing in company data 
-with open(companies_csv, mode='r', encoding='utf-8-sig') as file:
-    reader = csv.DictReader(file)
-    for row in reader:
+# Reading in company data, with the industry_name of the industry with the same id
+def read_companies(path, industry_id_to_name):
+    companies = []
+    for row in read_csv(path):
+        company_id = int(row['id'])
         company = {
-            "company_id": int(row['id']),
+            "company_id": company_id,
             "name": row['name'],
             "size": row['size'],
             "type": row['type'],
@@ -58,135 +100,371 @@ with open(companies_csv, mode='r', encoding='utf-8-sig') as file:
             "website": row['website'],
             "description": row['description'],
             "hr_contact": row['hr_contact'],
-            "industry_name": ""  # Will be updated later
+            "industry_name": industry_id_to_name.get(company_id, "Unknown")
         }
         companies.append(company)
-    
+    return companies
 
-# Mapping industry id to industry name
-industry_id_to_name = {}
-with open(industries_csv, mode='r', encoding='utf-8-sig') as file:
-    reader = csv.DictReader(file)
-    for row in reader:
-        industry_id_to_name[int(row['id'])] = row['industry_name']
+class KeyedTable:
+    """
+    Lookup table from an integer id to a value, built in a single pass over a csv.
 
-# Update company industry_name based on the ID
-for company in companies:
-    company_id = company['company_id']
-    if company_id in industry_id_to_name:
-        company['industry_name'] = industry_id_to_name[company_id]
-    else:
-        company['industry_name'] = "Unknown"
-
-# Read in education and skills 
-education_skills = {}
-with open(education_skills_csv, mode='r', encoding='utf-8-sig') as file:
-    reader = csv.DictReader(file)
-    for row in reader:
-        education_skills[int(row['job_id'])] = {
-            "required_education": row['required_education'],
-            "preferred_skills": parse_list_string(row['preferred_skills'])}
-
-
-# Read employment details
-employment_details = {}
-with open(employment_details_csv, mode='r', encoding='utf-8-sig') as file:
-    reader = csv.DictReader(file)
-    for row in reader:
-        employment_details[int(row['id'])] = {
-            "employment_type": row['employment_type'],
-            "average_salary": float(row['average_salary']),
-            "benefits": parse_list_string(row['benefits']),
-            "remote": row['remote'] == 'True',
-            "job_posting_url": row['job_posting_url'],
-            "posting_date": row['posting_date'],
-            "closing_date": row['closing_date']
+    The ids in the feeds run 1, 2, 3, ..., so values are kept in a list indexed by id,
+    which is smaller than a dict and just as fast to look up. The first id out of that
+    sequence (a gap, a repeat or a reordering) switches the table to a dict. As with a
+    dict, the last value added for an id wins.
+    """
+
+    def __init__(self, items=()):
+        self.values = []
+        self.by_id = None
+        for key, value in items:
+            self.add(key, value)
+
+    def add(self, key, value):
+        if self.by_id is None:
+            if key == len(self.values) + 1:
+                self.values.append(value)
+                return
+            self.by_id = dict(enumerate(self.values, 1))
+            self.values = []
+        self.by_id[key] = value
+
+    def get(self, key, default=None):
+        if self.by_id is not None:
+            return self.by_id.get(key, default)
+        return self.values[key - 1] if 0 < key <= len(self.values) else default
+
+    def __len__(self):
+        return len(self.by_id) if self.by_id is not None else len(self.values)
+
+def company_fields(company):
+    """
+    The company fields copied into each job document, in COMPANY_FIELDS order.
+    """
+    return (company['company_id'], company['name'], company['size'], company['type'], company['location'],
+            company['website'], company['description'], company['hr_contact'], company['industry_name'])
+
+def education_fields(row):
+    return {
+        "required_education": row['required_education'],
+        "preferred_skills": parse_list_string(row['preferred_skills'])}
+
+def employment_fields(row):
+    return {
+        "employment_type": row['employment_type'],
+        "average_salary": float(row['average_salary']),
+        "benefits": parse_list_string(row['benefits']),
+        "remote": row['remote'] == 'True',
+        "job_posting_url": row['job_posting_url'],
+        "posting_date": row['posting_date'],
+        "closing_date": row['closing_date']
+    }
+
+def build_job(row, emp_details, edu_skills, company):
+    """
+    Join a jobs.csv row with its employment details, education and skills, and the
+    company fields (a COMPANY_FIELDS tuple, or None if there is no company).
+    """
+    job_id = int(row['id'])
+    years_of_experience = int(row['years_of_experience'])
+    job = {
+        "job_id": job_id,
+        "title": row['title'],
+        "description": row['description'],
+        "detailed_description": row['detailed_description'],
+        "responsibilities": parse_list_string(row['responsibilities']),
+        "requirements": parse_list_string(row['requirements']),
+        "years_of_experience": years_of_experience,
+        "experience_level": get_experience_level(years_of_experience),
+        "employment_type": emp_details.get('employment_type', ''),
+        "average_salary": emp_details.get('average_salary'),
+        "benefits": emp_details.get('benefits', []),
+        "remote": emp_details.get('remote', False),
+        "job_posting_url": emp_details.get('job_posting_url', ''),
+        "posting_date": datetime.strptime(emp_details.get('posting_date', ''), '%Y-%m-%d') if emp_details.get('posting_date') else None,
+        "closing_date": datetime.strptime(emp_details.get('closing_date', ''), '%Y-%m-%d') if emp_details.get('closing_date') else None,
+        "required_education": edu_skills.get('required_education', ''),
+        "preferred_skills": edu_skills.get('preferred_skills', []),
+    }
+    job.update(zip(COMPANY_FIELDS, company or (None,) * len(COMPANY_FIELDS)))
+    return job
+
+def normalize_job(job):
+    for field in NORMALIZED_DROPPED_FIELDS:
+        job.pop(field, None)
+    return job
+
+# Condense industry info to a data structure that contains information about each unique industry
+def combine_industries(industries):
+    combined_industry_data = defaultdict(lambda: {
+        "growth_rates": [],
+        "industry_skills": set(),
+        "top_companies": set(),
+        "trends": set()
+    })
+
+    for industry in industries:
+        name = industry['industry_name']
+        combined_industry_data[name]["growth_rates"].append(industry['growth_rate'])
+        combined_industry_data[name]["industry_skills"].update(industry['industry_skills'])
+        combined_industry_data[name]["top_companies"].update(industry['top_companies'])
+        combined_industry_data[name]["trends"].update(industry['trends'])
+
+    return [
+        {
+            "industry_name": name,
+            "growth_rates": data["growth_rates"],
+            # Sorted, so the same csvs always give the same documents (and fingerprints)
+            "industry_skills": sorted(data["industry_skills"]),
+            "top_companies": sorted(data["top_companies"]),
+            "trends": sorted(data["trends"])
         }
+        for name, data in combined_industry_data.items()
+    ]
 
-# Read and process jobs data and populate it with information from other files 
-with open(jobs_csv, mode='r', encoding='utf-8-sig') as file:
-    reader = csv.DictReader(file)
-    for row in reader:
+def read_lookups(data_dir):
+    """
+    Returns:
+    tuple: (industry documents, industry id -> name map), from one read of industry_info.csv
+    """
+    return read_industries(os.path.join(data_dir, INDUSTRIES_CSV))
+
+def build_company_table(companies):
+    """
+    Returns:
+    KeyedTable: Company id -> company fields tuple (see company_fields)
+    """
+    return KeyedTable((company['company_id'], company_fields(company)) for company in companies)
+
+def transform(data_dir, workers=1):
+    """
+    Build the jobs, industries and companies collections in memory.
+
+    Returns:
+    tuple: (jobs, industries, companies) lists of documents
+    """
+    industries, industry_id_to_name = read_lookups(data_dir)
+    companies = read_companies(os.path.join(data_dir, COMPANIES_CSV), industry_id_to_name)
+    company_table = build_company_table(companies)
+
+    if workers > 1:
+        return list(iter_jobs(data_dir, company_table, workers=workers)), combine_industries(industries), companies
+
+    # Read in education and skills
+    education_skills = KeyedTable(
+        (int(row['job_id']), education_fields(row)) for row in read_csv(os.path.join(data_dir, EDUCATION_SKILLS_CSV))
+    )
+
+    # Read employment details
+    employment_details = KeyedTable(
+        (int(row['id']), employment_fields(row)) for row in read_csv(os.path.join(data_dir, EMPLOYMENT_DETAILS_CSV))
+    )
+
+    # Read and process jobs data and populate it with information from other files
+    jobs = []
+    for row in read_csv(os.path.join(data_dir, JOBS_CSV)):
         job_id = int(row['id'])
-        years_of_experience = int(row['years_of_experience'])
-        company = next((c for c in companies if c['company_id'] == job_id), None)
-        emp_details = employment_details.get(job_id, {})
-        edu_skills = education_skills.get(job_id, {})
-
-        job = {
-            "job_id": job_id,
-            "title": row['title'],
-            "description": row['description'],
-            "detailed_description": row['detailed_description'],
-            "responsibilities": parse_list_string(row['responsibilities']),
-            "requirements": parse_list_string(row['requirements']),
-            "years_of_experience": years_of_experience,
-            "experience_level": get_experience_level(years_of_experience),
-            "employment_type": emp_details.get('employment_type', ''),
-            "average_salary": emp_details.get('average_salary'),
-            "benefits": emp_details.get('benefits', []),
-            "remote": emp_details.get('remote', False),
-            "job_posting_url": emp_details.get('job_posting_url', ''),
-            "posting_date": datetime.strptime(emp_details.get('posting_date', ''), '%Y-%m-%d') if emp_details.get('posting_date') else None,
-            "closing_date": datetime.strptime(emp_details.get('closing_date', ''), '%Y-%m-%d') if emp_details.get('closing_date') else None,
-            "required_education": edu_skills.get('required_education', ''),
-            "preferred_skills": edu_skills.get('preferred_skills', []),
-        }
-        if company:
-            job.update({
-                "company_id": company['company_id'],
-                "company_name": company['name'],
-                "company_size": company['size'],
-                "company_type": company['type'],
-                "company_location": company['location'],
-                "company_website": company['website'],
-                "company_description": company['description'],
-                "company_hr_contact": company['hr_contact'],
-                "industry_name": company['industry_name']
-            })
-        else:
-            job.update({
-                "company_id": None,
-                "company_name": None,
-                "company_size": None,
-                "company_type": None,
-                "company_location": None,
-                "company_website": None,
-                "company_description": None,
-                "company_hr_contact": None,
-                "industry_name": None
-            })
-            
-        jobs.append(job)
-
-
-# Condense industry info to a data structure that contains information about each unique industry 
-combined_industry_data = defaultdict(lambda: {
-    "growth_rates": [],
-    "industry_skills": set(),
-    "top_companies": set(),
-    "trends": set()
-})
-
-for industry in industries:
-    name = industry['industry_name']
-    combined_industry_data[name]["growth_rates"].append(industry['growth_rate'])
-    combined_industry_data [name]["industry_skills"].update(industry['industry_skills'])
-    combined_industry_data[name]["top_companies"].update(industry['top_companies'])
-    combined_industry_data [name]["trends"].update(industry['trends'])
-
-combined_industry = [
-    {
-        "industry_name": name,
-        "growth_rates": data["growth_rates"],
-        "industry_skills": list(data["industry_skills"]),
-        "top_companies": list(data["top_companies"]),
-        "trends": list(data["trends"])
-    }
-    for name, data in combined_industry_data.items()
-]
+        jobs.append(build_job(
+            row,
+            employment_details.get(job_id, {}),
+            education_skills.get(job_id, {}),
+            company_table.get(job_id)
+        ))
+
+    return jobs, combine_industries(industries), companies
+
+
+class AlignedLookup:
+    """
+    Rows of a CSV keyed by job id, read in step with jobs.csv.
+
+    Since the csvs list the same jobs in the same order, the row for a job is nearly
+    always the next unread row, so nothing has to be kept in memory. Rows read past
+    while looking for a job id (out of order rows) are kept until they are asked for.
+    Each key is expected to appear once per file.
+    """
+
+    def __init__(self, rows, key, parse):
+        self.rows = rows
+        self.key = key
+        self.parse = parse
+        self.pending = {}
+
+    def get(self, job_id):
+        row = self.pending.pop(job_id, None)
+        if row is not None:
+            return self.parse(row)
+        for row in self.rows:
+            row_id = int(row[self.key])
+            if row_id == job_id:
+                return self.parse(row)
+            self.pending[row_id] = row
+        return {}
+
+def iter_jobs(data_dir, company_table=None, workers=1):
+    """
+    Join jobs.csv one row at a time against the company table and the aligned
+    employment details and education and skills csvs, in this process or, with
+    workers > 1, in a pool of worker processes.
+
+    Returns:
+    generator: The job documents, in jobs.csv order
+    """
+    if company_table is None:
+        _, industry_id_to_name = read_lookups(data_dir)
+        company_table = build_company_table(read_companies(os.path.join(data_dir, COMPANIES_CSV), industry_id_to_name))
+
+    if workers > 1:
+        for documents in iter_job_chunks(data_dir, company_table, workers):
+            yield from documents
+        return
+
+    employment_details = AlignedLookup(read_csv(os.path.join(data_dir, EMPLOYMENT_DETAILS_CSV)), 'id', employment_fields)
+    education_skills = AlignedLookup(read_csv(os.path.join(data_dir, EDUCATION_SKILLS_CSV)), 'job_id', education_fields)
+
+    for row in read_csv(os.path.join(data_dir, JOBS_CSV)):
+        job_id = int(row['id'])
+        yield build_job(row, employment_details.get(job_id), education_skills.get(job_id), company_table.get(job_id))
+
+# Parallel parsing: jobs.csv and the two csvs aligned with it are cut into chunks of the
+# same records, and each chunk is parsed and joined in a worker process
+
+def record_offsets(path, every):
+    """
+    Find the byte offset after the header and after every `every`-th record of a csv.
+
+    A line ends a record only when the quotes seen so far are balanced, so newlines
+    inside quoted fields never split a record. Blank lines are not counted as records,
+    as csv.DictReader skips them.
+
+    Returns:
+    tuple: (list of offsets, ending with the end of the file, number of records)
+    """
+    offsets = []
+    position = 0
+    records = 0
+    in_quotes = False
+    with open(path, 'rb') as f:
+        for line in f:
+            position += len(line)
+            if line.count(b'"') % 2:
+                in_quotes = not in_quotes
+            if in_quotes:
+                continue
+            if not offsets:
+                offsets.append(position)
+            elif line.strip():
+                records += 1
+                if records % every == 0:
+                    offsets.append(position)
+    if not offsets or offsets[-1] != position:
+        offsets.append(position)
+    return offsets, records
+
+def read_fieldnames(path, header_end):
+    with open(path, 'rb') as f:
+        header = f.read(header_end).decode('utf-8-sig')
+    return next(csv.reader(io.StringIO(header, newline=None)))
+
+def read_csv_range(path, start, end, fieldnames):
+    """
+    Parse the records between two offsets from record_offsets, exactly as read_csv
+    would (including its newline translation).
+    """
+    with open(path, 'rb') as f:
+        f.seek(start)
+        text = f.read(end - start).decode('utf-8')
+    return csv.DictReader(io.StringIO(text, newline=None), fieldnames=fieldnames)
+
+def ndjson_line(document):
+    return json.dumps(document, ensure_ascii=False, separators=(',', ':'), default=datetime_serializer) + '\n'
+
+def normalized_ndjson_line(document):
+    return ndjson_line(normalize_job(document))
+
+# Read-only tables of a worker process, set by _init_worker (inherited, not copied, with fork)
+_worker_company_table = None
+
+def _init_worker(company_table):
+    global _worker_company_table
+    _worker_company_table = company_table
+
+def join_chunk(task):
+    """
+    Parse and join one chunk in a worker process.
+
+    Returns:
+    list: The job documents (passed through encode when it is set), or None when a job's
+    employment details or education and skills row is not in the same chunk
+    """
+    ranges, encode = task
+    jobs_range, employment_range, education_range = ranges
+    employment_details = AlignedLookup(read_csv_range(*employment_range), 'id', employment_fields)
+    education_skills = AlignedLookup(read_csv_range(*education_range), 'job_id', education_fields)
+
+    documents = []
+    for row in read_csv_range(*jobs_range):
+        job_id = int(row['id'])
+        emp_details = employment_details.get(job_id)
+        edu_skills = education_skills.get(job_id)
+        if not emp_details or not edu_skills:
+            return None
+        job = build_job(row, emp_details, edu_skills, _worker_company_table.get(job_id))
+        documents.append(encode(job) if encode else job)
+
+    if employment_details.pending or education_skills.pending:
+        return None
+    return documents
+
+def iter_job_chunks(data_dir, company_table, workers, encode=None, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Parse and join jobs.csv in a pool of worker processes, chunk_rows records at a time.
+
+    The chunks cover the same records of jobs.csv, employment_details.csv and
+    education_and_skills.csv, and results are returned in jobs.csv order, so the jobs
+    are the same as iter_jobs gives serially. A chunk whose rows are not aligned across
+    the csvs is joined again in this process against full tables; if the csvs do not
+    have the same number of records, the whole join runs serially.
 
-# Save dictionarys as json files 
+    Returns:
+    generator: Lists of job documents (passed through encode, a module level function
+    so it can be sent to the workers, when it is set), in order
+    """
+    paths = [os.path.join(data_dir, name) for name in (JOBS_CSV, EMPLOYMENT_DETAILS_CSV, EDUCATION_SKILLS_CSV)]
+    scans = [record_offsets(path, chunk_rows) for path in paths]
+
+    if len({records for _, records in scans}) != 1:
+        documents = iter_jobs(data_dir, company_table)
+        for batch in chunks(documents, chunk_rows):
+            yield [encode(job) for job in batch] if encode else batch
+        return
+
+    fieldnames = [read_fieldnames(path, offsets[0]) for path, (offsets, _) in zip(paths, scans)]
+    tasks = []
+    for chunk in range(len(scans[0][0]) - 1):
+        ranges = tuple((path, offsets[chunk], offsets[chunk + 1], names) for path, (offsets, _), names in zip(paths, scans, fieldnames))
+        tasks.append((ranges, encode))
+
+    # fork shares the tables with the workers; other start methods copy them once per worker
+    context = multiprocessing.get_context('fork') if 'fork' in multiprocessing.get_all_start_methods() else multiprocessing.get_context()
+    full_tables = None
+    with context.Pool(workers, initializer=_init_worker, initargs=(company_table,)) as pool:
+        for task, documents in zip(tasks, pool.imap(join_chunk, tasks)):
+            if documents is None:
+                if full_tables is None:
+                    full_tables = (
+                        KeyedTable((int(row['id']), employment_fields(row)) for row in read_csv(paths[1])),
+                        KeyedTable((int(row['job_id']), education_fields(row)) for row in read_csv(paths[2]))
+                    )
+                documents = []
+                for row in read_csv_range(*task[0][0]):
+                    job_id = int(row['id'])
+                    job = build_job(row, full_tables[0].get(job_id, {}), full_tables[1].get(job_id, {}), company_table.get(job_id))
+                    documents.append(encode(job) if encode else job)
+            yield documents
+
+# Save dictionarys as json files
 
 def datetime_serializer(obj):
     if isinstance(obj, datetime):
@@ -197,8 +475,380 @@ def save_as_json(data, filename):
     with open(filename, 'w', encoding='utf-8') as f:
         json.dump(data, f, ensure_ascii=False, indent=2, default=datetime_serializer)
 
-save_as_json(jobs, 'jobs.json')
-save_as_json(combined_industry, 'industries.json')
-save_as_json(companies, 'companies.json')
+def save_as_ndjson(documents, filename):
+    """
+    Write documents one per line as they are produced.
+
+    Returns:
+    int: The number of documents written
+    """
+    count = 0
+    with open(filename, 'w', encoding='utf-8') as f:
+        for document in documents:
+            f.write(ndjson_line(document))
+            count += 1
+    return count
+
+def save_lines(line_chunks, filename):
+    """
+    Write lists of already encoded NDJSON lines, eg. from iter_job_chunks.
+
+    Returns:
+    int: The number of lines written
+    """
+    count = 0
+    with open(filename, 'w', encoding='utf-8') as f:
+        for lines in line_chunks:
+            f.writelines(lines)
+            count += len(lines)
+    return count
+
+# Load the collections straight into MongoDB
+
+def chunks(documents, size):
+    batch = []
+    for document in documents:
+        batch.append(document)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def insert_in_batches(collection, documents, batch_size):
+    """
+    Insert documents with unordered insert_many calls of batch_size documents, so the
+    server can apply each batch without stopping at the first error.
+
+    Returns:
+    int: The number of documents inserted
+    """
+    count = 0
+    for batch in chunks(documents, batch_size):
+        count += len(collection.insert_many(batch, ordered=False).inserted_ids)
+    return count
+
+def load_into_mongo(db, collections, batch_size=DEFAULT_BATCH_SIZE, swap=False):
+    """
+    Replace each collection with the given documents.
+
+    Each collection is dropped and loaded without indexes, and the indexes declared in
+    app/indexes.py are built once the data is in, which is much faster than updating
+    them on every insert. With swap, the data is loaded and indexed in
+    '<collection>_staging' and then renamed over the live collection, so the API keeps
+    serving the previous dataset until the new one is complete. Each rename is atomic,
+    but the collections are swapped one after another.
+
+    Returns:
+    dict: The number of documents loaded per collection
+    """
+    from app.indexes import ensure_indexes
+
+    suffix = STAGING_SUFFIX if swap else ''
+    counts = {}
+    for name, documents in collections.items():
+        target = db[name + suffix]
+        target.drop()
+        counts[name] = insert_in_batches(target, documents, batch_size)
+
+    failed = [entry for entry in ensure_indexes(db, collections=list(collections), suffix=suffix) if entry['action'] == 'failed']
+    if failed:
+        # Eg. duplicate job ids; never swap in a dataset the API cannot index
+        raise RuntimeError(f"Could not build indexes: {failed}")
+
+    if swap:
+        for name in collections:
+            db[name + suffix].rename(name, dropTarget=True)
+
+    if 'jobs' in collections:
+        raise_job_id_counter(db)
+
+    return counts
+
+def raise_job_id_counter(db):
+    """
+    Keep the API's job_id counter ahead of the loaded job ids.
+    """
+    from app.utils import JobIdAllocator
+
+    highest_job = db.jobs.find_one({}, sort=[("job_id", -1)], projection={"job_id": 1})
+    if highest_job:
+        db.counters.update_one({"_id": JobIdAllocator.counter_id}, {"$max": {"seq": highest_job['job_id']}}, upsert=True)
+
+# Incremental loads: only the documents that changed since the last load are written
+
+def fingerprint(document):
+    """
+    Hash of a transformed document. Any change to its source rows (the jobs.csv,
+    employment details and education and skills rows, and the company) changes it.
+
+    Returns:
+    str: The hex digest
+    """
+    encoded = json.dumps(document, sort_keys=True, ensure_ascii=False, separators=(',', ':'), default=datetime_serializer)
+    return hashlib.blake2b(encoded.encode('utf-8'), digest_size=12).hexdigest()
+
+def fingerprinted(documents, key, fingerprints):
+    """
+    Yield documents unchanged, recording each one's fingerprint by key.
+    """
+    for document in documents:
+        fingerprints[str(document[key])] = fingerprint(document)
+        yield document
+
+def delta_operations(documents, key, key_type, previous, fingerprints, counts):
+    """
+    Compare documents with the fingerprints of the previous load and yield the writes
+    that bring the collection up to date: an upsert for each new or changed document
+    and a delete for each document that is no longer in the feed. previous is consumed.
+    """
+    for document in documents:
+        document_key = str(document[key])
+        new_fingerprint = fingerprints[document_key] = fingerprint(document)
+        old_fingerprint = previous.pop(document_key, None)
+        if old_fingerprint == new_fingerprint:
+            counts['unchanged'] += 1
+            continue
+        counts['inserted' if old_fingerprint is None else 'updated'] += 1
+        yield pymongo.ReplaceOne({key: document[key]}, document, upsert=True)
+
+    for document_key in previous:
+        counts['deleted'] += 1
+        yield pymongo.DeleteOne({key: key_type(document_key)})
+
+def sync_into_mongo(db, collections, previous, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Apply the changes since the previous load to each collection with unordered
+    bulk_write batches of upserts (keyed on COLLECTION_KEYS) and deletes, so a refresh
+    costs O(changes) writes. Documents the ETL never loaded (eg. jobs created through
+    the API) are left alone.
+
+    Returns:
+    tuple: (per collection counts of inserted, updated, deleted and unchanged documents, new fingerprints)
+    """
+    from app.indexes import ensure_indexes
+
+    # The upserts and deletes find their document through the key indexes
+    ensure_indexes(db, collections=list(collections))
+
+    summary = {}
+    manifest = {}
+    for name, documents in collections.items():
+        key, key_type = COLLECTION_KEYS[name]
+        counts = summary[name] = {'inserted': 0, 'updated': 0, 'deleted': 0, 'unchanged': 0}
+        operations = delta_operations(documents, key, key_type, dict(previous.get(name, {})), manifest.setdefault(name, {}), counts)
+        for batch in chunks(operations, batch_size):
+            db[name].bulk_write(batch, ordered=False)
+
+    if 'jobs' in collections:
+        raise_job_id_counter(db)
+
+    return summary, manifest
+
+def read_manifest(path, database):
+    """
+    Returns:
+    dict: Per collection fingerprints of the last load into database, or {} if there is none
+    """
+    try:
+        with open(path, encoding='utf-8') as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return {}
+    return manifest.get('collections', {}) if manifest.get('database') == database else {}
+
+def write_manifest(path, database, collections):
+    # Written to a temporary file and renamed, so a failed run leaves the previous manifest
+    temporary = path + '.tmp'
+    with open(temporary, 'w', encoding='utf-8') as f:
+        json.dump({'database': database, 'written_at': datetime.utcnow().isoformat(), 'collections': collections}, f, separators=(',', ':'))
+    os.replace(temporary, path)
+
+# Columnar export and import (Parquet through Arrow)
+
+def import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("The parquet format requires the 'pyarrow' package (pip install pyarrow)")
+    return pyarrow, pyarrow.parquet
+
+def arrow_schemas(schema='denormalized'):
+    """
+    Arrow schemas of the three collections, with the fields in document order, so
+    salaries are doubles, dates are timestamps and the list fields are lists of strings.
+    The normalized jobs schema has no NORMALIZED_DROPPED_FIELDS columns.
+
+    Returns:
+    dict: Collection name -> pyarrow.Schema
+    """
+    pa, _ = import_pyarrow()
+    strings = pa.list_(pa.string())
+    date = pa.timestamp('ms')
+    return {
+        'jobs': pa.schema([
+            ('job_id', pa.int64()), ('title', pa.string()), ('description', pa.string()),
+            ('detailed_description', pa.string()), ('responsibilities', strings), ('requirements', strings),
+            ('years_of_experience', pa.int64()), ('experience_level', pa.string()), ('employment_type', pa.string()),
+            ('average_salary', pa.float64()), ('benefits', strings), ('remote', pa.bool_()),
+            ('job_posting_url', pa.string()), ('posting_date', date), ('closing_date', date),
+            ('required_education', pa.string()), ('preferred_skills', strings), ('company_id', pa.int64())
+        ] + [(field, pa.string()) for field in COMPANY_FIELDS[1:] if schema != 'normalized' or field not in NORMALIZED_DROPPED_FIELDS]),
+        'industries': pa.schema([
+            ('industry_name', pa.string()), ('growth_rates', pa.list_(pa.float64())),
+            ('industry_skills', strings), ('top_companies', strings), ('trends', strings)
+        ]),
+        'companies': pa.schema([('company_id', pa.int64())] + [
+            (field, pa.string()) for field in ['name', 'size', 'type', 'location', 'website', 'description', 'hr_contact', 'industry_name']
+        ]),
+    }
+
+def save_as_parquet(documents, filename, schema, row_group_size=PARQUET_ROW_GROUP_SIZE):
+    """
+    Write documents to a zstd compressed Parquet file one row group at a time, so only
+    row_group_size documents are held in memory.
+
+    Returns:
+    int: The number of documents written
+    """
+    pa, pq = import_pyarrow()
+    count = 0
+    with pq.ParquetWriter(filename, schema, compression='zstd') as writer:
+        for batch in chunks(documents, row_group_size):
+            writer.write_table(pa.Table.from_pylist(batch, schema=schema), row_group_size=row_group_size)
+            count += len(batch)
+    return count
+
+def iter_parquet(filename, columns=None, batch_size=PARQUET_ROW_GROUP_SIZE):
+    """
+    Read documents back from a Parquet file written by save_as_parquet. Only the
+    given columns are decoded when columns is set.
+
+    Returns:
+    generator: The documents, as dicts with datetime dates
+    """
+    _, pq = import_pyarrow()
+    for batch in pq.ParquetFile(filename).iter_batches(batch_size=batch_size, columns=columns):
+        yield from batch.to_pylist()
+
+def read_sources(data_dir, input_format='csv', workers=1):
+    """
+    Read the industries and companies, and open the jobs as a stream, from the csv
+    feeds or from Parquet files written by --format parquet.
+
+    Returns:
+    tuple: (industry documents, company documents, generator of job documents)
+    """
+    if input_format == 'parquet':
+        return (list(iter_parquet(os.path.join(data_dir, 'industries.parquet'))),
+                list(iter_parquet(os.path.join(data_dir, 'companies.parquet'))),
+                iter_parquet(os.path.join(data_dir, 'jobs.parquet')))
+
+    industries, industry_id_to_name = read_lookups(data_dir)
+    companies = read_companies(os.path.join(data_dir, COMPANIES_CSV), industry_id_to_name)
+    return combine_industries(industries), companies, iter_jobs(data_dir, build_company_table(companies), workers=workers)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Transform the Career Hub csvs into MongoDB documents')
+    parser.add_argument('--data-dir', default=DATA_DIR, help='Directory containing the csv files')
+    parser.add_argument('--output-dir', default='.', help='Directory the output files are written to')
+    parser.add_argument('--format', choices=['json', 'ndjson', 'parquet', 'mongo'], default='json',
+                        help="'json' writes the three collections as JSON arrays, 'ndjson' streams jobs.ndjson and writes the small industries and companies collections as NDJSON too, 'parquet' writes typed Parquet files, 'mongo' streams them straight into the database")
+    parser.add_argument('--input', choices=['csv', 'parquet'], default='csv',
+                        help="'csv' transforms the csv feeds, 'parquet' reads jobs.parquet, industries.parquet and companies.parquet written by --format parquet")
+    parser.add_argument('--uri', help='MongoDB connection string for --format mongo (default: CAREERHUB_MONGO_URI)')
+    parser.add_argument('--db', help='Database name for --format mongo (default: CAREERHUB_MONGO_DB)')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Documents per insert_many or bulk_write call for --format mongo')
+    parser.add_argument('--swap', action='store_true', help='Load into staging collections and rename them over the live ones when complete')
+    parser.add_argument('--incremental', action='store_true', help='With --format mongo, only write the documents that changed since the last load')
+    parser.add_argument('--schema', choices=['denormalized', 'normalized'], default='denormalized',
+                        help="'denormalized' copies the company fields into every job, 'normalized' keeps only company_id, company_name and industry_name (run the API with CAREERHUB_JOB_SCHEMA=normalized)")
+    parser.add_argument('--workers', type=int, default=1, help='Worker processes that parse and join jobs.csv (1 runs serially)')
+    parser.add_argument('--manifest', help=f'Fingerprints of the last load, for --incremental (default: {MANIFEST_FILE} in the output directory)')
+    args = parser.parse_args(argv)
+
+    if args.incremental and (args.format != 'mongo' or args.swap):
+        parser.error('--incremental needs --format mongo and cannot be combined with --swap')
+
+    output = lambda name: os.path.join(args.output_dir, name)
+
+    if args.format == 'json' and args.input == 'csv':
+        jobs, combined_industry, companies = transform(args.data_dir, workers=args.workers)
+        if args.schema == 'normalized':
+            jobs = [normalize_job(job) for job in jobs]
+        save_as_json(jobs, output('jobs.json'))
+        save_as_json(combined_industry, output('industries.json'))
+        save_as_json(companies, output('companies.json'))
+
+        print("All data saved as JSON files.")
+        return 0
+
+    industries, companies, jobs = read_sources(args.data_dir, args.input, args.workers)
+    if args.schema == 'normalized':
+        jobs = map(normalize_job, jobs)
+
+    if args.format == 'mongo':
+        from app import config, industry_stats, lifecycle
+
+        collections = {'industries': industries, 'companies': companies, 'jobs': jobs}
+        database = args.db or config.MONGO_DB
+        manifest_path = args.manifest or output(MANIFEST_FILE)
+
+        client = pymongo.MongoClient(args.uri or config.MONGO_URI, appname='careerhub-etl')
+        try:
+            if args.incremental:
+                summary, manifest = sync_into_mongo(client[database], collections, read_manifest(manifest_path, database), batch_size=args.batch_size)
+                write_manifest(manifest_path, database, manifest)
+                if config.JOB_EXPIRY_POLICY == 'archive':
+                    lifecycle.sweep(client[database], config.JOB_EXPIRY_GRACE_DAYS, config.JOB_EXPIRY_BATCH_SIZE)
+                industry_stats.refresh(client[database])
+                for name, counts in summary.items():
+                    print(f"{name}: " + ", ".join(f"{count} {action}" for action, count in counts.items()))
+                return 0
+
+            manifest = {}
+            for name in collections:
+                collections[name] = fingerprinted(collections[name], COLLECTION_KEYS[name][0], manifest.setdefault(name, {}))
+            counts = load_into_mongo(client[database], collections, batch_size=args.batch_size, swap=args.swap)
+            write_manifest(manifest_path, database, manifest)
+            # Postings that have already closed go straight to the archive when that policy is on
+            if config.JOB_EXPIRY_POLICY == 'archive':
+                lifecycle.sweep(client[database], config.JOB_EXPIRY_GRACE_DAYS, config.JOB_EXPIRY_BATCH_SIZE)
+            # The API serves its industry analytics from industry_stats, rebuild it for the new data
+            industry_stats.refresh(client[database])
+        finally:
+            client.close()
+        print("Loaded " + ", ".join(f"{count} {name}" for name, count in counts.items()) + " into MongoDB.")
+        return 0
+
+    if args.format == 'parquet':
+        schemas = arrow_schemas(args.schema)
+        save_as_parquet(industries, output('industries.parquet'), schemas['industries'])
+        save_as_parquet(companies, output('companies.parquet'), schemas['companies'])
+        count = save_as_parquet(jobs, output('jobs.parquet'), schemas['jobs'])
+        print(f"{count} jobs saved as Parquet files.")
+        return 0
+
+    if args.format == 'ndjson':
+        save_as_ndjson(industries, output('industries.ndjson'))
+        save_as_ndjson(companies, output('companies.ndjson'))
+        if args.input == 'csv' and args.workers > 1:
+            # The workers encode the lines too, so this process only writes them out
+            company_table = build_company_table(companies)
+            encode = normalized_ndjson_line if args.schema == 'normalized' else ndjson_line
+            count = save_lines(iter_job_chunks(args.data_dir, company_table, args.workers, encode=encode), output('jobs.ndjson'))
+        else:
+            count = save_as_ndjson(jobs, output('jobs.ndjson'))
+        print(f"{count} jobs streamed to NDJSON files.")
+        return 0
+
+    save_as_json(list(jobs), output('jobs.json'))
+    save_as_json(industries, output('industries.json'))
+    save_as_json(companies, output('companies.json'))
+
+    print("All data saved as JSON files.")
+    return 0
 
-print("All data saved as JSON files.")
\ No newline at end of file
+if __name__ == '__main__':
+    sys.exit(main())
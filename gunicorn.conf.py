@@ -0,0 +1,97 @@
+'''Gunicorn configuration for serving the Career Hub API in production
+
+Run from the repository root with:
+    gunicorn -c gunicorn.conf.py
+
+Send SIGHUP to the master process to reload the code and configuration gracefully
+(new workers are started before the old ones finish their in-flight requests).
+'''
+
+import multiprocessing
+import os
+import subprocess
+import sys
+
+
+def env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value not in (None, '') else default
+
+
+wsgi_app = 'app:app'
+bind = os.environ.get('CAREERHUB_BIND', '0.0.0.0:5000')
+
+# Requests spend most of their time waiting on MongoDB, so each worker process runs a
+# few threads; processes scale with the CPU count. Keep CAREERHUB_MONGO_MAX_POOL_SIZE
+# at or above the thread count so threads never queue for a connection.
+worker_class = 'gthread'
+workers = env_int('CAREERHUB_WORKERS', multiprocessing.cpu_count() * 2 + 1)
+threads = env_int('CAREERHUB_THREADS', 4)
+
+# The memory result cache is kept in each worker, so a write would only invalidate it in
+# the worker that served it: with several workers the cache is shared (redis) or off.
+# Workers import the app after the fork, so they read the default set here.
+if workers > 1 and not os.environ.get('CAREERHUB_CACHE_BACKEND'):
+    os.environ['CAREERHUB_CACHE_BACKEND'] = 'none'
+elif workers > 1 and os.environ['CAREERHUB_CACHE_BACKEND'] == 'memory':
+    raise RuntimeError("CAREERHUB_CACHE_BACKEND=memory cannot be used with more than one worker, use redis or none")
+
+# Keep client connections open between requests (behind a load balancer this should be
+# longer than the balancer's own idle timeout) and bound the time a request may take.
+keepalive = env_int('CAREERHUB_KEEPALIVE', 5)
+timeout = env_int('CAREERHUB_TIMEOUT', 30)
+graceful_timeout = env_int('CAREERHUB_GRACEFUL_TIMEOUT', 30)
+
+# Recycle workers now and then so slow memory growth cannot build up; the jitter stops
+# every worker from restarting at the same moment.
+max_requests = env_int('CAREERHUB_MAX_REQUESTS', 10000)
+max_requests_jitter = env_int('CAREERHUB_MAX_REQUESTS_JITTER', 1000)
+
+# The app is imported in each worker, after the fork, so nothing (eg. a MongoClient) is
+# shared between processes.
+preload_app = False
+
+accesslog = os.environ.get('CAREERHUB_ACCESS_LOG', '-') or None
+errorlog = '-'
+
+
+def on_starting(server):
+    """
+    Create any missing indexes once, before workers start serving. This runs
+    python -m app.indexes in a child process: importing the app package here would load
+    the whole app into the master (and every worker would inherit it instead of
+    importing fresh code, eg. after a SIGHUP reload).
+    """
+    try:
+        result = subprocess.run(
+            [sys.executable, '-m', 'app.indexes', '--ensure'],
+            cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True
+        )
+    except Exception as e:
+        server.log.warning("Could not reconcile indexes: %s", e)
+        return
+    for line in result.stdout.splitlines():
+        if not line.endswith(': ok'):
+            server.log.info("Index %s", line)
+    if result.returncode:
+        server.log.warning("Could not reconcile indexes: %s", (result.stderr.strip().splitlines() or [f"exit code {result.returncode}"])[-1])
+
+
+def worker_exit(server, worker):
+    """
+    Close the worker's connection pool when it shuts down.
+    """
+    from app.db import close_client
+
+    close_client()
+
+
+def post_worker_init(worker):
+    """
+    Build the worker's skill index and salary columns before it starts serving requests,
+    and start its industry statistics refresher and expiry sweeper (see start_services).
+    """
+    from app.career_hub import start_services
+
+    for name, error in start_services():
+        worker.log.warning("Could not build the %s: %s", name, error)
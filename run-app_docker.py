@@ -1,6 +1,23 @@
+import os
+
 from app import app
+from app.career_hub import start_services
+from app.db import get_db
+from app.indexes import ensure_indexes
 
 if __name__ == '__main__':
+    # Create any missing indexes before serving so no route falls back to a collection scan
+    for entry in ensure_indexes(get_db()):
+        if entry['action'] != 'ok':
+            print(f"Index {entry['collection']}.{entry['index']}: {entry['action']}", entry.get('details', ''))
+
+    # Build the skill index and salary columns and start the industry statistics refresher
+    # and expiry sweeper, as gunicorn does in each worker. In debug mode the reloader runs
+    # the app in a child process (WERKZEUG_RUN_MAIN is set there), which is the one serving.
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        for name, error in start_services():
+            print(f"Could not build the {name}:", error)
+
     ''' 
         Running app in debug mode
         It will trace errors if produced and display them
@@ -8,4 +25,4 @@ if __name__ == '__main__':
     '''
     # To access the app from our host machine, we bind 0.0.0.0 to the host of the server.
     # otherwise, localhost:5000 is only accessible from within the Docker container
-    app.run(debug=True, host='0.0.0.0')
\ No newline at end of file
+    app.run(debug=True, host='0.0.0.0')